@@ -1,37 +1,282 @@
-import azure.cognitiveservices.speech as speechsdk
+"""
+Event-driven speech recognition service.
+
+Azure continuous recognition delivers results on SDK threads; this module hands
+them to asyncio through an async queue instead of spinning the main thread. Any
+number of recognizers can run in one process, each tagged with its own id, and
+the queue can be consumed by the YojnaPath graph (one thread_id per recognizer).
+
+For offline testing without the Azure SDK, LocalWavRecognizer replays a WAV file
+with the same event interface, taking the transcript from a sidecar .txt file.
+
+Usage:
+    python azure_stt.py                         # microphone, Azure credentials from .env
+    python azure_stt.py --wav a.wav b.wav       # local stand-in, one recognizer per file
+    python azure_stt.py --wav a.wav --graph     # send recognized text through the graph
+"""
+
+import asyncio
+import logging
 import os
+import threading
+import wave
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Replace with your Azure Speech service key and region
-speech_key = os.getenv("AZURE_SPEECH_KEY")
-service_region = os.getenv("AZURE_SPEECH_REGION")
-speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
-speech_recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecognitionResult:
+    recognizer_id: str
+    text: str
+    is_final: bool = True
+
+
+class _Signal:
+    """Minimal stand-in for the Azure SDK EventSignal"""
+
+    def __init__(self):
+        self._callbacks: List[Callable[[Any], None]] = []
+
+    def connect(self, callback: Callable[[Any], None]) -> None:
+        self._callbacks.append(callback)
+
+    def emit(self, evt: Any) -> None:
+        for callback in self._callbacks:
+            callback(evt)
+
+
+@dataclass
+class _LocalResult:
+    text: str
+
+
+@dataclass
+class _LocalEvent:
+    result: _LocalResult
+    reason: Optional[str] = None
+    error_details: str = ""
+
+
+class LocalWavRecognizer:
+    """
+    Offline recognizer with the Azure SpeechRecognizer event interface.
+
+    Reads a WAV file, paces events by the audio duration (scaled by `speed`) and
+    emits word-by-word `recognizing` partials followed by one `recognized` result
+    per transcript line. The transcript comes from `<wav>.txt` next to the file.
+    """
+
+    def __init__(self, wav_path: str, transcript: Optional[str] = None, speed: float = 1.0):
+        self.wav_path = wav_path
+        self.speed = speed
+        self.transcript = transcript
+        self.recognizing = _Signal()
+        self.recognized = _Signal()
+        self.canceled = _Signal()
+        self.session_stopped = _Signal()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self) -> tuple[float, List[str]]:
+        with wave.open(self.wav_path, "rb") as wav:
+            duration = wav.getnframes() / float(wav.getframerate())
+        transcript = self.transcript
+        if transcript is None:
+            sidecar = os.path.splitext(self.wav_path)[0] + ".txt"
+            with open(sidecar, "r", encoding="utf-8") as f:
+                transcript = f.read()
+        return duration, [line.strip() for line in transcript.splitlines() if line.strip()]
+
+    def _run(self) -> None:
+        try:
+            duration, utterances = self._load()
+        except (OSError, wave.Error) as e:
+            self.canceled.emit(_LocalEvent(_LocalResult(""), reason="Error", error_details=str(e)))
+            self.session_stopped.emit(_LocalEvent(_LocalResult("")))
+            return
+
+        words_total = sum(len(u.split()) for u in utterances) or 1
+        delay_per_word = duration / words_total / self.speed if self.speed > 0 else 0.0
+        for utterance in utterances:
+            words = utterance.split()
+            for i in range(1, len(words) + 1):
+                if self._stop.wait(delay_per_word):
+                    break
+                self.recognizing.emit(_LocalEvent(_LocalResult(" ".join(words[:i]))))
+            if self._stop.is_set():
+                break
+            self.recognized.emit(_LocalEvent(_LocalResult(utterance)))
+        self.session_stopped.emit(_LocalEvent(_LocalResult("")))
+
+    def start_continuous_recognition(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"wav-{os.path.basename(self.wav_path)}", daemon=True)
+        self._thread.start()
+
+    def stop_continuous_recognition(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+def create_azure_recognizer(language: str = "hi-IN", wav_path: Optional[str] = None) -> Any:
+    """Create an Azure SpeechRecognizer (microphone, or a WAV file if given)"""
+    import azure.cognitiveservices.speech as speechsdk
 
-# Event handler for recognized speech
-def recognized_handler(evt):
-    print(f"Recognized: {evt.result.text}")
+    speech_key = os.getenv("AZURE_SPEECH_KEY")
+    service_region = os.getenv("AZURE_SPEECH_REGION")
+    if not speech_key or not service_region:
+        raise ValueError("Missing Azure Speech credentials")
 
-# Event handler for canceled recognition
-def canceled_handler(evt):
-    print(f"Canceled: {evt}")
-    if evt.reason == speechsdk.CancellationReason.Error:
-        print(f"Error details: {evt.error_details}")
+    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
+    speech_config.speech_recognition_language = language
+    audio_config = speechsdk.audio.AudioConfig(filename=wav_path) if wav_path else None
+    return speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
 
-# Attach the event handlers
-speech_recognizer.recognized.connect(recognized_handler)
-speech_recognizer.canceled.connect(canceled_handler)
 
-# Start continuous recognition
-print("Listening... (Press Ctrl+C to stop)")
-speech_recognizer.start_continuous_recognition()
+class RecognitionService:
+    """
+    Runs recognizers and pushes their results into `results`, an asyncio.Queue.
 
-try:
-    # Keep the program running
+    Recognizer callbacks run on SDK threads and are handed to the event loop with
+    call_soon_threadsafe; nothing polls or busy-waits.
+    """
+
+    def __init__(self, include_partials: bool = False, maxsize: int = 0):
+        self.include_partials = include_partials
+        self.results: "asyncio.Queue[RecognitionResult]" = asyncio.Queue(maxsize=maxsize)
+        self._loop = asyncio.get_running_loop()
+        self._recognizers: Dict[str, Any] = {}
+        self._stopped: Dict[str, asyncio.Event] = {}
+
+    def _put(self, result: RecognitionResult) -> None:
+        try:
+            self.results.put_nowait(result)
+        except asyncio.QueueFull:
+            logger.warning("Recognition queue full, dropping result from %s", result.recognizer_id)
+
+    def add(self, recognizer_id: str, recognizer: Any) -> None:
+        """Register a recognizer; its events are wired to the queue"""
+        stopped = asyncio.Event()
+        self._recognizers[recognizer_id] = recognizer
+        self._stopped[recognizer_id] = stopped
+        loop = self._loop
+
+        def on_recognized(evt: Any) -> None:
+            if evt.result.text:
+                loop.call_soon_threadsafe(self._put, RecognitionResult(recognizer_id, evt.result.text))
+
+        def on_recognizing(evt: Any) -> None:
+            loop.call_soon_threadsafe(self._put, RecognitionResult(recognizer_id, evt.result.text, is_final=False))
+
+        def on_canceled(evt: Any) -> None:
+            logger.warning("Recognition canceled for %s: %s", recognizer_id, getattr(evt, "error_details", evt))
+            loop.call_soon_threadsafe(stopped.set)
+
+        def on_stopped(evt: Any) -> None:
+            loop.call_soon_threadsafe(stopped.set)
+
+        recognizer.recognized.connect(on_recognized)
+        if self.include_partials:
+            recognizer.recognizing.connect(on_recognizing)
+        recognizer.canceled.connect(on_canceled)
+        recognizer.session_stopped.connect(on_stopped)
+
+    async def start(self) -> None:
+        """Start continuous recognition on every registered recognizer"""
+        await asyncio.gather(*(
+            asyncio.to_thread(r.start_continuous_recognition) for r in self._recognizers.values()
+        ))
+
+    async def wait_stopped(self) -> None:
+        """Wait until every recognizer's session has ended"""
+        await asyncio.gather(*(event.wait() for event in self._stopped.values()))
+
+    async def stop(self) -> None:
+        await asyncio.gather(*(
+            asyncio.to_thread(r.stop_continuous_recognition) for r in self._recognizers.values()
+        ))
+
+
+async def run_graph_consumer(service: RecognitionService, graph: Any) -> None:
+    """
+    Send each final result through the graph, one conversation per recognizer,
+    normalized like the voice agents' messages. A failed turn is logged and the
+    next result is still consumed.
+    """
+    from langchain_core.messages import HumanMessage
+
+    from langgraph_app.text_normalizer import normalize_utterance
+
+    while True:
+        result = await service.results.get()
+        try:
+            if result.is_final:
+                config = {"configurable": {"thread_id": result.recognizer_id}, "recursion_limit": 10}
+                message = HumanMessage(content=normalize_utterance(result.text))
+                state = await graph.ainvoke({"messages": [message]}, config)
+                print(f"[{result.recognizer_id}] YojnaPath: {state['messages'][-1].content}")
+        except Exception:
+            logger.exception("Graph turn failed for %s", result.recognizer_id)
+        finally:
+            service.results.task_done()
+
+
+async def print_consumer(service: RecognitionService) -> None:
     while True:
+        result = await service.results.get()
+        print(f"[{result.recognizer_id}] {'Recognized' if result.is_final else 'Recognizing'}: {result.text}")
+        service.results.task_done()
+
+
+async def main(wav_paths: List[str], use_graph: bool = False, speed: float = 1.0, language: str = "hi-IN") -> None:
+    service = RecognitionService()
+
+    if not wav_paths:
+        service.add("microphone", create_azure_recognizer(language))
+    else:
+        for path in wav_paths:
+            try:
+                recognizer = create_azure_recognizer(language, wav_path=path) if os.getenv("AZURE_SPEECH_KEY") else None
+            except ImportError:
+                recognizer = None
+            service.add(os.path.basename(path), recognizer or LocalWavRecognizer(path, speed=speed))
+
+    if use_graph:
+        from langgraph.checkpoint.memory import MemorySaver
+        from langgraph_app.graph_builder import build_yojnapath_graph
+        consumer = asyncio.create_task(run_graph_consumer(service, build_yojnapath_graph(checkpointer=MemorySaver())))
+    else:
+        consumer = asyncio.create_task(print_consumer(service))
+
+    print("Listening... (Press Ctrl+C to stop)")
+    await service.start()
+    try:
+        await service.wait_stopped()
+        await service.results.join()
+    finally:
+        print("Stopping recognition...")
+        await service.stop()
+        consumer.cancel()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="YojnaPath speech recognition service")
+    parser.add_argument("--wav", nargs="*", default=[], help="WAV files to recognize instead of the microphone")
+    parser.add_argument("--graph", action="store_true", help="Send recognized text through the YojnaPath graph")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed of the local WAV stand-in (0 = no pacing)")
+    parser.add_argument("--language", default="hi-IN")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.wav, use_graph=args.graph, speed=args.speed, language=args.language))
+    except KeyboardInterrupt:
         pass
-except KeyboardInterrupt:
-    print("Stopping recognition...")
-    speech_recognizer.stop_continuous_recognition()
\ No newline at end of file
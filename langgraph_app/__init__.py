@@ -1,15 +1,18 @@
-from langgraph_app.graph_builder import (
-    build_yojnapath_graph,
-    init_conversation,
-    add_user_input,
-    stages,
-    State
-)
-
-__all__ = [
+# Re-exports are resolved on first access so that importing a submodule
+# (e.g. langgraph_app.flow_compiler) doesn't load LangGraph and the LLM client
+_GRAPH_BUILDER_EXPORTS = (
     "build_yojnapath_graph",
-    "init_conversation", 
+    "init_conversation",
     "add_user_input",
     "stages",
     "State"
-] 
\ No newline at end of file
+)
+
+__all__ = list(_GRAPH_BUILDER_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _GRAPH_BUILDER_EXPORTS:
+        from langgraph_app import graph_builder
+        return getattr(graph_builder, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,303 @@
+"""
+Load-aware admission of calls into a worker.
+
+LiveKit runs every call in its own job process, while the worker's load
+(`load_fnc`) and job admission (`request_fnc`) are handled in the main
+process. Job processes therefore publish their load (in-flight LLM requests,
+in-flight TTS syntheses and event-loop lag) to a small memory-mapped file
+each, and the main process sums them up:
+
+    load = max(calls / capacity, LLM requests / MAX_LLM, TTS syntheses / MAX_TTS, loop lag / LAG_MS)
+
+LiveKit stops dispatching to the worker once load reaches 1. A job offered
+anyway waits up to YOJNAPATH_ADMIT_QUEUE_S for room and is rejected
+otherwise, so LiveKit hands it to another worker.
+
+The call capacity adapts AIMD-style: it is cut by DECREASE_FACTOR while calls
+see loop lag or LLM/TTS saturation, and grows by one while the worker is full
+and healthy, up to YOJNAPATH_ADMIT_MAX_JOBS.
+
+Configuration:
+    YOJNAPATH_ADMIT_MAX_JOBS   most concurrent calls per worker (default 16); 0 disables admission control
+    YOJNAPATH_ADMIT_MAX_LLM    in-flight LLM requests of all calls at full load (default 32)
+    YOJNAPATH_ADMIT_MAX_TTS    in-flight TTS syntheses of all calls at full load (default 16)
+    YOJNAPATH_ADMIT_LAG_MS     event-loop lag of the worst call at full load (default 150)
+    YOJNAPATH_ADMIT_QUEUE_S    how long a job may wait for room before it is rejected (default 2)
+    YOJNAPATH_LOAD_DIR         where job processes publish their load (default: a temp dir per worker)
+"""
+
+import asyncio
+import atexit
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_JOBS = 16
+DEFAULT_MAX_LLM = 32
+DEFAULT_MAX_TTS = 16
+DEFAULT_LAG_MS = 150.0
+DEFAULT_QUEUE_S = 2.0
+
+# LiveKit marks the worker full at this load; request_fnc enforces the same limit
+FULL_LOAD = 1.0
+MIN_CAPACITY = 1
+DECREASE_FACTOR = 0.75
+# Capacity changes at most this often, so one change shows in the load before the next
+ADAPT_INTERVAL_S = 2.0
+QUEUE_POLL_S = 0.1
+
+PROBE_INTERVAL_S = 0.25
+# A load file not updated for this long belongs to a finished or stuck job process
+STALE_S = 5.0
+
+# updated_at (epoch seconds), in-flight LLM requests, in-flight TTS syntheses, loop lag ms
+_SLOT = struct.Struct("<dddd")
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+
+def admission_enabled() -> bool:
+    return _env_number("YOJNAPATH_ADMIT_MAX_JOBS", DEFAULT_MAX_JOBS) > 0
+
+
+def load_dir() -> str:
+    """
+    Directory shared by the worker and its job processes. The worker fixes it
+    in its environment, which job processes inherit.
+    """
+    directory = os.getenv("YOJNAPATH_LOAD_DIR")
+    if not directory:
+        directory = os.path.join(tempfile.gettempdir(), f"yojnapath-load-{os.getpid()}")
+        os.environ["YOJNAPATH_LOAD_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+# Job process side ---------------------------------------------------------
+
+_inflight: Dict[str, int] = {"llm": 0, "tts": 0}
+_inflight_lock = threading.Lock()
+
+
+@contextmanager
+def inflight(kind: str) -> Iterator[None]:
+    """Count a request ("llm" or "tts") in this process's load while it runs"""
+    with _inflight_lock:
+        _inflight[kind] += 1
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            _inflight[kind] -= 1
+
+
+class LoadReporter:
+    """Publishes this process's load to its file from a task that also probes loop lag"""
+
+    def __init__(self, directory: str, interval: float = PROBE_INTERVAL_S):
+        self.interval = interval
+        self.lag_ms = 0.0
+        self.path = os.path.join(directory, f"{os.getpid()}.load")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, _SLOT.size)
+            self._map = mmap.mmap(fd, _SLOT.size)
+        finally:
+            os.close(fd)
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self) -> None:
+        # A plain memory write; the worker reads it whenever LiveKit asks for the load
+        _SLOT.pack_into(self._map, 0, time.time(), _inflight["llm"], _inflight["tts"], self.lag_ms)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, loop.time() - expected) * 1e3
+            # Rises at once, decays over a few probes
+            self.lag_ms = lag_ms if lag_ms > self.lag_ms else 0.7 * self.lag_ms + 0.3 * lag_ms
+            self.publish()
+
+    def start(self) -> "LoadReporter":
+        self.publish()
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return self
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+_reporter: Optional[LoadReporter] = None
+
+
+def start_load_reporter() -> Optional[LoadReporter]:
+    """Start publishing this job process's load; call from the job's event loop"""
+    global _reporter
+    if _reporter is None and admission_enabled():
+        _reporter = LoadReporter(load_dir()).start()
+        atexit.register(_reporter.close)
+    return _reporter
+
+
+# Worker side ----------------------------------------------------------------
+
+@dataclass
+class WorkerLoad:
+    """Load published by the worker's job processes"""
+    processes: int = 0
+    llm: int = 0
+    tts: int = 0
+    lag_ms: float = 0.0
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_load(directory: str) -> WorkerLoad:
+    """Sum of the live job processes' load files; files of dead processes are removed"""
+    load = WorkerLoad()
+    now = time.time()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return load
+    for name in names:
+        if not name.endswith(".load"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read(_SLOT.size)
+        except OSError:
+            continue
+        if len(raw) < _SLOT.size:
+            continue
+        updated_at, llm, tts, lag_ms = _SLOT.unpack(raw)
+        if now - updated_at > STALE_S:
+            pid = name[:-len(".load")]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            continue
+        load.processes += 1
+        load.llm += int(llm)
+        load.tts += int(tts)
+        load.lag_ms = max(load.lag_ms, lag_ms)
+    return load
+
+
+class AdmissionController:
+    """
+    `load_fnc` and `request_fnc` of a worker. Both run in the main worker
+    process; the capacity is adapted whenever LiveKit polls the load.
+    """
+
+    def __init__(
+        self,
+        max_jobs: Optional[int] = None,
+        max_llm: Optional[int] = None,
+        max_tts: Optional[int] = None,
+        lag_ms: Optional[float] = None,
+        queue_s: Optional[float] = None,
+        directory: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_jobs = int(max_jobs if max_jobs is not None else _env_number("YOJNAPATH_ADMIT_MAX_JOBS", DEFAULT_MAX_JOBS))
+        self.max_llm = max_llm if max_llm is not None else _env_number("YOJNAPATH_ADMIT_MAX_LLM", DEFAULT_MAX_LLM)
+        self.max_tts = max_tts if max_tts is not None else _env_number("YOJNAPATH_ADMIT_MAX_TTS", DEFAULT_MAX_TTS)
+        self.lag_ms = lag_ms if lag_ms is not None else _env_number("YOJNAPATH_ADMIT_LAG_MS", DEFAULT_LAG_MS)
+        self.queue_s = queue_s if queue_s is not None else _env_number("YOJNAPATH_ADMIT_QUEUE_S", DEFAULT_QUEUE_S)
+        self.directory = directory or load_dir()
+        self.clock = clock
+        self.capacity = float(self.max_jobs)
+        # Calls running, as last reported by LiveKit plus those accepted since
+        self.jobs = 0
+        self.accepted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._adapted_at = clock()
+        # Highest LLM/TTS/lag pressure seen since the capacity last changed
+        self._peak_pressure = 0.0
+
+    def _usage_pressure(self, usage: WorkerLoad) -> float:
+        return max(usage.llm / self.max_llm, usage.tts / self.max_tts, usage.lag_ms / self.lag_ms)
+
+    def _adapt(self, usage: WorkerLoad) -> None:
+        self._peak_pressure = max(self._peak_pressure, self._usage_pressure(usage))
+        now = self.clock()
+        if now - self._adapted_at < ADAPT_INTERVAL_S:
+            return
+        self._adapted_at = now
+        peak, self._peak_pressure = self._peak_pressure, 0.0
+        if self.jobs and peak >= FULL_LOAD:
+            capacity = max(MIN_CAPACITY, self.capacity * DECREASE_FACTOR)
+        elif self.jobs >= int(self.capacity):
+            capacity = min(self.max_jobs, self.capacity + 1)
+        else:
+            return
+        if int(capacity) != int(self.capacity):
+            logger.info("Call capacity %d -> %d (LLM %d, TTS %d, loop lag %.0f ms)",
+                        int(self.capacity), int(capacity), usage.llm, usage.tts, usage.lag_ms)
+        self.capacity = capacity
+
+    def load(self, jobs: Optional[int] = None) -> float:
+        """Worker load in [0, 1]; 1 means no room for another call"""
+        if jobs is not None:
+            self.jobs = jobs
+        usage = read_load(self.directory)
+        self._adapt(usage)
+        return min(FULL_LOAD, max(self.jobs / int(self.capacity), self._usage_pressure(usage)))
+
+    def load_fnc(self, server: Any) -> float:
+        """LiveKit `load_fnc`; called from an executor thread every half second"""
+        return self.load(len(server.active_jobs))
+
+    def admits(self) -> bool:
+        return self.jobs < int(self.capacity) and self._usage_pressure(read_load(self.directory)) < FULL_LOAD
+
+    async def request_fnc(self, request: Any) -> None:
+        """LiveKit `request_fnc`: accept now, after waiting for room, or reject"""
+        deadline = self.clock() + self.queue_s
+        waited = False
+        while not self.admits():
+            if self.clock() >= deadline:
+                self.rejected += 1
+                logger.warning("Rejecting job %s: %d calls of capacity %d", request.id, self.jobs, int(self.capacity))
+                await request.reject()
+                return
+            if not waited:
+                waited = True
+                self.queued += 1
+            await asyncio.sleep(QUEUE_POLL_S)
+        # Counted before the next await so concurrent requests see it
+        self.jobs += 1
+        self.accepted += 1
+        await request.accept()
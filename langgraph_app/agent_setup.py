@@ -0,0 +1,94 @@
+"""
+Setup shared by the LiveKit agents (livekit_intigration.py and outbount_agent.py).
+
+Thread ids for LangGraph state, the Hindi Google TTS behind the audio cache,
+and the worker prewarm that builds the graph, compiles the hosted flows and
+opens the shared stores before the first call.
+"""
+
+import logging
+import os
+from typing import Any, Iterable
+from uuid import UUID, uuid4, uuid5
+
+from livekit.plugins import google
+
+from langgraph_app.call_archive import shared_archive
+from langgraph_app.graph_builder import build_yojnapath_graph, get_structured_llm
+from langgraph_app.langgraph_adapter import ERROR_REPLY
+from langgraph_app.metrics import start_metrics_server
+from langgraph_app.stage_registry import load_flows, start_config_watcher
+from langgraph_app.state_store import shared_checkpointer
+from langgraph_app.templates import failed_turn_reply
+from langgraph_app.tts_cache import CachedTTS, fixed_utterances, prerender_blocking, tts_cache_enabled
+
+logger = logging.getLogger(__name__)
+
+# Locale of the fixed utterances; matches the hi-IN TTS voice
+AGENT_LOCALE = "hi"
+TTS_VOICE = "hi-IN-Standard-B"
+TTS_LANGUAGE = "hi-IN"
+
+# Google STT/TTS service account
+GOOGLE_CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zynga-backend-5558169672f7.json")
+
+# For generating thread IDs for LangGraph state management
+NAMESPACE = UUID("41010b5d-5447-4df5-baf2-97d69f2e9d06")
+
+
+def get_thread_id(sid: str | None) -> str:
+    """Stable thread ID for a participant or room, or a fresh one if there is none"""
+    if sid is not None:
+        return str(uuid5(NAMESPACE, sid))
+    return str(uuid4())
+
+
+def make_tts() -> Any:
+    """Hindi Google TTS, behind the audio cache unless YOJNAPATH_TTS_CACHE_MB=0"""
+    google_tts = google.TTS(
+        voice_name=TTS_VOICE,
+        language=TTS_LANGUAGE,
+        credentials_file=GOOGLE_CREDENTIALS_PATH,
+        use_streaming=False
+    )
+    if not tts_cache_enabled():
+        return google_tts
+    return CachedTTS(google_tts, voice=TTS_VOICE, language=TTS_LANGUAGE)
+
+
+def prewarm_resources(recommended_env: Iterable[str] = ()) -> Any:
+    """
+    Pre-warm the worker; variables of `recommended_env` that aren't set are
+    only warned about, a missing GROQ_API_KEY fails the prewarm
+    """
+    try:
+        missing_vars = [var for var in recommended_env if not os.getenv(var)]
+        if missing_vars:
+            logger.warning("Missing environment variables: %s; set them in your .env file for full functionality.", missing_vars)
+        if not os.getenv("GROQ_API_KEY"):
+            logger.warning("GROQ_API_KEY environment variable not set; set it in the .env file to use the LLM functionality.")
+            raise ValueError("Missing GROQ_API_KEY")
+
+        # Build and test the graph
+        logger.info("Pre-warming YojnaPath LangGraph...")
+        graph = build_yojnapath_graph()
+        # Create the LLM client here rather than on the first caller's turn
+        get_structured_llm()
+        # Compile every hosted flow (YOJNAPATH_FLOWS) before the first call picks one
+        load_flows()
+        # Hot-reload the stage configs when YOJNAPATH_CONFIG_RELOAD is set
+        start_config_watcher()
+        # Open the shared conversation state store (YOJNAPATH_STATE_STORE) before the first call
+        shared_checkpointer()
+        # Start the call archive writer (YOJNAPATH_ARCHIVE_DIR)
+        shared_archive()
+        # Prometheus /metrics endpoint of this process (YOJNAPATH_METRICS_PORT)
+        start_metrics_server()
+        # Fixed utterances play from the TTS audio cache instead of being synthesized per call
+        if tts_cache_enabled():
+            prerender_blocking(make_tts(), fixed_utterances(AGENT_LOCALE, [ERROR_REPLY, failed_turn_reply(AGENT_LOCALE)]))
+        logger.info("Graph pre-warmed successfully")
+        return graph
+    except Exception as e:
+        logger.error("Error pre-warming resources: %s", e)
+        raise
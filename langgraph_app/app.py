@@ -29,6 +29,18 @@ def print_stage_info(state: State):
         print(f"Current Stage: {stage.name} ({current_stage_id})")
         print(f"Stage Type: {stage.type}")
 
+def print_stage_stats():
+    """Print per-stage model, latency and cost"""
+    from langgraph_app.model_router import stage_stats_report
+    
+    rows = stage_stats_report()
+    if not rows:
+        return
+    print(f"{'Stage':<22}{'Turns':>7}{'LLM':>6}{'Failed':>8}  {'Models':<26}{'Avg ms':>9}{'p95 ms':>9}{'Cost $':>11}")
+    for row in rows:
+        print(f"{row['stage']:<22}{row['turns']:>7}{row['llm_calls']:>6}{row['failures']:>8}  {row['models']:<26}"
+              f"{row['avg_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['cost_usd']:>11.6f}")
+
 def main():
     """
     Main function to demonstrate the simplified YojnaPath conversational flow.
@@ -103,8 +115,28 @@ def main():
         
         print_separator()
     
+    print_stage_stats()
     print("✨ Demo completed!")
 
+def replay_mode(input_path: str, output_path: str, concurrency: int, output_format: str):
+    """
+    Replay recorded transcripts concurrently and write per-turn outcomes.
+    """
+    from langgraph_app.replay import run_replay
+    
+    print(f"🔁 Replaying transcripts from {input_path} (concurrency={concurrency})")
+    summary = run_replay(input_path, output_path, concurrency=concurrency, output_format=output_format)
+    
+    print(f"Conversations: {summary.conversations}")
+    print(f"Turns: {summary.turns} ({summary.turns_per_second:.1f} turns/s)")
+    print(f"Latency p50/p95: {summary.percentile(50):.1f} / {summary.percentile(95):.1f} ms")
+    print(f"Errors: {summary.errors}, stage mismatches: {summary.mismatches}")
+    print_stage_stats()
+    print(f"📄 Per-turn results written to {output_path}")
+    
+    # Non-zero exit so the replay can gate a deploy
+    return 1 if summary.errors or summary.mismatches else 0
+
 def interactive_mode():
     """
     Interactive mode for testing the conversational flow.
@@ -169,10 +201,24 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="YojnaPath Conversational Agent")
     parser.add_argument("--interactive", "-i", action="store_true", 
                        help="Run in interactive mode")
+    parser.add_argument("--replay", metavar="TRANSCRIPTS",
+                       help="Replay conversations from a JSONL transcript file")
+    parser.add_argument("--output", "-o", default="replay_results.jsonl",
+                       help="Where to write per-turn replay results")
+    parser.add_argument("--output-format", choices=["jsonl", "columnar"], default="jsonl",
+                       help="Replay output format")
+    parser.add_argument("--concurrency", type=int, default=32,
+                       help="Number of conversations replayed concurrently")
     
     args = parser.parse_args()
     
-    if args.interactive:
+    from langgraph_app.logging_utils import setup_logging
+    # Per-turn logs would swamp a replay of thousands of conversations
+    setup_logging(level="WARNING" if args.replay else None, json_format=False)
+    
+    if args.replay:
+        sys.exit(replay_mode(args.replay, args.output, args.concurrency, args.output_format))
+    elif args.interactive:
         interactive_mode()
     else:
         main() 
\ No newline at end of file
@@ -0,0 +1,827 @@
+"""
+Micro-benchmarks for YojnaPath hot paths.
+
+Usage:
+    python -m langgraph_app.benchmarks logging --turns 20000
+    python -m langgraph_app.benchmarks startup --runs 5
+    python -m langgraph_app.benchmarks llm-faults --calls 2000
+    python -m langgraph_app.benchmarks state-serde --turns 20
+    python -m langgraph_app.benchmarks admission --calls-per-s 20 --duration 20
+    python -m langgraph_app.benchmarks llm-scheduler --sessions 16 --duration 15
+    python -m langgraph_app.benchmarks normalize --utterances 20000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _time_per_call(fn: Callable[[int], None], n: int) -> float:
+    """Average microseconds per call of fn(i) over n calls"""
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+class _SlowSink:
+    """File-like sink whose writes block, like a terminal or log driver under backpressure"""
+
+    def __init__(self, write_delay_s: float):
+        self.write_delay_s = write_delay_s
+
+    def write(self, text: str) -> int:
+        time.sleep(self.write_delay_s)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def bench_logging(turns: int = 20000, sink_delay_ms: float = 0.2) -> Dict[str, float]:
+    """
+    Per-turn logging overhead on the calling thread.
+
+    A turn emits what process_stage and should_continue log: one INFO stage
+    transition and two DEBUG lines, one of them carrying user text. Every
+    configuration is measured against a fast sink (/dev/null) and a sink whose
+    writes block for `sink_delay_ms`.
+    """
+    from langgraph_app.logging_utils import setup_logging, shutdown_logging, sensitive
+
+    user_text = "Mera naam Ramesh hai, mera number 9876543210 hai"
+    logger = logging.getLogger("yojnapath.bench")
+    results = {}
+
+    def print_turn(i: int) -> None:
+        print(f"🎯 Current stage: gather_info, User input: '{user_text}'")
+        print("🔄 Stage transition: gather_info -> preference")
+        print("🏁 Ending conversation - no user input")
+
+    def log_turn(i: int) -> None:
+        logger.debug("Current stage: %s, user input: %s", "gather_info", sensitive(user_text))
+        logger.info("Stage transition: %s -> %s", "gather_info", "preference",
+                    extra={"conversation_id": f"bench-{i % 64}"})
+        logger.debug("Ending conversation - no user input")
+
+    configs = [
+        ("queue, INFO", "INFO", 1.0),
+        ("queue, INFO sampled 10%", "INFO", 0.1),
+        ("queue, DEBUG", "DEBUG", 1.0),
+        ("queue, WARNING (gated)", "WARNING", 1.0),
+    ]
+
+    with open(os.devnull, "w") as devnull:
+        slow_sink = _SlowSink(sink_delay_ms / 1000)
+        # Blocking sinks are slow by construction; fewer turns keep the run short
+        for sink_name, sink, n in [("devnull", devnull, turns), ("slow sink", slow_sink, max(1, turns // 20))]:
+            with contextlib.redirect_stdout(sink):
+                results[f"print (previous behaviour), {sink_name}"] = _time_per_call(print_turn, n)
+
+            for name, level, rate in configs:
+                setup_logging(level=level, sample_rate=rate, handler=logging.StreamHandler(sink))
+                results[f"{name}, {sink_name}"] = _time_per_call(log_turn, n)
+                shutdown_logging()
+
+    return results
+
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+_STARTUP_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+from langgraph_app.graph_builder import build_yojnapath_graph, current_registry, get_structured_llm
+t1 = time.perf_counter()
+graph = build_yojnapath_graph()
+t2 = time.perf_counter()
+current_registry()
+t3 = time.perf_counter()
+get_structured_llm()
+t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "build graph": t2 - t1, "load stage config": t3 - t2, "create LLM client": t4 - t3}))
+"""
+
+STARTUP_TARGET_MS = 200.0
+
+
+def bench_startup(runs: int = 5) -> Dict[str, float]:
+    """
+    Median wall time (ms) of each startup step in a fresh interpreter.
+
+    "usable graph" is import + build + stage config, i.e. what a worker pays
+    before it can take a turn; the LLM client is created on the first turn.
+    A placeholder GROQ_API_KEY is used so the client can be constructed offline.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "benchmark-placeholder"}
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT], cwd=repo_root, env=env,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        timings = json.loads(out.strip().splitlines()[-1])
+        timings["usable graph"] = timings["import"] + timings["build graph"] + timings["load stage config"]
+        for name, seconds in timings.items():
+            samples.setdefault(name, []).append(seconds * 1e3)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+class _FaultyLLM:
+    """
+    Fake async LLM: lognormal latency around `median_ms`, a slow tail of
+    `slow_rate` calls taking `slow_factor` times longer, `error_rate` failures,
+    and tiers listed in `down` failing outright.
+    """
+
+    def __init__(self, median_ms: float = 20.0, slow_rate: float = 0.05, slow_factor: float = 10.0,
+                 error_rate: float = 0.05, down: tuple = (), seed: int = 7):
+        self.median_s = median_ms / 1000
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.error_rate = error_rate
+        self.down = down
+        self.requests = 0
+        self._random = random.Random(seed)
+
+    async def __call__(self, tier: str) -> str:
+        self.requests += 1
+        if tier in self.down:
+            await asyncio.sleep(self.median_s / 4)
+            raise ConnectionError(f"{tier} tier is down")
+        latency = self.median_s * self._random.lognormvariate(0, 0.25)
+        if self._random.random() < self.slow_rate:
+            latency *= self.slow_factor
+        await asyncio.sleep(latency)
+        if self._random.random() < self.error_rate:
+            raise ConnectionError("injected fault")
+        return tier
+
+
+def bench_llm_faults(calls: int = 2000, concurrency: int = 32) -> Dict[str, Dict[str, float]]:
+    """
+    Success rate and latency of LLM calls against a fault-injecting fake LLM,
+    with and without the LLMClient's retries, hedging and tier fallback.
+
+    Latency percentiles are over successful calls; `requests/call` counts
+    retries and hedges, and drops below 1 once a circuit breaker is open.
+    """
+    from langgraph_app.llm_client import LLMClient, RetryPolicy
+
+    no_fallback: Dict[str, str] = {}
+    scenarios = [
+        ("single attempt", {}, dict(retry=RetryPolicy(retries=0), hedge_percentile=0, fallback_tiers=no_fallback)),
+        ("retries", {}, dict(retry=RetryPolicy(retries=2, base_delay_s=0.005), hedge_percentile=0,
+                             fallback_tiers=no_fallback)),
+        ("retries + p95 hedging", {}, dict(retry=RetryPolicy(retries=2, base_delay_s=0.005))),
+        ("large tier down, no fallback", {"down": ("large",)},
+         dict(retry=RetryPolicy(retries=2, base_delay_s=0.005), fallback_tiers=no_fallback)),
+        ("large tier down, breaker + fallback", {"down": ("large",)},
+         dict(retry=RetryPolicy(retries=2, base_delay_s=0.005))),
+    ]
+
+    async def run(llm: _FaultyLLM, client: LLMClient) -> Dict[str, float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        failures = 0
+
+        async def one() -> None:
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await client.acall("large", llm)
+                except Exception:
+                    failures += 1
+                    return
+                latencies.append((time.perf_counter() - start) * 1e3)
+
+        await asyncio.gather(*(one() for _ in range(calls)))
+        latencies.sort()
+
+        def pct(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+        return {
+            "success %": 100 * (calls - failures) / calls,
+            "p50 ms": pct(50),
+            "p95 ms": pct(95),
+            "p99 ms": pct(99),
+            "requests/call": llm.requests / calls,
+        }
+
+    results = {}
+    # Every injected fault would otherwise be logged
+    logging.disable(logging.CRITICAL)
+    try:
+        for name, llm_options, client_options in scenarios:
+            results[name] = asyncio.run(run(_FaultyLLM(**llm_options), LLMClient(timeout_s=None, **client_options)))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+# Replies of a scripted conversation, alternating Hindi and English like real calls
+_SCRIPTED_REPLIES = [
+    ("PM किसान योजना में छोटे और सीमांत किसानों को हर साल ₹6000 तीन किस्तों में मिलते हैं। "
+     "क्या आप इसकी पात्रता के बारे में जानना चाहते हैं?", "scheme_doubt_solving"),
+    ("आवेदन करने के लिए आपको आधार कार्ड, बैंक खाता और ज़मीन के कागज़ात की ज़रूरत होगी।", "scheme_doubt_solving"),
+    ("Sure! PM Kisan is for farmers who own cultivable land. Would you like to know how to apply?",
+     "scheme_doubt_solving"),
+    ("आपकी जानकारी के आधार पर प्रधानमंत्री आवास योजना और आयुष्मान भारत भी आपके लिए सही रहेंगी।",
+     "scheme_doubt_solving"),
+]
+_SCRIPTED_QUESTIONS = [
+    "मुझे पीएम किसान योजना के बारे में बताइए",
+    "इसके लिए कौन से दस्तावेज़ चाहिए?",
+    "Who is eligible for this scheme?",
+    "मैं बिहार से हूँ, उम्र 45 साल, खेती करता हूँ",
+]
+
+
+class _ScriptedLLM:
+    def __init__(self):
+        self.turn = 0
+
+    def invoke(self, prompt: Any) -> Dict[str, Any]:
+        from models import LLMResponse
+
+        response, next_stage = _SCRIPTED_REPLIES[self.turn % len(_SCRIPTED_REPLIES)]
+        self.turn += 1
+        return {"raw": None, "parsed": LLMResponse(response=response, next_stage=next_stage), "parsing_error": None}
+
+
+def _scripted_checkpoints(turns: int) -> List[Any]:
+    """Every checkpoint (oldest first) of a scripted conversation run through the real graph"""
+    from langchain_core.messages import HumanMessage
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from langgraph_app import graph_builder
+
+    llm = _ScriptedLLM()
+    saver = MemorySaver()
+    config = {"configurable": {"thread_id": "bench", "locale": "hi"}}
+    with mock.patch.object(graph_builder, "get_structured_llm", lambda *args: llm):
+        graph = graph_builder.build_yojnapath_graph(checkpointer=saver)
+        for i in range(turns):
+            question = _SCRIPTED_QUESTIONS[i % len(_SCRIPTED_QUESTIONS)]
+            graph.invoke({"messages": [HumanMessage(content=question)]}, config)
+    return list(reversed(list(saver.list(config))))
+
+
+def bench_state_serde(turns: int = 20, repeat: int = 20) -> Dict[str, Dict[str, float]]:
+    """
+    Bytes written per turn and encode/decode time per checkpoint of a
+    conversation's checkpoints: LangGraph's serializer (what MemorySaver
+    stores) and the compact codec of SharedCheckpointSaver.
+    """
+    import ormsgpack
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    from langgraph_app.state_codec import StateCodec
+
+    serde = JsonPlusSerializer()
+    codec = StateCodec()
+    logging.disable(logging.WARNING)
+    try:
+        checkpoints = _scripted_checkpoints(turns)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    def split(checkpoint_tuple: Any) -> tuple:
+        checkpoint = checkpoint_tuple.checkpoint.copy()
+        return checkpoint, checkpoint.pop("channel_values"), checkpoint_tuple.metadata
+
+    parts = [split(t) for t in checkpoints]
+
+    def default_encode() -> List[List[tuple]]:
+        return [
+            [serde.dumps_typed(c), serde.dumps_typed(m), *(serde.dumps_typed(v) for v in values.values())]
+            for c, values, m in parts
+        ]
+
+    def default_decode(encoded: List[List[tuple]]) -> None:
+        for blobs in encoded:
+            for blob in blobs:
+                serde.loads_typed(blob)
+
+    def codec_encode() -> List[bytes]:
+        return [ormsgpack.packb(codec.encode(c, values, m, serde)) for c, values, m in parts]
+
+    def codec_decode(encoded: List[bytes]) -> None:
+        for data in encoded:
+            codec.decode(ormsgpack.unpackb(data), serde)
+
+    def measure(encode: Callable[[], Any], decode: Callable[[Any], None], size: Callable[[Any], List[int]]) -> Dict[str, float]:
+        encoded = encode()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            encode()
+        encode_s = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            decode(encoded)
+        decode_s = (time.perf_counter() - start) / repeat
+        sizes = size(encoded)
+        return {
+            "bytes/turn": sum(sizes) / turns,
+            "last checkpoint B": sizes[-1],
+            "encode µs": encode_s / len(parts) * 1e6,
+            "decode µs": decode_s / len(parts) * 1e6,
+        }
+
+    def blob_sizes(encoded: List[List[tuple]]) -> List[int]:
+        return [sum(len(type_) + len(data) for type_, data in blobs) for blobs in encoded]
+
+    def record_sizes(encoded: List[bytes]) -> List[int]:
+        return [len(data) for data in encoded]
+
+    return {
+        "LangGraph serializer": measure(default_encode, default_decode, blob_sizes),
+        f"compact ({codec.compression})": measure(codec_encode, codec_decode, record_sizes),
+    }
+
+
+class _StubBackendLLM(_ScriptedLLM):
+    """Scripted replies from a backend that serves `slots` requests at a time, each taking `latency_s`"""
+
+    def __init__(self, slots: int, latency_s: float):
+        super().__init__()
+        self.latency_s = latency_s
+        self._slots = asyncio.Semaphore(slots)
+
+    async def ainvoke(self, prompt: Any) -> Dict[str, Any]:
+        async with self._slots:
+            await asyncio.sleep(self.latency_s)
+        return self.invoke(prompt)
+
+
+class _StubJobRequest:
+    def __init__(self, id: str):
+        self.id = id
+        self.accepted: Optional[bool] = None
+
+    async def accept(self) -> None:
+        self.accepted = True
+
+    async def reject(self) -> None:
+        self.accepted = False
+
+
+def bench_admission(calls_per_s: float = 20.0, duration_s: float = 20.0, turns: int = 4,
+                    frame_cpu_ms: float = 0.4) -> Dict[str, Dict[str, float]]:
+    """
+    Turn latency of admitted calls when calls arrive faster than one worker
+    can serve them, with every call accepted, with a fixed call limit, and
+    with the adaptive admission controller.
+
+    Each call runs the real graph against a stub LLM backend with limited
+    concurrency, "speaks" every reply through a stub TTS, and burns
+    `frame_cpu_ms` of event-loop time every 20 ms audio frame like the media
+    pipeline does. All calls share one loop, so the loop lag a worker's job
+    processes would see grows with the number of calls. Rejected calls would
+    go to another worker.
+    """
+    import tempfile
+
+    from langchain_core.messages import HumanMessage
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from langgraph_app import graph_builder
+    from langgraph_app.admission import AdmissionController, LoadReporter, inflight
+
+    async def run(make_controller: Callable[[str], Optional[AdmissionController]]) -> Dict[str, float]:
+        directory = tempfile.mkdtemp(prefix="yojnapath-load-bench-")
+        controller = make_controller(directory)
+        reporter = LoadReporter(directory).start()
+        llm = _StubBackendLLM(slots=16, latency_s=0.25)
+        graph = graph_builder.build_yojnapath_graph(checkpointer=MemorySaver())
+        latencies: List[float] = []
+        active = 0
+        admitted = rejected = 0
+        peak_lag_ms = 0.0
+        min_capacity = controller.capacity if controller else float("nan")
+
+        async def frames(stop: asyncio.Event) -> None:
+            while not stop.is_set():
+                end = time.perf_counter() + frame_cpu_ms / 1000
+                while time.perf_counter() < end:
+                    pass
+                await asyncio.sleep(0.02)
+
+        async def call(i: int) -> None:
+            nonlocal active, admitted, rejected
+            request = _StubJobRequest(f"job-{i}")
+            if controller is None:
+                await request.accept()
+            else:
+                await controller.request_fnc(request)
+            if not request.accepted:
+                rejected += 1
+                return
+            admitted += 1
+            active += 1
+            stop = asyncio.Event()
+            media = asyncio.create_task(frames(stop))
+            config = {"configurable": {"thread_id": f"bench-{i}", "locale": "hi"}}
+            try:
+                for turn in range(turns):
+                    start = time.perf_counter()
+                    question = _SCRIPTED_QUESTIONS[turn % len(_SCRIPTED_QUESTIONS)]
+                    await graph.ainvoke({"messages": [HumanMessage(content=question)]}, config)
+                    with inflight("tts"):
+                        await asyncio.sleep(0.05)
+                    latencies.append((time.perf_counter() - start) * 1e3)
+                    # The caller listens and answers
+                    await asyncio.sleep(1.0)
+            finally:
+                stop.set()
+                await media
+                active -= 1
+
+        async def poll_load(stop: asyncio.Event) -> None:
+            nonlocal peak_lag_ms, min_capacity
+            while not stop.is_set():
+                peak_lag_ms = max(peak_lag_ms, reporter.lag_ms)
+                if controller is not None:
+                    controller.load(active)
+                    min_capacity = min(min_capacity, controller.capacity)
+                await asyncio.sleep(0.5)
+
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_load(stop))
+        random_ = random.Random(11)
+        tasks = []
+        with mock.patch.object(graph_builder, "get_structured_llm", lambda *args: llm):
+            deadline = time.perf_counter() + duration_s
+            i = 0
+            while time.perf_counter() < deadline:
+                tasks.append(asyncio.create_task(call(i)))
+                i += 1
+                await asyncio.sleep(random_.expovariate(calls_per_s))
+            await asyncio.gather(*tasks)
+        stop.set()
+        await poller
+        reporter.close()
+        latencies.sort()
+
+        def pct(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+        return {
+            "offered": len(tasks),
+            "admitted": admitted,
+            "rejected": rejected,
+            "turn p50 ms": pct(50),
+            "turn p95 ms": pct(95),
+            "peak lag ms": peak_lag_ms,
+            "min capacity": min_capacity,
+        }
+
+    # Only the load signals that matter for each scenario are enabled
+    unlimited = dict(max_llm=1e9, max_tts=1e9, lag_ms=1e9)
+    scenarios = [
+        ("accept every call", lambda directory: None),
+        ("fixed limit of 24 calls", lambda directory: AdmissionController(
+            max_jobs=24, queue_s=1.0, directory=directory, **unlimited)),
+        ("adaptive (limit 128 calls)", lambda directory: AdmissionController(
+            max_jobs=128, max_llm=24, max_tts=16, lag_ms=20, queue_s=1.0, directory=directory)),
+    ]
+    results = {}
+    logging.disable(logging.WARNING)
+    try:
+        for name, make_controller in scenarios:
+            results[name] = asyncio.run(run(make_controller))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+class _RateLimitedStub:
+    """
+    Local Groq-compatible chat completions endpoint that enforces requests and
+    tokens per `period_s` like the provider: token buckets, and 429s with a
+    retry-after header once one is empty. Replies with a structured-output
+    tool call after `latency_ms`.
+    """
+
+    def __init__(self, rpm: float, tpm: float, period_s: float, latency_ms: float = 150.0):
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.levels = dict(self.limits)
+        self.period_s = period_s
+        self.latency_s = latency_ms / 1000
+        self.updated = time.monotonic()
+        self.served = 0
+        self.rejected = 0
+
+    def _admit(self, tokens: int) -> float:
+        """0 if the request fits, otherwise seconds until it would"""
+        now = time.monotonic()
+        for name, limit in self.limits.items():
+            self.levels[name] = min(limit, self.levels[name] + (now - self.updated) * limit / self.period_s)
+        self.updated = now
+        cost = {"requests": 1, "tokens": tokens}
+        wait = max((cost[name] - self.levels[name]) * self.period_s / limit for name, limit in self.limits.items())
+        if wait > 0:
+            return wait
+        for name in self.limits:
+            self.levels[name] -= cost[name]
+        return 0.0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves one keep-alive connection from the Groq SDK, one request at a time"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+                status, extra_headers, payload = await self._complete(body)
+                data = json.dumps(payload).encode()
+                reason = "OK" if status == 200 else "Too Many Requests"
+                head = [f"HTTP/1.1 {status} {reason}", "content-type: application/json",
+                        f"content-length: {len(data)}", "connection: keep-alive"]
+                head += [f"{name}: {value}" for name, value in extra_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _complete(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Status, extra headers and JSON body of a chat completions request"""
+        prompt = "".join(m.get("content") or "" for m in body["messages"] if isinstance(m.get("content"), str))
+        prompt_tokens, completion_tokens = len(prompt) // 3, 60
+        retry_after = self._admit(prompt_tokens + completion_tokens)
+        if retry_after:
+            self.rejected += 1
+            return 429, {"retry-after": f"{retry_after:.2f}"}, {
+                "error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"},
+            }
+        await asyncio.sleep(self.latency_s)
+        self.served += 1
+        tool = body["tools"][0]["function"]["name"]
+        arguments = json.dumps({"response": "ठीक है", "next_stage": "scheme_doubt_solving", "confidence": 0.9})
+        return 200, {}, {
+            "id": f"chatcmpl-{self.served}", "object": "chat.completion", "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "tool_calls", "message": {
+                "role": "assistant", "content": None,
+                "tool_calls": [{"id": "call_1", "type": "function", "function": {"name": tool, "arguments": arguments}}],
+            }}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+
+def bench_llm_scheduler(sessions: int = 16, duration_s: float = 15.0, rpm: float = 60, tpm: float = 60_000,
+                        period_s: float = 10.0) -> Dict[str, Dict[str, float]]:
+    """
+    Live-turn latency and failures when sessions together ask for more than
+    the provider's rate limit, calling it directly (the SDK retrying 429s, as
+    before) and through the LLMScheduler. Runs real ChatGroq clients against a
+    local stub that enforces `rpm`/`tpm` per `period_s` (a compressed minute).
+
+    Every session takes a turn every 1-1.5 s, and half of the turns are
+    preceded by a speculative request on the interim transcript. Each
+    session's first turn is the same greeting, which the scheduler coalesces.
+    """
+    from langchain_groq import ChatGroq
+
+    from langgraph_app.llm_client import LLMClient, LLMUnavailable
+    from langgraph_app.llm_scheduler import PRIORITY_SPECULATIVE, LLMScheduler, llm_context
+    from models import LLMResponse
+
+    model = "llama-3.3-70b-versatile"
+    base_prompt = "\n".join(f"{question} {reply}" for question, (reply, _) in zip(_SCRIPTED_QUESTIONS, _SCRIPTED_REPLIES))
+
+    async def run(use_scheduler: bool) -> Dict[str, float]:
+        stub = _RateLimitedStub(rpm, tpm, period_s)
+        server = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        chat = ChatGroq(model=model, api_key="stub", base_url=f"http://127.0.0.1:{port}",
+                        max_retries=0 if use_scheduler else 2)
+        llm = chat.with_structured_output(LLMResponse, include_raw=True)
+        client = LLMClient(fallback_tiers={})
+        scheduler = LLMScheduler({model: {"rpm": rpm, "tpm": tpm}}, period_s=period_s)
+        latencies: List[float] = []
+        failures = 0
+        speculative_done = 0
+        turns_per_session: List[int] = [0] * sessions
+
+        async def request(prompt: str) -> Any:
+            async def call(tier: str) -> Any:
+                if use_scheduler:
+                    return await scheduler.submit(model, lambda: llm.ainvoke(prompt), prompt, key=prompt)
+                return await llm.ainvoke(prompt)
+            return (await client.acall("large", call))[0]
+
+        async def speculate(session: str, prompt: str) -> None:
+            nonlocal speculative_done
+            with llm_context(session, PRIORITY_SPECULATIVE):
+                await request(prompt)
+            speculative_done += 1
+
+        async def session(index: int) -> None:
+            nonlocal failures
+            rand = random.Random(index)
+            deadline = time.perf_counter() + duration_s
+            turn = 0
+            while time.perf_counter() < deadline:
+                prompt = base_prompt if turn == 0 else f"{base_prompt}\nUser {index}, turn {turn}: {rand.random()}"
+                speculative = None
+                if turn and rand.random() < 0.5:
+                    speculative = asyncio.create_task(speculate(f"s{index}", prompt + " (interim)"))
+                    await asyncio.sleep(0.3)
+                start = time.perf_counter()
+                try:
+                    with llm_context(f"s{index}"):
+                        await request(prompt)
+                    latencies.append((time.perf_counter() - start) * 1e3)
+                    turns_per_session[index] += 1
+                except LLMUnavailable:
+                    failures += 1
+                if speculative:
+                    speculative.cancel()
+                turn += 1
+                await asyncio.sleep(rand.uniform(1.0, 1.5))
+
+        await asyncio.gather(*(session(i) for i in range(sessions)))
+        await chat.async_client._client.close()
+        server.close()
+        await server.wait_closed()
+        latencies.sort()
+
+        def pct(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+        live_turns = len(latencies) + failures
+        return {
+            "live turns": live_turns,
+            "failed %": 100 * failures / max(1, live_turns),
+            "live p50 ms": pct(50),
+            "live p95 ms": pct(95),
+            "speculative": speculative_done,
+            "429s": stub.rejected,
+            "coalesced": scheduler.stats.coalesced,
+            "min/max turns": min(turns_per_session) / max(1, max(turns_per_session)),
+        }
+
+    results = {}
+    logging.disable(logging.WARNING)
+    try:
+        results["direct, SDK retries 429s"] = asyncio.run(run(False))
+        results["LLM scheduler"] = asyncio.run(run(True))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+# What callers say, each the way STT writes it on different calls: spellings,
+# scripts, digits and number words, nukta and chandrabindu, decomposed Unicode
+_UTTERANCE_VARIANTS = (
+    ("PM Kisan yojana ke baare mein batao", "pm kisan yojna ke bare mein batao", "पीएम किसान योजना के बारे में बताओ",
+     "PM kisan yojnaa ke baare me batao"),
+    ("dastavez kaun se chahiye", "dastavej kaun se chahie", "दस्तावेज़ कौन से चाहिए",
+     "दस्तावेज कौन से चाहिए", "दस्ताव\u0947\u091c\u093c कौन से चाहिए"),
+    ("meri umar 45 saal hai", "meri umr 45 saal hai", "मेरी उम्र 45 साल है", "मेरी उम्र ४५ साल है",
+     "मेरी उम्र पैंतालीस साल है"),
+    ("paanch hazaar rupaye milega kya", "panch hazar rupye milega kya", "पाँच हज़ार रुपये मिलेगा क्या",
+     "पांच हजार रुपये मिलेगा क्या", "5000 रुपये मिलेगा क्या", "५००० रुपये मिलेगा क्या"),
+    ("mahila ke liye koi yojana", "mahila ke liye koi yojna", "महिला के लिए कोई योजना"),
+    ("aavedan kaise karna hai", "avedan kaise karna hai", "आवेदन कैसे करना है"),
+    ("haan ji", "haa ji", "हाँ जी", "हां जी"),
+    ("dusra wala", "doosra wala", "दूसरा वाला"),
+    ("nahi pata", "nahin pata", "नहीं पता"),
+    ("dhanyavad", "dhanyawad", "धन्यवाद"),
+)
+
+
+def _utterance_corpus(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(rng.choice(_UTTERANCE_VARIANTS)) for _ in range(count)]
+
+
+def bench_normalize(utterances: int = 20000) -> Dict[str, float]:
+    """
+    Utterance normalization throughput, cold (every utterance normalized
+    afresh) and memoized, and how many distinct texts the graph and the tool
+    result cache see per intent with and without it.
+    """
+    from langgraph_app.text_normalizer import normalize_utterance
+
+    corpus = _utterance_corpus(utterances)
+
+    def throughput(clear: bool) -> float:
+        normalize_utterance.cache_clear()
+        start = time.perf_counter()
+        for text in corpus:
+            if clear:
+                normalize_utterance.cache_clear()
+            normalize_utterance(text)
+        return len(corpus) / (time.perf_counter() - start)
+
+    return {
+        "uncached utterances/s": throughput(True),
+        "memoized utterances/s": throughput(False),
+        "raw texts per intent": len(set(corpus)) / len(_UTTERANCE_VARIANTS),
+        "normalized texts per intent": len({normalize_utterance(text) for text in corpus}) / len(_UTTERANCE_VARIANTS),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="YojnaPath micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    logging_parser = subparsers.add_parser("logging", help="Per-turn logging overhead")
+    logging_parser.add_argument("--turns", type=int, default=20000)
+    logging_parser.add_argument("--sink-delay-ms", type=float, default=0.2)
+
+    startup_parser = subparsers.add_parser("startup", help="Import and graph construction time")
+    startup_parser.add_argument("--runs", type=int, default=5)
+
+    faults_parser = subparsers.add_parser("llm-faults", help="LLM retries, hedging and fallback under injected faults")
+    faults_parser.add_argument("--calls", type=int, default=2000)
+    faults_parser.add_argument("--concurrency", type=int, default=32)
+
+    serde_parser = subparsers.add_parser("state-serde", help="Checkpoint size and encode/decode time")
+    serde_parser.add_argument("--turns", type=int, default=20)
+
+    admission_parser = subparsers.add_parser("admission", help="Call admission under overload with a stub pipeline")
+    admission_parser.add_argument("--calls-per-s", type=float, default=20.0)
+    admission_parser.add_argument("--duration", type=float, default=20.0)
+
+    scheduler_parser = subparsers.add_parser("llm-scheduler", help="Rate-limited LLM requests against a local stub")
+    scheduler_parser.add_argument("--sessions", type=int, default=16)
+    scheduler_parser.add_argument("--duration", type=float, default=15.0)
+
+    normalize_parser = subparsers.add_parser("normalize", help="Utterance normalization throughput and cache effect")
+    normalize_parser.add_argument("--utterances", type=int, default=20000)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "logging":
+        print(f"Per-turn logging overhead ({args.turns} turns)")
+        for name, micros in bench_logging(args.turns, args.sink_delay_ms).items():
+            print(f"  {name:<48} {micros:10.2f} µs/turn")
+    elif args.benchmark == "startup":
+        print(f"Startup time, median of {args.runs} fresh interpreters")
+        results = bench_startup(args.runs)
+        for name, millis in results.items():
+            print(f"  {name:<24} {millis:10.1f} ms")
+        verdict = "within" if results["usable graph"] <= STARTUP_TARGET_MS else "over"
+        print(f"  usable graph is {verdict} the {STARTUP_TARGET_MS:.0f} ms target")
+    elif args.benchmark == "llm-faults":
+        print(f"LLM calls against a fault-injecting fake ({args.calls} calls, concurrency {args.concurrency})")
+        results = bench_llm_faults(args.calls, args.concurrency)
+        columns = list(next(iter(results.values())))
+        print(f"  {'':<38}" + "".join(f"{column:>18}" for column in columns))
+        for name, row in results.items():
+            print(f"  {name:<38}" + "".join(f"{row[column]:>18.2f}" for column in columns))
+    elif args.benchmark == "state-serde":
+        results = bench_state_serde(args.turns)
+        print(f"Conversation checkpoints over {args.turns} turns")
+        columns = list(next(iter(results.values())))
+        print(f"  {'':<28}" + "".join(f"{column:>20}" for column in columns))
+        for name, row in results.items():
+            print(f"  {name:<28}" + "".join(f"{row[column]:>20.1f}" for column in columns))
+    elif args.benchmark == "admission":
+        print(f"Calls arriving at {args.calls_per_s:g}/s for {args.duration:g} s, one worker")
+        results = bench_admission(args.calls_per_s, args.duration)
+        columns = list(next(iter(results.values())))
+        print(f"  {'':<28}" + "".join(f"{column:>14}" for column in columns))
+        for name, row in results.items():
+            print(f"  {name:<28}" + "".join(f"{row[column]:>14.1f}" for column in columns))
+    elif args.benchmark == "llm-scheduler":
+        print(f"{args.sessions} sessions for {args.duration:g} s against a stub allowing 6 requests/s")
+        results = bench_llm_scheduler(args.sessions, args.duration)
+        columns = list(next(iter(results.values())))
+        print(f"  {'':<28}" + "".join(f"{column:>14}" for column in columns))
+        for name, row in results.items():
+            print(f"  {name:<28}" + "".join(f"{row[column]:>14.2f}" for column in columns))
+    elif args.benchmark == "normalize":
+        print(f"{args.utterances} code-mixed utterances over {len(_UTTERANCE_VARIANTS)} intents")
+        for name, value in bench_normalize(args.utterances).items():
+            print(f"  {name:<28} {value:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+Archive of finished calls for offline analytics.
+
+When a call ends the agents hand its final state to the archive, which reduces
+it to one summary row (outcome, stage sequence, per-turn latency and tokens)
+and queues it for a background writer thread, so the event loop never waits on
+disk. The call's thread is cleared once it is archived (`end_call`), so a caller
+who rings back is archived with the new call's turns only. Rows are appended
+to length-prefixed msgpack segments:
+
+    calls-<start time>-<pid>-<n>.open   segment being written by a worker
+    calls-<start time>-<pid>-<n>.log    closed segment (rotated by size or at exit)
+
+`compact` turns closed segments into a columnar part: one .npy file per column,
+per call and per turn, which `report` memory-maps and aggregates with numpy
+without building a Python object per call:
+
+    python -m langgraph_app.call_archive compact
+    python -m langgraph_app.call_archive report
+
+Configuration:
+    YOJNAPATH_ARCHIVE_DIR          archive directory; unset disables archiving
+    YOJNAPATH_ARCHIVE_SEGMENT_MB   size at which a segment is closed (default 64)
+"""
+
+import argparse
+import atexit
+import contextlib
+import glob
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import ormsgpack
+
+from langgraph_app.graph_builder import TURN_LOG_FIELDS, aclear_conversation, stage_registry_for
+from langgraph_app.stage_registry import DEFAULT_FLOW
+from models import StageType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_MB = 64
+# Summaries waiting for the writer; beyond this calls are dropped rather than blocking
+QUEUE_SIZE = 10000
+
+OUTCOME_COMPLETED = "completed"   # reached an END stage
+OUTCOME_ABANDONED = "abandoned"   # the caller left mid-flow
+OUTCOME_FAILED = "failed"         # the last turn got no LLM answer
+OUTCOMES = (OUTCOME_COMPLETED, OUTCOME_ABANDONED, OUTCOME_FAILED)
+
+# A recommendation is accepted when the caller asks about or applies for a recommended scheme
+RECOMMEND_STAGE = "recommend_scheme"
+ACCEPTING_STAGES = ("scheme_doubt_solving", "kb_tool_call")
+
+_LENGTH = struct.Struct("<I")
+
+# Columns of a compacted part: per call, and per turn in call order
+CALL_COLUMNS = {
+    "ended_at": np.float64,
+    "outcome": np.uint8,
+    "config_version": np.int32,
+    "turn_offset": np.int64,
+}
+TURN_COLUMNS = {
+    "stage": np.uint16,
+    "next_stage": np.uint16,
+    "latency_ms": np.float32,
+    "input_tokens": np.int32,
+    "output_tokens": np.int32,
+    "failed": np.bool_,
+    "clarified": np.bool_,
+}
+
+
+def summarize_call(values: Dict[str, Any], thread_id: str = "") -> Optional[Dict[str, Any]]:
+    """Archive row of a call's final state, or None if no turn was processed"""
+    turns = values.get("turns") or []
+    if not turns:
+        return None
+    current_stage = values.get("current_stage")
+    stage = stage_registry_for(values).stages.get(current_stage) if current_stage else None
+    if stage is not None and stage.type == StageType.END:
+        outcome = OUTCOME_COMPLETED
+    elif turns[-1][TURN_LOG_FIELDS.index("failed")]:
+        outcome = OUTCOME_FAILED
+    else:
+        outcome = OUTCOME_ABANDONED
+    return {
+        "thread_id": thread_id,
+        "conversation_id": values.get("conversation_id") or "",
+        "ended_at": time.time(),
+        "outcome": outcome,
+        "flow": values.get("flow") or DEFAULT_FLOW,
+        "config_version": values.get("config_version") or 0,
+        "locale": values.get("locale") or "",
+        # Rows as in State["turns"], see TURN_LOG_FIELDS
+        "turns": turns,
+    }
+
+
+class CallArchive:
+    """
+    Appends call summaries to size-rotated segments from a background thread.
+
+    Each worker process writes its own segment, so there is no locking between
+    processes; `close()` (also run at exit) drains the queue and closes it.
+    """
+
+    def __init__(self, directory: str, segment_bytes: Optional[int] = None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes or int(
+            float(os.getenv("YOJNAPATH_ARCHIVE_SEGMENT_MB", DEFAULT_SEGMENT_MB)) * 1024 * 1024
+        )
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(QUEUE_SIZE)
+        self._file = None
+        self._path = ""
+        self._size = 0
+        self._segments = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="call-archive", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, summary: Dict[str, Any]) -> None:
+        """Queue a summary for writing; never blocks"""
+        try:
+            self._queue.put_nowait(summary)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Call archive queue full, dropped a call summary (%d so far)", self.dropped)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            summary = self._queue.get()
+            if summary is None:
+                break
+            try:
+                self._write(ormsgpack.packb(summary))
+                # Flush once the queue is drained rather than per call
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                logger.error("Could not archive call summary: %s", e)
+        self._rotate()
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+            self._segments += 1
+            self._path = os.path.join(self.directory, f"calls-{stamp}-{os.getpid()}-{self._segments}.open")
+            self._file = open(self._path, "ab")
+            self._size = 0
+        self._file.write(_LENGTH.pack(len(data)))
+        self._file.write(data)
+        self._size += _LENGTH.size + len(data)
+        if self._size >= self.segment_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        """Close the current segment, making it available to `compact`"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._path, self._path[: -len(".open")] + ".log")
+
+
+@lru_cache(maxsize=None)
+def shared_archive() -> Optional[CallArchive]:
+    """Process-wide archive in YOJNAPATH_ARCHIVE_DIR, or None if archiving is off"""
+    directory = os.getenv("YOJNAPATH_ARCHIVE_DIR", "").strip()
+    return CallArchive(directory) if directory else None
+
+
+async def archive_call(graph: Any, config: Dict[str, Any]) -> None:
+    """Archive the final state of the call on `config`'s thread; for job shutdown callbacks"""
+    archive = shared_archive()
+    if archive is None:
+        return
+    try:
+        snapshot = await graph.aget_state(config)
+    except Exception as e:
+        logger.warning("Could not read the final state of the call: %s", e)
+        return
+    summary = summarize_call(snapshot.values if snapshot else {}, config["configurable"]["thread_id"])
+    if summary is not None:
+        archive.submit(summary)
+
+
+async def end_call(graph: Any, config: Dict[str, Any]) -> None:
+    """
+    Archive the call, then clear its thread; for job shutdown callbacks. A
+    caller's next call on the same thread starts over, so its turns are never
+    archived twice.
+    """
+    await archive_call(graph, config)
+    await aclear_conversation(graph, config)
+
+
+def read_segment(path: str) -> Iterator[Dict[str, Any]]:
+    """Summaries in a segment; a torn record at the end (crashed writer) is skipped"""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        end = offset + _LENGTH.size + length
+        if end > len(data):
+            logger.warning("Skipping truncated record at the end of %s", path)
+            return
+        yield ormsgpack.unpackb(data[offset + _LENGTH.size:end])
+        offset = end
+
+
+def _writer_alive(path: str) -> bool:
+    pid = int(os.path.basename(path).split("-")[2])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def closed_segments(directory: str) -> List[str]:
+    """Closed segments, plus open ones left behind by a worker that died"""
+    segments = glob.glob(os.path.join(directory, "calls-*.log"))
+    segments += [path for path in glob.glob(os.path.join(directory, "calls-*.open")) if not _writer_alive(path)]
+    return sorted(segments)
+
+
+def _part_paths(directory: str) -> List[str]:
+    # Parts being written are named compacting-*, or part-*.tmp by earlier versions
+    return sorted(
+        path for path in glob.glob(os.path.join(directory, "part-*"))
+        if os.path.isdir(path) and not path.endswith(".tmp")
+    )
+
+
+def _remove_compacted(directory: str) -> None:
+    """Delete segments a published part already holds, left behind by a compaction that crashed"""
+    for path in _part_paths(directory):
+        with open(os.path.join(path, "dictionary.json"), encoding="utf-8") as f:
+            segments = json.load(f).get("segments", [])
+        for name in segments:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, name))
+
+
+def compact(directory: str) -> Optional[str]:
+    """
+    Convert closed segments into one columnar part directory and delete them.
+    Returns the part's path, or None if there was nothing to compact.
+
+    The part lists the segments it holds, so publishing it is what consumes
+    them: segments still there after a crash are deleted by the next
+    compaction rather than compacted twice.
+    """
+    _remove_compacted(directory)
+    segments = closed_segments(directory)
+    if not segments:
+        return None
+
+    stages: Dict[str, int] = {}
+    calls: Dict[str, List[Any]] = {name: [] for name in CALL_COLUMNS}
+    turns: Dict[str, List[Any]] = {name: [] for name in TURN_COLUMNS}
+    turn_count = 0
+    for path in segments:
+        for summary in read_segment(path):
+            calls["ended_at"].append(summary["ended_at"])
+            calls["outcome"].append(OUTCOMES.index(summary["outcome"]))
+            calls["config_version"].append(summary["config_version"])
+            calls["turn_offset"].append(turn_count)
+            for row in summary["turns"]:
+                fields = dict(zip(TURN_LOG_FIELDS, row))
+                turns["stage"].append(stages.setdefault(fields["stage"], len(stages)))
+                turns["next_stage"].append(stages.setdefault(fields["next_stage"], len(stages)))
+                for name in ("latency_ms", "input_tokens", "output_tokens", "failed"):
+                    turns[name].append(fields[name])
+                # Rows archived before clarifications existed have no such column
+                turns["clarified"].append(fields.get("clarified", 0))
+            turn_count += len(summary["turns"])
+
+    name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}"
+    part = os.path.join(directory, f"part-{name}")
+    tmp_part = os.path.join(directory, f"compacting-{name}")
+    os.makedirs(tmp_part)
+    for prefix, columns, dtypes in (("call", calls, CALL_COLUMNS), ("turn", turns, TURN_COLUMNS)):
+        for name, dtype in dtypes.items():
+            np.save(os.path.join(tmp_part, f"{prefix}_{name}.npy"), np.asarray(columns[name], dtype=dtype))
+    with open(os.path.join(tmp_part, "dictionary.json"), "w", encoding="utf-8") as f:
+        json.dump({"stages": list(stages), "outcomes": list(OUTCOMES), "calls": len(calls["ended_at"]),
+                   "turns": turn_count, "segments": [os.path.basename(path) for path in segments]}, f)
+    # The part appears complete or not at all, and from then on its segments count as deleted
+    os.replace(tmp_part, part)
+    for path in segments:
+        os.remove(path)
+    return part
+
+
+class ArchivePart:
+    """The columns of one compacted part, memory-mapped"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "dictionary.json"), encoding="utf-8") as f:
+            dictionary = json.load(f)
+        self.stages: List[str] = dictionary["stages"]
+        self.outcomes: List[str] = dictionary["outcomes"]
+        self.calls = {
+            name: np.load(os.path.join(path, f"call_{name}.npy"), mmap_mode="r") for name in CALL_COLUMNS
+        }
+        self.turns = {
+            name: np.load(os.path.join(path, f"turn_{name}.npy"), mmap_mode="r") for name in TURN_COLUMNS
+        }
+
+
+def load_parts(directory: str) -> List[ArchivePart]:
+    return [ArchivePart(path) for path in _part_paths(directory)]
+
+
+def _percentile(values: np.ndarray, p: float) -> float:
+    return float(np.percentile(values, p)) if len(values) else 0.0
+
+
+def report(parts: List[ArchivePart]) -> Dict[str, Any]:
+    """Outcomes, stage funnel and drop-off, recommendation acceptance and per-stage latency/tokens"""
+    stage_names = sorted({name for part in parts for name in part.stages})
+    index = {name: i for i, name in enumerate(stage_names)}
+    n_stages = len(stage_names)
+
+    calls = 0
+    outcomes = np.zeros(len(OUTCOMES), dtype=np.int64)
+    reached = np.zeros(n_stages, dtype=np.int64)       # calls that visited a stage
+    abandoned_at = np.zeros(n_stages, dtype=np.int64)  # abandoned calls by their last stage
+    turns_per_stage = np.zeros(n_stages, dtype=np.int64)
+    tokens_per_stage = np.zeros(n_stages, dtype=np.int64)
+    recommendations = accepted = 0
+    latencies: List[List[np.ndarray]] = [[] for _ in stage_names]
+
+    for part in parts:
+        # Part-local stage codes -> report-wide codes
+        remap = np.array([index[name] for name in part.stages], dtype=np.int64)
+        offsets = np.asarray(part.calls["turn_offset"])
+        n_calls = len(offsets)
+        n_turns = len(part.turns["stage"])
+        if not n_calls:
+            continue
+        calls += n_calls
+        call_outcomes = np.asarray(part.calls["outcome"])
+        outcomes += np.bincount(call_outcomes, minlength=len(OUTCOMES))
+
+        stage = remap[part.turns["stage"]]
+        next_stage = remap[part.turns["next_stage"]]
+        call_of_turn = np.repeat(np.arange(n_calls), np.diff(np.append(offsets, n_turns)))
+        visited = np.unique(np.concatenate([call_of_turn * n_stages + stage, call_of_turn * n_stages + next_stage]))
+        reached += np.bincount(visited % n_stages, minlength=n_stages)
+
+        has_turns = np.diff(np.append(offsets, n_turns)) > 0
+        last_stage = next_stage[np.append(offsets, n_turns)[1:][has_turns] - 1]
+        abandoned = call_outcomes[has_turns] == OUTCOMES.index(OUTCOME_ABANDONED)
+        abandoned_at += np.bincount(last_stage[abandoned], minlength=n_stages)
+
+        turns_per_stage += np.bincount(stage, minlength=n_stages)
+        tokens = np.asarray(part.turns["input_tokens"], dtype=np.int64) + part.turns["output_tokens"]
+        tokens_per_stage += np.bincount(stage, weights=tokens, minlength=n_stages).astype(np.int64)
+
+        if RECOMMEND_STAGE in index:
+            from_recommend = stage == index[RECOMMEND_STAGE]
+            recommendations += int(from_recommend.sum())
+            accepting = [index[s] for s in ACCEPTING_STAGES if s in index]
+            accepted += int((from_recommend & np.isin(next_stage, accepting)).sum())
+
+        latency = np.asarray(part.turns["latency_ms"])
+        order = np.argsort(stage, kind="stable")
+        bounds = np.searchsorted(stage[order], np.arange(n_stages + 1))
+        for i in range(n_stages):
+            latencies[i].append(latency[order[bounds[i]:bounds[i + 1]]])
+
+    stages_report = []
+    for i, name in enumerate(stage_names):
+        stage_latencies = np.concatenate(latencies[i]) if latencies[i] else np.empty(0)
+        stages_report.append({
+            "stage": name,
+            "calls_reached": int(reached[i]),
+            "abandoned_here": int(abandoned_at[i]),
+            "drop_off_%": 100.0 * abandoned_at[i] / reached[i] if reached[i] else 0.0,
+            "turns": int(turns_per_stage[i]),
+            "p50_ms": _percentile(stage_latencies, 50),
+            "p95_ms": _percentile(stage_latencies, 95),
+            "tokens": int(tokens_per_stage[i]),
+        })
+    return {
+        "calls": calls,
+        "outcomes": {name: int(count) for name, count in zip(OUTCOMES, outcomes)},
+        "recommendations": recommendations,
+        "acceptance_%": 100.0 * accepted / recommendations if recommendations else 0.0,
+        "stages": stages_report,
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    calls = result["calls"]
+    print(f"Calls: {calls}")
+    for name, count in result["outcomes"].items():
+        print(f"  {name:<10} {count:>10} ({100.0 * count / calls if calls else 0.0:.1f}%)")
+    print(f"Recommendation acceptance: {result['acceptance_%']:.1f}% of {result['recommendations']} recommendations")
+    print()
+    columns = ["calls_reached", "abandoned_here", "drop_off_%", "turns", "p50_ms", "p95_ms", "tokens"]
+    print(f"{'Stage':<24}" + "".join(f"{column:>16}" for column in columns))
+    for row in sorted(result["stages"], key=lambda row: -row["calls_reached"]):
+        cells = "".join(
+            f"{row[column]:>16.1f}" if isinstance(row[column], float) else f"{row[column]:>16}" for column in columns
+        )
+        print(f"{row['stage']:<24}" + cells)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="YojnaPath call archive")
+    parser.add_argument("command", choices=["compact", "report"])
+    parser.add_argument("--dir", default=os.getenv("YOJNAPATH_ARCHIVE_DIR"), help="Archive directory")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir or YOJNAPATH_ARCHIVE_DIR is required")
+
+    if args.command == "compact":
+        part = compact(args.dir)
+        print(f"Compacted into {part}" if part else "No closed segments to compact")
+    else:
+        parts = load_parts(args.dir)
+        if not parts:
+            print(f"No compacted parts in {args.dir}; run `compact` first")
+            return
+        print_report(report(parts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Confidence-aware stage transitions.
+
+The LLM reports a confidence with every choice of next stage. When it picks a
+stage the current one can't move to, or leaves the stage with low confidence,
+the turn doesn't guess: the caller is asked a template question listing the
+allowed next stages (no LLM call) and the conversation stays where it is. The
+answer is matched locally, by option number or by the pre-router's stage
+keywords, and the chosen stage handles the turn; answers that match nothing
+go to the LLM as usual.
+
+Confident transitions are taken as they are, without this detour.
+
+Configuration:
+    YOJNAPATH_CLARIFY_BELOW   confidence below which leaving a stage is confirmed first;
+                              0 only clarifies invalid choices (default 0.5)
+"""
+
+import os
+import re
+from typing import List, Optional, Sequence
+
+from langgraph_app.prerouter import IncrementalRouter
+from langgraph_app.stage_registry import StageRegistry
+from langgraph_app.text_normalizer import normalize_utterance
+from models import NextStage, Stage
+
+DEFAULT_CLARIFY_BELOW = 0.5
+# Options offered in one question; more would be hard to follow by voice
+MAX_OPTIONS = 4
+
+CLARIFY_INVALID = "invalid"
+CLARIFY_LOW_CONFIDENCE = "low_confidence"
+
+# Option numbers as callers say them. Words like "दूसरी" (second/other) or "पहले"
+# (first/before) also occur in ordinary sentences, so they only count in short answers
+_NUMBER_WORDS = {
+    1: ("first", "one", "pehla", "pehle", "ek", "पहला", "पहले", "पहली", "एक"),
+    2: ("second", "two", "doosra", "dusra", "doosre", "dusre", "दूसरा", "दूसरे", "दूसरी", "दो"),
+    3: ("third", "three", "teesra", "tisra", "teen", "तीसरा", "तीसरे", "तीसरी", "तीन"),
+    4: ("fourth", "four", "chautha", "chaar", "चौथा", "चौथे", "चौथी", "चार"),
+}
+# The same forms normalized, as answers are compared normalized ("दो" is "2", "pahla" is "pehla")
+_NUMBER_FORMS = {
+    number: frozenset(normalize_utterance(form) for form in forms) for number, forms in _NUMBER_WORDS.items()
+}
+SHORT_ANSWER_WORDS = 3
+
+_WORD = re.compile(r"[\w\u0900-\u097F]+")
+
+
+def clarify_threshold() -> float:
+    return float(os.getenv("YOJNAPATH_CLARIFY_BELOW", DEFAULT_CLARIFY_BELOW) or 0)
+
+
+def clarification_options(registry: StageRegistry, stage: Stage) -> List[NextStage]:
+    """The transitions offered when asking; empty if the stage has nothing to choose between"""
+    options = [option for option in stage.nextStages or [] if option.nextStageId in registry.stages]
+    return options[:MAX_OPTIONS] if len(options) > 1 else []
+
+
+def clarify_reason(
+    stage: Stage,
+    next_stage_id: str,
+    allowed_stages: Sequence[str],
+    confidence: Optional[float],
+    threshold: Optional[float] = None,
+) -> Optional[str]:
+    """Why the LLM's transition should be confirmed with the caller, or None to take it"""
+    if next_stage_id not in allowed_stages:
+        return CLARIFY_INVALID
+    threshold = clarify_threshold() if threshold is None else threshold
+    if next_stage_id != stage.id and confidence is not None and confidence < threshold:
+        return CLARIFY_LOW_CONFIDENCE
+    return None
+
+
+def answer_clarification(text: str, options: Sequence[str]) -> Optional[str]:
+    """The stage among `options` (in the order they were offered) the answer picks, if it is clear"""
+    words = _WORD.findall(text.lower())
+    numbers = {int(word) for word in words if word.isascii() and word.isdigit()}
+    text = normalize_utterance(text)
+    if len(words) <= SHORT_ANSWER_WORDS:
+        # Number words only become digits once normalized
+        spoken = _WORD.findall(text)
+        numbers |= {int(word) for word in spoken if word.isascii() and word.isdigit()}
+        numbers |= {number for number, forms in _NUMBER_FORMS.items() if any(form in spoken for form in forms)}
+    numbers = {number for number in numbers if 1 <= number <= len(options)}
+    if len(numbers) == 1:
+        return options[numbers.pop() - 1]
+
+    router = IncrementalRouter(options)
+    router.update(text)
+    best = router.best()
+    if best is None or list(router.scores.values()).count(router.scores[best]) > 1:
+        return None
+    return best
@@ -0,0 +1,282 @@
+"""
+Static validation and precompilation of stage flows.
+
+Checks a stage config before it is deployed (unknown transitions, START/END
+stages, unreachable stages, dead ends, cycles with no way out and reply
+templates that can't be rendered) and writes
+the compiled StageRegistry, including its transition table, as a pickled
+artifact next to the config. Workers load the artifact instead of parsing and
+validating the JSON when its source digest still matches and it was written by
+the same code (models.py, this module and stage_registry); an artifact from
+other code is a cache miss and is never unpickled.
+
+Artifacts are pickles: only load ones you built yourself.
+
+Usage:
+    python -m langgraph_app.flow_compiler                     # check and compile stage_config.json
+    python -m langgraph_app.flow_compiler my_flow.json --check
+    python -m langgraph_app.flow_compiler -o /tmp/flow.pkl
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import sys
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph_app.templates import SUPPORTED_LOCALES, stage_template, template_error
+from models import Stage, StageType
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 2
+FALLBACK_STAGE = "farewell"
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Code that defines what a pickled registry contains
+ARTIFACT_CODE = (
+    os.path.join(os.path.dirname(_PACKAGE_DIR), "models.py"),
+    os.path.join(_PACKAGE_DIR, "flow_compiler.py"),
+    os.path.join(_PACKAGE_DIR, "stage_registry.py"),
+)
+
+
+@dataclass
+class FlowReport:
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    # Strongly connected groups of stages that loop (including self-loops)
+    cycles: List[List[str]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def transition_table(stages: Dict[str, Stage]) -> Dict[str, tuple[str, ...]]:
+    """Allowed next stages per stage; stages without transitions fall back to farewell"""
+    table = {}
+    for stage_id, stage in stages.items():
+        allowed = tuple(dict.fromkeys(ns.nextStageId for ns in stage.nextStages or []))
+        table[stage_id] = allowed or (FALLBACK_STAGE,)
+    return table
+
+
+def _edges(stages: Dict[str, Stage]) -> Dict[str, Set[str]]:
+    global_ids = {s.id for s in stages.values() if s.type == StageType.GLOBAL}
+    edges = {}
+    for stage_id, stage in stages.items():
+        targets = {ns.nextStageId for ns in stage.nextStages or [] if ns.nextStageId in stages}
+        # GLOBAL stages can be entered from anywhere
+        if stage.type != StageType.END:
+            targets |= global_ids
+        edges[stage_id] = targets
+    return edges
+
+
+def _reachable(start: Set[str], edges: Dict[str, Set[str]]) -> Set[str]:
+    seen, stack = set(start), list(start)
+    while stack:
+        for target in edges[stack.pop()]:
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def _cycles(edges: Dict[str, Set[str]]) -> List[List[str]]:
+    """Strongly connected components that contain a cycle (Tarjan)"""
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    components: List[List[str]] = []
+
+    def visit(node: str) -> None:
+        index[node] = low[node] = len(index)
+        stack.append(node)
+        on_stack.add(node)
+        for target in edges[node]:
+            if target not in index:
+                visit(target)
+                low[node] = min(low[node], low[target])
+            elif target in on_stack:
+                low[node] = min(low[node], index[target])
+        if low[node] == index[node]:
+            component = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component.append(member)
+                if member == node:
+                    break
+            if len(component) > 1 or node in edges[node]:
+                components.append(sorted(component))
+
+    for node in edges:
+        if node not in index:
+            visit(node)
+    return components
+
+
+def analyze_flow(stages: Dict[str, Stage]) -> FlowReport:
+    """Check a parsed stage flow; errors make it unusable, warnings are suspicious but run"""
+    report = FlowReport()
+
+    start_ids = [s.id for s in stages.values() if s.type == StageType.START]
+    end_ids = [s.id for s in stages.values() if s.type == StageType.END]
+    if len(start_ids) != 1:
+        report.errors.append(f"expected exactly one START stage, found {start_ids or 'none'}")
+    if not end_ids:
+        report.errors.append("no END stage")
+    elif len(end_ids) > 1:
+        report.warnings.append(f"more than one END stage: {end_ids}")
+    if FALLBACK_STAGE not in stages:
+        report.errors.append(f"missing '{FALLBACK_STAGE}' stage (used as the fallback stage)")
+
+    for stage in stages.values():
+        for next_stage in stage.nextStages or []:
+            if next_stage.nextStageId not in stages:
+                report.errors.append(f"stage '{stage.id}' points to unknown stage '{next_stage.nextStageId}'")
+        if stage.type == StageType.END and stage.nextStages:
+            report.warnings.append(f"END stage '{stage.id}' has transitions that are never taken")
+        if stage.type in (StageType.START, StageType.NORMAL) and not stage.nextStages:
+            report.warnings.append(f"stage '{stage.id}' has no transitions and always falls back to '{FALLBACK_STAGE}'")
+        if stage.static and not (stage.templates or stage.prompt):
+            report.errors.append(f"static stage '{stage.id}' has neither templates nor a prompt")
+        if (stage.static or stage.model == "none") and stage.type != StageType.END:
+            if len(stage.nextStages or []) > 1:
+                report.warnings.append(f"stage '{stage.id}' uses no model but has several transitions; the first is always taken")
+            if stage.tools:
+                report.warnings.append(f"stage '{stage.id}' uses no model, so its tools are never called")
+        # Replies rendered from the stage's template rather than by the LLM
+        if stage.static or stage.model == "none" or stage.type in (StageType.START, StageType.END):
+            for template in dict.fromkeys(stage_template(stage, locale) for locale in SUPPORTED_LOCALES):
+                error = template_error(template)
+                if error:
+                    report.errors.append(f"stage '{stage.id}' has a template that can't be rendered: {error}")
+
+    edges = _edges(stages)
+    if len(start_ids) == 1:
+        reachable = _reachable({start_ids[0]}, edges)
+        for stage_id in stages:
+            if stage_id not in reachable and stages[stage_id].type != StageType.GLOBAL:
+                report.warnings.append(f"stage '{stage_id}' is unreachable from '{start_ids[0]}'")
+
+    # Stages that can never get to an END stage trap the conversation
+    if end_ids:
+        reverse: Dict[str, Set[str]] = {stage_id: set() for stage_id in stages}
+        for stage_id, targets in edges.items():
+            for target in targets:
+                reverse[target].add(stage_id)
+        # Stages without transitions fall back to farewell at runtime
+        for stage_id, stage in stages.items():
+            if not stage.nextStages and stage.type != StageType.END and FALLBACK_STAGE in stages:
+                reverse[FALLBACK_STAGE].add(stage_id)
+        can_end = _reachable(set(end_ids), reverse)
+        for stage_id in stages:
+            if stage_id not in can_end:
+                report.errors.append(f"stage '{stage_id}' can never reach an END stage")
+
+    report.cycles = _cycles(edges)
+    return report
+
+
+def artifact_path(config_path: str) -> str:
+    """Default compiled artifact location for a config file"""
+    return os.path.splitext(config_path)[0] + ".pkl"
+
+
+@lru_cache(maxsize=None)
+def code_digest() -> str:
+    """Digest of the code an artifact's pickled classes come from"""
+    digest = hashlib.sha256()
+    for path in ARTIFACT_CODE:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def write_artifact(registry: Any, path: str) -> None:
+    """
+    Pickle a compiled registry after a header naming the format, code and
+    config it was built from; written to a temp file and renamed so readers
+    never see half a file
+    """
+    header = {"format": ARTIFACT_FORMAT, "code": code_digest(), "digest": getattr(registry, "digest", None)}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(registry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path: str, source_digest: Optional[str] = None) -> Optional[Any]:
+    """
+    Load a compiled registry, or None if it is missing, unreadable, from
+    another format version or code, or compiled from a config whose digest
+    isn't `source_digest`.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            # Only the header is unpickled until the artifact is known to match
+            if not isinstance(header, dict) or header.get("format") != ARTIFACT_FORMAT:
+                return None
+            if header.get("code") != code_digest():
+                logger.debug("Ignoring flow artifact %s built by other code", path)
+                return None
+            if source_digest is not None and header.get("digest") != source_digest:
+                return None
+            registry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Unpickling can fail in many ways (truncated file, renamed classes, changed
+        # models); any of them just means compiling from the JSON
+        logger.warning("Ignoring unreadable flow artifact %s: %s", path, e)
+        return None
+    return registry
+
+
+def main() -> None:
+    from langgraph_app.stage_registry import compile_config, stage_config_path
+
+    parser = argparse.ArgumentParser(description="Validate and precompile a YojnaPath stage flow")
+    parser.add_argument("config", nargs="?", default=None, help="Stage config JSON (default: the repo's stage_config.json)")
+    parser.add_argument("-o", "--output", default=None, help="Artifact path (default: next to the config, .pkl)")
+    parser.add_argument("--check", action="store_true", help="Only validate, don't write the artifact")
+    args = parser.parse_args()
+
+    config_path = args.config or stage_config_path()
+    try:
+        registry, report = compile_config(config_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {config_path}: {e}")
+        sys.exit(1)
+
+    for warning in report.warnings:
+        print(f"⚠️  {warning}")
+    for cycle in report.cycles:
+        print(f"🔁 loop: {', '.join(cycle)}")
+    for error in report.errors:
+        print(f"❌ {error}")
+    if not report.ok:
+        sys.exit(1)
+
+    print(f"✅ {config_path}: {len(registry.stages)} stages OK")
+    if not args.check:
+        output = args.output or artifact_path(config_path)
+        write_artifact(registry, output)
+        print(f"📦 Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
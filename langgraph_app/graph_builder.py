@@ -1,38 +1,102 @@
+import asyncio
 import os
-import json
 import sys
 from typing import Dict, Any, TypedDict, Annotated, Literal, Optional, cast, List, Sequence
 from datetime import datetime
 import operator
+import time
+import logging
+from functools import lru_cache
 from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from pydantic import create_model
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_groq import ChatGroq
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from models import StageType, Stage, NextStage, LLMResponse
+from langgraph_app.logging_utils import sensitive
+from langgraph_app.speculation import consume_speculation
+from langgraph_app.prerouter import consume_preroute, drop_preroute
+from langgraph_app.tool_executor import default_tool_executor, format_tool_result
+from langgraph_app.stage_registry import DEFAULT_FLOW, StageRegistry, current_registry, get_registry
+from langgraph_app.tenants import tenant_limiter
+from langgraph_app.clarification import answer_clarification, clarification_options, clarify_reason
+from langgraph_app.metrics import (
+    CANCELLED_TURNS,
+    CLARIFICATION_ANSWERS,
+    CLARIFICATIONS,
+    FAILED_TURNS,
+    INVALID_TRANSITIONS,
+    LLM_CONFIDENCE,
+    STAGE_REVERSALS,
+    STAGE_TRANSITIONS,
+    TURN_LATENCY,
+)
+from langgraph_app.model_router import DEFAULT_TIER, TIER_NONE, model_for_tier, record_turn, stage_tier
+from langgraph_app.text_normalizer import normalize_utterance
+from langgraph_app.templates import (
+    TemplateError,
+    clarification_question,
+    default_locale,
+    failed_turn_reply,
+    render_stage_reply,
+    resolve_locale,
+)
+from langgraph_app.llm_client import LLMContentError, llm_client
+from langgraph_app.llm_scheduler import llm_context, llm_scheduler
 
-# Load stage configuration
-with open("stage_config.json", "r") as f:
-    stages_data = json.load(f)
+logger = logging.getLogger(__name__)
 
-# Create stage objects from configuration
-stages: Dict[str, Stage] = {}
-for stage_data in stages_data:
-    stage = Stage(**stage_data)
-    stages[stage.id] = stage
+def __getattr__(name: str) -> Any:
+    # `stages` always refers to the latest hot-reloaded stage config
+    if name == "stages":
+        return current_registry().stages
+    # The LLM clients are created on first use, not at import
+    if name == "llm":
+        return get_llm()
+    if name == "structured_llm":
+        return get_structured_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize Groq LLM with structured output
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0.7
-)
-structured_llm = llm.with_structured_output(LLMResponse)
+@lru_cache(maxsize=None)
+def get_llm(tier: str = DEFAULT_TIER) -> Any:
+    """Groq chat model for a model tier (small/large), created on first use (needs GROQ_API_KEY)"""
+    # langchain_groq pulls in the groq SDK and httpx; only pay for it when a turn needs the LLM
+    from langchain_groq import ChatGroq
+    
+    # Load environment variables from .env file
+    load_dotenv()
+    return ChatGroq(
+        model=model_for_tier(tier),
+        temperature=0.7,
+        # LLMClient retries, and the scheduler waits out 429s for every session at once
+        max_retries=0
+    )
+
+@lru_cache(maxsize=None)
+def stage_response_model(allowed_stages: tuple[str, ...]) -> type[LLMResponse]:
+    """LLMResponse whose next_stage schema is an enum of `allowed_stages`, built once per transition set"""
+    return create_model(
+        "LLMResponse",
+        __base__=LLMResponse,
+        __doc__=LLMResponse.__doc__,
+        next_stage=(Literal[allowed_stages], ...),
+    )
+
+@lru_cache(maxsize=None)
+def get_structured_llm(tier: str = DEFAULT_TIER, allowed_stages: Optional[tuple[str, ...]] = None) -> Any:
+    """
+    The tier's Groq LLM with structured output, created on first use.
+    
+    With `allowed_stages` (a stage's transitions) the model can only answer
+    with one of them as next_stage; anything else fails to parse.
+    """
+    schema = stage_response_model(allowed_stages) if allowed_stages else LLMResponse
+    return get_llm(tier).with_structured_output(schema, include_raw=True)
 
 # Custom reducer for string values
 def last_value(a: Any, b: Any) -> Any:
@@ -44,22 +108,114 @@ def append_list(a: list, b: list) -> list:
     """Append lists."""
     return a + b
 
+# Reducer for the conversation history
+def append_messages(a: list, b: list) -> list:
+    """
+    Append messages. One with the id of the history's last message replaces it
+    (a reply the caller barged into, cut down to what they heard).
+    """
+    merged = list(a)
+    for message in b:
+        if merged and message.id is not None and message.id == merged[-1].id:
+            merged[-1] = message
+        else:
+            merged.append(message)
+    return merged
+
+# Custom reducer for dicts
+def merge_dict(a: Optional[dict], b: Optional[dict]) -> dict:
+    """Merge dicts, later keys win."""
+    return {**(a or {}), **(b or {})}
+
 # Define the simplified state schema
 class State(TypedDict, total=False):
     conversation_id: Annotated[str, last_value]
     current_stage: Annotated[str, last_value]
-    messages: Annotated[List[HumanMessage | AIMessage], append_list]
+    messages: Annotated[List[HumanMessage | AIMessage], append_messages]
     user_input: Annotated[str, last_value]
+    tool_context: Annotated[str, last_value]
+    # Flow (tenant) the call belongs to and the stage config version it is pinned to
+    flow: Annotated[str, last_value]
+    config_version: Annotated[int, last_value]
+    # Reply locale (hi/en) and values for {slot} placeholders in static stage templates
+    locale: Annotated[str, last_value]
+    slots: Annotated[Dict[str, str], merge_dict]
+    # One TURN_LOG_FIELDS row per processed turn, for the call archive
+    turns: Annotated[List[list], append_list]
+    # Next stages the caller was just asked to choose between
+    clarify_options: Annotated[List[str], last_value]
+
+# Column order of State["turns"] rows
+TURN_LOG_FIELDS = ("stage", "next_stage", "latency_ms", "input_tokens", "output_tokens", "failed", "clarified")
+
+def _turn_row(stage_id: str, next_stage_id: str, latency_s: float = 0.0,
+              usage: Optional[Dict[str, Any]] = None, failed: bool = False, clarified: bool = False) -> list:
+    usage = usage or {}
+    return [stage_id, next_stage_id, round(latency_s * 1e3, 1),
+            usage.get("input_tokens", 0), usage.get("output_tokens", 0), int(failed), int(clarified)]
+
+def _asked_last_turn(state: State) -> bool:
+    """Whether the previous turn asked the caller to clarify (rows before that column have 6 fields)"""
+    turns = state.get("turns") or []
+    column = TURN_LOG_FIELDS.index("clarified")
+    return bool(turns) and len(turns[-1]) > column and bool(turns[-1][column])
 
 def get_start_stage() -> Stage:
     """Get the start stage from configuration"""
-    for stage in stages.values():
-        if stage.type == StageType.START:
-            return stage
-    raise ValueError("No start stage found in configuration")
+    return current_registry().start_stage
+
+def stage_registry_for(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> StageRegistry:
+    """
+    Stage config the conversation is pinned to; new conversations get the
+    latest of their flow (the state's, else the graph config's, else the default)
+    """
+    flow = state.get("flow") or ((config or {}).get("configurable") or {}).get("flow") or DEFAULT_FLOW
+    return get_registry(state.get("config_version"), flow)
 
-def build_stage_prompt(stage: Stage, messages: List[HumanMessage | AIMessage]) -> str:
-    """Build the prompt for the current stage including context"""
+def resolve_stage(registry: StageRegistry, stage_id: Optional[str]) -> Stage:
+    """Look up a stage, falling back to the start stage if it isn't in this config version"""
+    if not stage_id:
+        return registry.start_stage
+    stage = registry.stages.get(stage_id)
+    if stage is None:
+        logger.warning("Stage %s not in config version %d, restarting at %s",
+                       stage_id, registry.version, registry.start_stage.id)
+        return registry.start_stage
+    return stage
+
+def parse_llm_output(output: Any) -> tuple[LLMResponse, Optional[Dict[str, int]]]:
+    """Normalize structured LLM output into an LLMResponse and its token usage"""
+    usage = None
+    if isinstance(output, dict) and "parsed" in output:
+        # include_raw=True returns {"raw": AIMessage, "parsed": ..., "parsing_error": ...}
+        raw = output.get("raw")
+        usage = getattr(raw, "usage_metadata", None)
+        if output.get("parsing_error") or output.get("parsed") is None:
+            raise ValueError(f"Could not parse LLM output: {output.get('parsing_error')}")
+        output = output["parsed"]
+    
+    if isinstance(output, dict):
+        return LLMResponse(**output), usage
+    return output, usage
+
+def stage_prompt_parts(stage_id: str, registry: Optional[StageRegistry] = None) -> tuple[str, str]:
+    """Static prompt text before and after the conversation context, precompiled per config version"""
+    return (registry or current_registry()).prompt_parts[stage_id]
+
+def build_stage_prompt(
+    stage: Stage,
+    messages: List[HumanMessage | AIMessage],
+    context: str = "",
+    registry: Optional[StageRegistry] = None
+) -> str:
+    """Build the prompt for the current stage including context
+    
+    Args:
+        stage: The current stage.
+        messages: Conversation history, newest last.
+        context: Pre-formatted tool results to ground the answer in.
+        registry: Stage config the conversation is pinned to (default: the default flow's latest).
+    """
     
     # Get conversation history (last 3 exchanges)
     recent_messages = messages[-6:] if len(messages) > 6 else messages
@@ -70,186 +226,544 @@ def build_stage_prompt(stage: Stage, messages: List[HumanMessage | AIMessage]) -
         for msg in recent_messages:
             if isinstance(msg, HumanMessage):
                 conversation_context += f"User: {msg.content}\n"
-            elif isinstance(msg, AIMessage):
+            elif isinstance(msg, AIMessage) and msg.content:
+                # Empty when the caller barged in before hearing any of the reply
                 conversation_context += f"Assistant: {msg.content}\n"
     
-    # Get possible next stages for context
-    next_stages_info = ""
-    if stage.nextStages:
-        next_stages_info = "\n\nPossible next stages:\n"
-        for next_stage in stage.nextStages:
-            next_stage_obj = stages.get(next_stage.nextStageId)
-            if next_stage_obj:
-                next_stages_info += f"- {next_stage.nextStageId} ({next_stage_obj.name}): {next_stage.condition}\n"
+    if context:
+        conversation_context += f"\n\nRelevant information (use it to answer):\n{context}\n"
     
-    prompt = f"""You are YojnaPath, a helpful government scheme assistant for rural citizens.
-
-Current Stage: {stage.name}
-Stage Description: {stage.prompt}
+    head, tail = stage_prompt_parts(stage.id, registry)
+    return head + conversation_context + tail
 
-{conversation_context}
+def latest_user_text(messages: Sequence[HumanMessage | AIMessage]) -> str:
+    """Text of the last message if it is from the user, else an empty string"""
+    if messages and isinstance(messages[-1], HumanMessage) and isinstance(messages[-1].content, str):
+        return messages[-1].content
+    return ""
 
-{next_stages_info}
+def turn_user_text(state: State) -> str:
+    """The user's message for this turn, whether passed as user_input or as the last message"""
+    return state.get("user_input", "") or latest_user_text(state.get("messages", []))
 
-Instructions:
-1. Respond helpfully to the user's message
-2. Choose the most appropriate next stage based on the user's intent
-3. If user wants to end conversation or says goodbye, choose 'farewell'
-4. If user has scheme-related doubts, choose 'scheme_doubt_solving'
-5. If user needs application help, choose 'kb_tool_call'
+def stage_tool_calls(stage: Stage, user_text: str, skip: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """Tool invocations declared for a stage in stage_config.json"""
+    calls = []
+    for stage_tool in stage.tools or []:
+        if stage_tool.name in skip:
+            continue
+        tool_input = dict(stage_tool.args)
+        if stage_tool.inputArg:
+            tool_input[stage_tool.inputArg] = user_text
+        calls.append({"tool": stage_tool.name, "tool_input": tool_input})
+    return calls
 
-Respond with:
-- response: Your helpful response to the user
-- next_stage: The ID of the next appropriate stage
-- confidence: Your confidence in the stage choice (0.0 to 1.0)"""
+def _format_tool_results(calls: List[Dict[str, Any]], results: List[Any]) -> List[str]:
+    formatted = []
+    for call, result in zip(calls, results):
+        if isinstance(result, BaseException):
+            logger.warning("Tool %s failed: %r", call["tool"], result)
+            continue
+        formatted.append(format_tool_result(call["tool"], result))
+    return formatted
 
-    return prompt
+def fetch_stage_context(stage: Stage, user_text: str) -> str:
+    """Run a stage's tools one after another (sync path) and format the results"""
+    calls = stage_tool_calls(stage, user_text)
+    executor = default_tool_executor()
+    results = []
+    for call in calls:
+        try:
+            results.append(executor.invoke(call))
+        except Exception as e:
+            results.append(e)
+    return "\n".join(_format_tool_results(calls, results))
 
-def process_stage(state: State) -> State:
-    """Process the current stage and generate LLM response with next stage"""
+async def afetch_stage_context(stage: Stage, user_text: str, prefetched: Optional[Dict[str, str]] = None) -> str:
+    """
+    Run a stage's tools concurrently and format the results.
     
-    current_stage_id = state.get("current_stage")
-    if not current_stage_id:
-        # Start with the initial stage
-        start_stage = get_start_stage()
-        current_stage_id = start_stage.id
-        state["current_stage"] = current_stage_id
+    Results in `prefetched` (tool name -> formatted result of the same call
+    the stage declares) are used instead of calling the tool again.
+    """
+    prefetched = prefetched or {}
+    calls = stage_tool_calls(stage, user_text, skip=list(prefetched))
+    formatted = list(prefetched.values())
+    if calls:
+        formatted += _format_tool_results(calls, await default_tool_executor().invoke_many(calls))
+    return "\n".join(formatted)
+
+def _turn_stage(state: State, registry: StageRegistry) -> tuple[Stage, Dict[str, Any]]:
+    """
+    The stage handling this turn and the state updates that go with it: the
+    stage the caller picked if the last turn asked them to clarify.
+    """
+    current_stage = resolve_stage(registry, state.get("current_stage"))
+    updates: Dict[str, Any] = {"flow": registry.flow, "config_version": registry.version}
+    options = state.get("clarify_options")
+    user_text = turn_user_text(state)
+    if not options or not user_text:
+        return current_stage, updates
+    updates["clarify_options"] = []
+    chosen = answer_clarification(user_text, options)
+    CLARIFICATION_ANSWERS.inc(current_stage.id, "local" if chosen else "llm")
+    if chosen is None or chosen not in registry.stages:
+        return current_stage, updates
+    logger.info("Clarified stage transition: %s -> %s", current_stage.id, chosen,
+                extra={"conversation_id": state.get("conversation_id")})
+    STAGE_TRANSITIONS.inc(current_stage.id, chosen)
+    updates["current_stage"] = chosen
+    return registry.stages[chosen], updates
+
+def run_stage_tools(state: State, config: Optional[RunnableConfig] = None) -> State:
+    """Tool node: call the tools the current stage declares"""
+    registry = stage_registry_for(state, config)
+    current_stage, updates = _turn_stage(state, registry)
+    if current_stage.type == StageType.END or not current_stage.tools or stage_tier(current_stage) == TIER_NONE:
+        return {"tool_context": "", **updates}
+    return {"tool_context": fetch_stage_context(current_stage, turn_user_text(state)), **updates}
+
+async def arun_stage_tools(state: State, config: RunnableConfig) -> State:
+    """Async tool node: concurrent tool calls, reusing results pre-fetched from STT partials"""
+    registry = stage_registry_for(state, config)
+    current_stage, updates = _turn_stage(state, registry)
+    thread_id = (config.get("configurable") or {}).get("thread_id") or state.get("conversation_id", "")
+    if current_stage.type == StageType.END or stage_tier(current_stage) == TIER_NONE:
+        # No tool calls this turn, so no pre-fetch can be used
+        drop_preroute(thread_id)
+        return {"tool_context": "", **updates}
     
-    current_stage = stages[current_stage_id]
+    user_text = turn_user_text(state)
+    # A pre-fetched result stands in only for the very call the stage declares for this text
+    prefetched = await consume_preroute(thread_id, stage_tool_calls(current_stage, user_text))
+    if not current_stage.tools:
+        return {"tool_context": "", **updates}
+    try:
+        context = await afetch_stage_context(current_stage, user_text, prefetched)
+    except asyncio.CancelledError:
+        # The caller barged in; shared tool calls nobody else waits for are cancelled too
+        CANCELLED_TURNS.inc(current_stage.id)
+        raise
+    return {"tool_context": context, **updates}
+
+def _prepare_turn(state: State) -> tuple[StageRegistry, Stage, List[HumanMessage | AIMessage], List[HumanMessage | AIMessage]]:
+    """Resolve the pinned config and current stage, and split the history from this turn's new messages"""
+    registry = stage_registry_for(state)
     messages = state.get("messages", [])
     user_input = state.get("user_input", "")
     
-    # Add user input to messages if provided
+    # Only new messages are returned; the append_messages reducer merges them into the history
+    new_messages: List[HumanMessage | AIMessage] = []
     if user_input:
-        messages.append(HumanMessage(content=user_input))
+        new_messages.append(HumanMessage(content=user_input))
+    return registry, resolve_stage(registry, state.get("current_stage")), messages, new_messages
+
+def _end_stage_turn(
+    state: State,
+    registry: StageRegistry,
+    current_stage: Stage,
+    new_messages: List,
+    locale: str
+) -> State:
+    """END stages don't call the LLM, they just return a final message"""
+    try:
+        final_message = render_stage_reply(current_stage, locale, state.get("slots"))
+    except TemplateError as e:
+        logger.warning("Stage %s template can't be rendered: %s", current_stage.id, e)
+        final_message = ""
+    final_message = final_message or "Thank you for using YojnaPath. Have a great day!"
+    new_messages.append(AIMessage(content=final_message))
+    return {
+        **state,
+        "messages": new_messages,
+        "turns": [_turn_row(current_stage.id, current_stage.id)],
+        "clarify_options": [],
+        "current_stage": current_stage.id,
+        "user_input": "",
+        "tool_context": "",
+        "config_version": registry.version
+    }
+
+def _static_turn(
+    state: State,
+    registry: StageRegistry,
+    current_stage: Stage,
+    new_messages: List,
+    locale: str
+) -> Optional[State]:
+    """
+    Static and no-model stages reply with their rendered template and take their
+    first transition; None if the template can't be rendered and the LLM should answer
+    """
+    try:
+        reply = render_stage_reply(current_stage, locale, state.get("slots"))
+    except TemplateError as e:
+        logger.warning("Stage %s template can't be rendered, asking the LLM: %s", current_stage.id, e)
+        return None
+    response = LLMResponse(response=reply, next_stage=registry.transitions[current_stage.id][0])
+    return _complete_turn(state, registry, current_stage, new_messages, response)
+
+def _complete_turn(
+    state: State,
+    registry: StageRegistry,
+    current_stage: Stage,
+    new_messages: List,
+    output: Any,
+    model: Optional[str] = None,
+    latency_s: float = 0.0,
+    locale: Optional[str] = None
+) -> State:
+    """Apply the structured LLM output: add the reply and move to a validated next stage"""
+    current_stage_id = current_stage.id
+    llm_response, usage = parse_llm_output(output)
+    record_turn(current_stage_id, model, latency_s, usage)
+    
+    # Determine next stage
+    next_stage_id = llm_response.next_stage
+    allowed_stages = registry.transitions[current_stage_id]
+    if next_stage_id not in allowed_stages and current_stage.nextStages:
+        logger.warning(
+            "Invalid stage transition: %s -> %s (allowed: %s)",
+            current_stage_id, next_stage_id, allowed_stages
+        )
+        _count_invalid_transition(registry, current_stage_id, next_stage_id)
+    
+    # A doubtful choice of next stage is put to the caller instead of guessed;
+    # never twice in a row, so an unclear answer can't loop
+    if model is not None and not _asked_last_turn(state):
+        reason = clarify_reason(current_stage, next_stage_id, allowed_stages, llm_response.confidence)
+        options = clarification_options(registry, current_stage) if reason else []
+        if options:
+            return _clarify_turn(state, registry, current_stage, new_messages, options, reason,
+                                 locale or resolve_locale(state), latency_s, usage)
+    
+    # Add AI response to messages, keeping token usage for replay/analytics
+    new_messages.append(AIMessage(content=llm_response.response, usage_metadata=usage))
+    
+    # Validate against the precompiled transition table; the flow compiler
+    # guarantees every allowed stage exists
+    if next_stage_id not in allowed_stages:
+        # Default to the first allowed stage (farewell if the stage has no transitions)
+        next_stage_id = allowed_stages[0]
+    
+    STAGE_TRANSITIONS.inc(current_stage_id, next_stage_id)
+    # Going straight back to the previous stage usually means the last jump was wrong
+    previous_turns = state.get("turns") or []
+    if previous_turns and previous_turns[-1][0] == next_stage_id != current_stage_id:
+        STAGE_REVERSALS.inc(current_stage_id)
+    # Static turns have no LLM confidence or latency
+    if model is not None:
+        TURN_LATENCY.observe(latency_s, current_stage_id)
+        if llm_response.confidence is not None:
+            LLM_CONFIDENCE.observe(llm_response.confidence, current_stage_id)
+    
+    logger.info(
+        "Stage transition: %s -> %s", current_stage_id, next_stage_id,
+        extra={"conversation_id": state.get("conversation_id"), "confidence": llm_response.confidence}
+    )
+    
+    return {
+        **state,
+        "messages": new_messages,
+        "turns": [_turn_row(current_stage_id, next_stage_id, latency_s, usage)],
+        "clarify_options": [],
+        "current_stage": next_stage_id,
+        "user_input": "",  # Clear user input after processing
+        "tool_context": "",
+        "config_version": registry.version
+    }
+
+def _clarify_turn(
+    state: State,
+    registry: StageRegistry,
+    current_stage: Stage,
+    new_messages: List,
+    options: List[NextStage],
+    reason: str,
+    locale: str,
+    latency_s: float = 0.0,
+    usage: Optional[Dict[str, Any]] = None
+) -> State:
+    """Ask which of the allowed next stages the caller meant; the conversation stays on its stage"""
+    logger.info("Asking to clarify the transition from %s (%s)", current_stage.id, reason,
+                extra={"conversation_id": state.get("conversation_id")})
+    CLARIFICATIONS.inc(current_stage.id, reason)
+    new_messages.append(AIMessage(content=clarification_question(options, locale), usage_metadata=usage))
+    return {
+        **state,
+        "messages": new_messages,
+        "turns": [_turn_row(current_stage.id, current_stage.id, latency_s, usage, clarified=True)],
+        "clarify_options": [option.nextStageId for option in options],
+        "current_stage": current_stage.id,
+        "user_input": "",
+        "tool_context": "",
+        "config_version": registry.version
+    }
+
+def _failed_turn(
+    state: State,
+    registry: StageRegistry,
+    current_stage: Stage,
+    new_messages: List,
+    error: Exception,
+    locale: str,
+    latency_s: float = 0.0
+) -> State:
+    """Template reply when no LLM tier could answer; the conversation stays on its stage"""
+    logger.error("Error in LLM call: %s", error, extra={"conversation_id": state.get("conversation_id")})
+    record_turn(current_stage.id, None, latency_s, failed=True)
+    FAILED_TURNS.inc(current_stage.id)
+    TURN_LATENCY.observe(latency_s, current_stage.id)
+    new_messages.append(AIMessage(content=failed_turn_reply(locale)))
+    return {
+        **state,
+        "messages": new_messages,
+        "turns": [_turn_row(current_stage.id, current_stage.id, latency_s, failed=True)],
+        "clarify_options": [],
+        "current_stage": current_stage.id,
+        "user_input": "",
+        "tool_context": "",
+        "config_version": registry.version
+    }
+
+async def scheduled_llm_call(tier: str, allowed_stages: Optional[tuple[str, ...]], prompt: str) -> Any:
+    """One structured-output request, queued under the model's rate limits (see llm_scheduler)"""
+    structured_llm = get_structured_llm(tier, allowed_stages)
+    return await llm_scheduler().submit(
+        model_for_tier(tier), lambda: structured_llm.ainvoke(prompt), prompt, key=(allowed_stages, prompt)
+    )
+
+def _speculation_usable(output: Any, allowed_stages: Sequence[str]) -> bool:
+    # Speculated before the final transcript, possibly under an older stage config:
+    # anything unparseable or outside the current transitions is asked again
+    try:
+        llm_response, _ = parse_llm_output(output)
+    except ValueError as e:
+        logger.debug("Discarding speculative output: %s", e)
+        return False
+    return llm_response.next_stage in allowed_stages
+
+def _requested_stage(output: Any) -> Optional[str]:
+    """next_stage of the model's structured-output tool call, whether or not it parsed"""
+    raw = output.get("raw") if isinstance(output, dict) else None
+    for tool_call in getattr(raw, "tool_calls", None) or []:
+        next_stage = (tool_call.get("args") or {}).get("next_stage")
+        if isinstance(next_stage, str):
+            return next_stage
+    return None
+
+def _count_invalid_transition(registry: StageRegistry, stage_id: str, requested: Optional[str]) -> None:
+    # Free-form LLM output would make unbounded label values
+    INVALID_TRANSITIONS.inc(stage_id, requested if requested in registry.stages else "unknown")
+
+def _validated(output: Any, registry: StageRegistry, stage_id: str) -> Any:
+    # Unparseable structured output (with the stage's schema, that includes a
+    # next_stage outside its transitions) is asked once more, then falls back a
+    # tier; it doesn't count against the tier's circuit breaker
+    try:
+        parse_llm_output(output)
+    except ValueError as e:
+        requested = _requested_stage(output)
+        if requested is not None and requested not in registry.transitions[stage_id]:
+            _count_invalid_transition(registry, stage_id, requested)
+        raise LLMContentError(str(e)) from e
+    return output
+
+def process_stage(state: State) -> State:
+    """Process the current stage and generate LLM response with next stage"""
+    registry, current_stage, messages, new_messages = _prepare_turn(state)
     
-    # For END stages, don't call LLM, just return a final message
     if current_stage.type == StageType.END:
-        final_message = current_stage.prompt or "Thank you for using YojnaPath. Have a great day!"
-        messages.append(AIMessage(content=final_message))
-        return {
-            **state,
-            "messages": messages,
-            "current_stage": current_stage_id,
-            "user_input": ""
-        }
+        return _end_stage_turn(state, registry, current_stage, new_messages, resolve_locale(state))
     
-    # Build stage-specific prompt
-    prompt = build_stage_prompt(current_stage, messages)
+    tier = stage_tier(current_stage)
+    if tier == TIER_NONE:
+        static_turn = _static_turn(state, registry, current_stage, new_messages, resolve_locale(state))
+        if static_turn is not None:
+            return static_turn
+        tier = DEFAULT_TIER
     
-    # Get structured response from LLM
+    # Build stage-specific prompt, grounded in the tool node's results
+    prompt = build_stage_prompt(current_stage, messages + new_messages, state.get("tool_context", ""), registry)
+    
+    # Get structured response from the stage's model tier, falling back to smaller tiers;
+    # the schema only admits the stage's transitions as next_stage
+    allowed_stages = registry.transitions[current_stage.id]
+    start = time.perf_counter()
     try:
-        response = structured_llm.invoke(prompt)
-        
-        # Ensure we have an LLMResponse object
-        if isinstance(response, dict):
-            llm_response = LLMResponse(**response)
-        else:
-            llm_response = response
-        
-        # Add AI response to messages
-        messages.append(AIMessage(content=llm_response.response))
-        
-        # Determine next stage
-        next_stage_id = llm_response.next_stage
-        
-        # Validate next stage is allowed from current stage
-        if current_stage.nextStages:
-            allowed_stages = [ns.nextStageId for ns in current_stage.nextStages]
-            if next_stage_id not in allowed_stages:
-                print(f"⚠️  Invalid stage transition: {current_stage_id} -> {next_stage_id}")
-                print(f"Allowed stages: {allowed_stages}")
-                # Default to first allowed stage if invalid
-                next_stage_id = allowed_stages[0] if allowed_stages else "farewell"
-        else:
-            # If no next stages defined, go to farewell
-            next_stage_id = "farewell"
-        
-        # Make sure the next stage exists
-        if next_stage_id not in stages:
-            print(f"⚠️  Stage {next_stage_id} not found, defaulting to farewell")
-            next_stage_id = "farewell"
-        
-        print(f"🔄 Stage transition: {current_stage_id} -> {next_stage_id}")
-        
-        return {
-            **state,
-            "messages": messages,
-            "current_stage": next_stage_id,
-            "user_input": ""  # Clear user input after processing
-        }
-        
+        # The flow's share of this process's LLM capacity
+        with tenant_limiter(registry.flow).slot():
+            output, used_tier = llm_client().call(
+                tier, lambda t: _validated(get_structured_llm(t, allowed_stages).invoke(prompt), registry, current_stage.id)
+            )
+        return _complete_turn(
+            state, registry, current_stage, new_messages, output,
+            model=model_for_tier(used_tier), latency_s=time.perf_counter() - start, locale=resolve_locale(state)
+        )
     except Exception as e:
-        print(f"Error in LLM call: {e}")
-        # Fallback response
-        messages.append(AIMessage(content="I apologize, but I'm having trouble processing your request. Could you please try again?"))
-        return {
-            **state,
-            "messages": messages,
-            "current_stage": "farewell",  # Go to farewell on error
-            "user_input": ""
-        }
+        return _failed_turn(state, registry, current_stage, new_messages, e, resolve_locale(state), time.perf_counter() - start)
+
+async def aprocess_stage(state: State, config: RunnableConfig) -> State:
+    """
+    Async variant of process_stage used by ainvoke/astream.
+    
+    Reuses a speculative LLM call started on the interim transcript when the
+    final user message matches it closely enough.
+    """
+    registry, current_stage, messages, new_messages = _prepare_turn(state)
+    
+    if current_stage.type == StageType.END:
+        return _end_stage_turn(state, registry, current_stage, new_messages, resolve_locale(state, config))
+    
+    tier = stage_tier(current_stage)
+    if tier == TIER_NONE:
+        static_turn = _static_turn(state, registry, current_stage, new_messages, resolve_locale(state, config))
+        if static_turn is not None:
+            return static_turn
+        tier = DEFAULT_TIER
+    
+    history = messages + new_messages
+    thread_id = (config.get("configurable") or {}).get("thread_id") or state.get("conversation_id", "")
+    
+    user_text = latest_user_text(history)
+    allowed_stages = registry.transitions[current_stage.id]
+    
+    start = time.perf_counter()
+    try:
+        used_tier = tier
+        output = await consume_speculation(thread_id, current_stage.id, user_text)
+        if output is not None and not _speculation_usable(output, allowed_stages):
+            output = None
+        if output is None:
+            prompt = build_stage_prompt(current_stage, history, state.get("tool_context", ""), registry)
+            
+            async def call_tier(t: str) -> Any:
+                # The schema only admits the stage's transitions as next_stage
+                return _validated(await scheduled_llm_call(t, allowed_stages, prompt), registry, current_stage.id)
+            
+            # Retried, hedged and, if the tier is down, answered by a smaller tier,
+            # within the flow's share of this process's LLM capacity
+            async with tenant_limiter(registry.flow).aslot():
+                with llm_context(thread_id):
+                    output, used_tier = await llm_client().acall(tier, call_tier)
+        return _complete_turn(
+            state, registry, current_stage, new_messages, output,
+            model=model_for_tier(used_tier), latency_s=time.perf_counter() - start,
+            locale=resolve_locale(state, config)
+        )
+    except asyncio.CancelledError:
+        # The caller barged in: the LLM request is abandoned and nothing of the turn is committed
+        CANCELLED_TURNS.inc(current_stage.id)
+        raise
+    except Exception as e:
+        return _failed_turn(
+            state, registry, current_stage, new_messages, e, resolve_locale(state, config), time.perf_counter() - start
+        )
 
 def should_continue(state: State) -> str:
     """Determine if conversation should continue or end"""
     current_stage_id = state.get("current_stage")
     user_input = state.get("user_input", "")
     
-    print(f"🎯 Current stage: {current_stage_id}, User input: '{user_input}'")
+    logger.debug("Current stage: %s, user input: %s", current_stage_id, sensitive(user_input))
     
     if current_stage_id:
-        stage = stages.get(current_stage_id)
+        stage = stage_registry_for(state).stages.get(current_stage_id)
         if stage and stage.type == StageType.END:
-            print("🏁 Ending conversation - reached END stage")
+            logger.debug("Ending conversation - reached END stage")
             return END
     
     # If there's no user input, also end (to prevent infinite loops)
     if not user_input.strip():
-        print("🏁 Ending conversation - no user input")
+        logger.debug("Ending conversation - no user input")
         return END
         
-    print("➡️  Continuing conversation")
+    logger.debug("Continuing conversation")
     return "continue"
 
-def build_yojnapath_graph():
-    """Build a simplified LangGraph for conversational flow"""
+def build_yojnapath_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
+    """
+    Build a simplified LangGraph for conversational flow
+    
+    Args:
+        checkpointer: Persists state per thread_id between invocations. Needed when
+            callers only send the new user message each turn (the LiveKit adapter).
+    """
     
     # Create the graph
     builder = StateGraph(State)
     
-    # Add a single conversation node
-    builder.add_node("conversation", process_stage)
+    # Nodes have a sync version for invoke and an async one for ainvoke/astream
+    builder.add_node("tools", RunnableLambda(run_stage_tools, afunc=arun_stage_tools))
+    builder.add_node("conversation", RunnableLambda(process_stage, afunc=aprocess_stage))
     
-    # Set entry point
-    builder.set_entry_point("conversation")
+    # Stage tools run first so their results ground the reply without an extra LLM round trip
+    builder.set_entry_point("tools")
+    builder.add_edge("tools", "conversation")
     
     # Add conditional edges
     builder.add_conditional_edges(
         source="conversation",
         path=should_continue,
         path_map={
-            "continue": "conversation",
+            "continue": "tools",
             END: END
         }
     )
     
     # Compile the graph
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer)
 
-def init_conversation(conversation_id: str = "default") -> State:
-    """Initialize a new conversation"""
-    start_stage = get_start_stage()
+def init_conversation(conversation_id: str = "default", locale: Optional[str] = None, flow: str = DEFAULT_FLOW) -> State:
+    """Initialize a new conversation of a flow"""
+    registry = current_registry(flow)
     
     return {
         "conversation_id": conversation_id,
-        "current_stage": start_stage.id,
+        "flow": flow,
+        "current_stage": registry.start_stage.id,
         "messages": [],
-        "user_input": ""
+        "user_input": "",
+        "tool_context": "",
+        "config_version": registry.version,
+        "locale": locale or default_locale(),
+        "slots": {},
+        "turns": [],
+        "clarify_options": []
     }
 
+def conversation_finished(state: Dict[str, Any]) -> bool:
+    """Whether the conversation has reached an END stage"""
+    stage_id = state.get("current_stage")
+    stage = stage_registry_for(state).stages.get(stage_id) if stage_id else None
+    return stage is not None and stage.type == StageType.END
+
+async def aclear_conversation(graph: Any, config: RunnableConfig) -> None:
+    """Forget the thread's checkpoint, so the next call on it starts at the start stage"""
+    if graph.checkpointer is None:
+        return
+    try:
+        await graph.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+    except Exception as e:
+        logger.warning("Could not clear the state of the call: %s", e)
+
+async def aopen_conversation(graph: Any, config: RunnableConfig) -> None:
+    """
+    Start a call on a thread: a conversation left at an END stage (the caller
+    rang off and is calling again) is cleared, an unfinished one is resumed
+    """
+    try:
+        snapshot = await graph.aget_state(config)
+    except Exception as e:
+        logger.warning("Could not read the state of the call: %s", e)
+        return
+    if snapshot and snapshot.values and conversation_finished(snapshot.values):
+        logger.info("Conversation on thread %s had ended, starting over", config["configurable"]["thread_id"])
+        await aclear_conversation(graph, config)
+
 def add_user_input(state: State, user_input: str) -> State:
-    """Add user input to the state"""
+    """Add user input to the state, normalized like the voice path's messages"""
     return {
         **state,
-        "user_input": user_input
+        "user_input": normalize_utterance(user_input)
     }
@@ -1,5 +1,13 @@
 """
 Updated LangGraphAdapter that works with current LiveKit agents API
+
+Barge-in: LiveKit cancels a turn's stream when the caller interrupts it
+before the reply is ready, which cancels the graph run and with it the
+turn's LLM request and tool calls. A reply interrupted while it was being
+played is committed to the graph's history as far as the caller heard it,
+with the next turn's input.
+
+User messages are normalized (text_normalizer) before they reach the graph.
 """
 
 from typing import Any, Optional, Dict
@@ -13,10 +21,15 @@ from langgraph.types import Command
 from langgraph.errors import GraphInterrupt
 from httpx import HTTPStatusError
 
+from langgraph_app.text_normalizer import normalize_utterance
+
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Spoken when the graph fails mid-turn
+ERROR_REPLY = "माफ़ करें, मुझे कुछ तकनीकी समस्या हो रही है। कृपया दोबारा कोशिश करें।"
+
 
 # https://github.com/livekit/agents/issues/1370#issuecomment-2588821571
 class FlushSentinel(str, SynthesizeStream._FlushSentinel):
@@ -50,7 +63,12 @@ class LangGraphStream(llm.LLMStream):
         )
 
         messages = [input_human_message] if input_human_message else []
+        # The previous reply replaces its full text in the history if the caller cut it short
+        if heard_reply := self._heard_reply():
+            messages.insert(0, heard_reply)
         input = {"messages": messages}
+        self._llm._reply = None
+        self._llm._spoken_before = self._last_spoken_id()
 
         # Check if we need to respond to an interrupt
         if interrupt := await self._get_interrupt():
@@ -67,6 +85,7 @@ class LangGraphStream(llm.LLMStream):
                 if mode == "messages":
                     if chunk := await self._to_livekit_chunk(data[0]):
                         self._event_ch.send_nowait(chunk)
+                        self._note_reply(data[0])
 
                 if mode == "custom":
                     if isinstance(data, dict) and (event := data.get("type")):
@@ -83,9 +102,7 @@ class LangGraphStream(llm.LLMStream):
         except Exception as e:
             logger.error(f"Error in LangGraph stream: {e}")
             # Send error message to user
-            error_chunk = self._create_livekit_chunk(
-                "माफ़ करें, मुझे कुछ तकनीकी समस्या हो रही है। कृपया दोबारा कोशिश करें।"
-            )
+            error_chunk = self._create_livekit_chunk(ERROR_REPLY)
             self._event_ch.send_nowait(error_chunk)
 
         # If interrupted, send the string as a message
@@ -93,6 +110,47 @@ class LangGraphStream(llm.LLMStream):
             if chunk := await self._to_livekit_chunk(interrupt.value):
                 self._event_ch.send_nowait(chunk)
 
+    def _last_spoken_id(self) -> Optional[str]:
+        return next(
+            (m.id for m in reversed(self.chat_ctx.items) if getattr(m, "role", None) == "assistant"), None
+        )
+
+    def _note_reply(self, msg: Any) -> None:
+        """Remember the graph reply sent to LiveKit, to compare with what gets played"""
+        if not isinstance(msg, AIMessage) or not isinstance(msg.content, str) or msg.id is None:
+            return
+        reply = self._llm._reply
+        if reply is not None and reply.id == msg.id:
+            # Streamed in chunks
+            reply = AIMessage(content=reply.content + msg.content, id=reply.id, usage_metadata=reply.usage_metadata)
+        else:
+            reply = AIMessage(content=msg.content, id=msg.id, usage_metadata=msg.usage_metadata)
+        self._llm._reply = reply
+
+    def _heard_reply(self) -> Optional[AIMessage]:
+        """
+        The previous turn's reply cut down to what LiveKit played of it, or None
+        if it was played in full. LiveKit adds the played part to the chat
+        context, marked interrupted, and nothing if the caller barged in first.
+        """
+        reply = self._llm._reply
+        if reply is None:
+            return None
+        spoken = [m for m in self.chat_ctx.items if getattr(m, "role", None) == "assistant"]
+        if self._llm._spoken_before is not None:
+            ids = [m.id for m in spoken]
+            if self._llm._spoken_before not in ids:
+                # The chat context was trimmed since; what was played is unknown
+                return None
+            spoken = spoken[ids.index(self._llm._spoken_before) + 1:]
+        if spoken and not spoken[0].interrupted:
+            return None
+        heard = (spoken[0].text_content or "") if spoken else ""
+        if heard.strip() == reply.content.strip():
+            return None
+        logger.debug("Caller barged in after %d of %d reply characters", len(heard), len(reply.content))
+        return AIMessage(content=heard, id=reply.id, usage_metadata=reply.usage_metadata)
+
     async def _get_interrupt(self) -> Optional[str]:
         try:
             state = await self._graph.aget_state(config=self._llm._config)
@@ -120,12 +178,12 @@ class LangGraphStream(llm.LLMStream):
 
     def _to_message(self, msg: llm.ChatMessage) -> HumanMessage:
         if isinstance(msg.content, str):
-            content = msg.content
+            content = normalize_utterance(msg.content)
         elif isinstance(msg.content, list):
             content = []
             for c in msg.content:
                 if isinstance(c, str):
-                    content.append({"type": "text", "text": c})
+                    content.append({"type": "text", "text": normalize_utterance(c)})
                 elif isinstance(c, llm.ChatImage):
                     if isinstance(c.image, str):
                         content.append({"type": "image_url", "image_url": c.image})
@@ -179,6 +237,9 @@ class LangGraphAdapter(llm.LLM):
         super().__init__()
         self._graph = graph
         self._config = config or {}
+        # Last graph reply sent to LiveKit, and the chat item played before it
+        self._reply: Optional[AIMessage] = None
+        self._spoken_before: Optional[str] = None
 
     def chat(
         self,
@@ -1,7 +1,8 @@
 from dotenv import load_dotenv
 import os
 import sys
-from uuid import uuid4, uuid5, UUID
+import json
+import logging
 from typing import cast
 from livekit import agents
 from livekit.agents import AgentSession, Agent, RoomInputOptions
@@ -11,35 +12,40 @@ from livekit.plugins import (
     silero,
 )
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
-from langgraph_adapter import LangGraphAdapter
 
 # Add the parent directory to the Python path for your imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import your LangGraph implementation
 from langgraph_app.graph_builder import (
+    aopen_conversation,
     build_yojnapath_graph,
     init_conversation,
     add_user_input,
     stages,
     State
 )
+from langgraph_app.agent_setup import AGENT_LOCALE, GOOGLE_CREDENTIALS_PATH, get_thread_id, make_tts, prewarm_resources
+from langgraph_app.langgraph_adapter import LangGraphAdapter
+from langgraph_app.logging_utils import setup_logging, sensitive
+from langgraph_app.speculation import SpeculativeResponder, speculation_enabled
+from langgraph_app.prerouter import PreRouter, preroute_enabled
+from langgraph_app.stage_registry import current_registry
+from langgraph_app.tenants import call_flow
+from langgraph_app.templates import render_stage_reply
+from langgraph_app.state_store import shared_checkpointer
+from langgraph_app.call_archive import end_call
+from langgraph_app.admission import FULL_LOAD, AdmissionController, admission_enabled, start_load_reporter
+from langgraph.checkpoint.memory import MemorySaver
 
 load_dotenv()
 
+logger = logging.getLogger("yojnapath-agent")
+
 speech_key = os.getenv("GOOGLE_SPEECH_KEY")
 # No region needed for Google STT/TTS
 
 
-# For generating thread IDs for LangGraph state management
-NAMESPACE = UUID("41010b5d-5447-4df5-baf2-97d69f2e9d06")
-
-def get_thread_id(sid: str | None) -> str:
-    """Generate a unique thread ID for each participant"""
-    if sid is not None:
-        return str(uuid5(NAMESPACE, sid))
-    return str(uuid4())
-
 class YojnaPathAssistant(Agent):
     def __init__(self) -> None:
         super().__init__(
@@ -51,71 +57,69 @@ class YojnaPathAssistant(Agent):
             5. विनम्र और सहायक रहना"""
         )
 
-def prewarm_resources():
-    """Pre-warm necessary resources"""
-    try:
-        # Check if Groq API key is set
-        if not os.getenv("GROQ_API_KEY"):
-            print("⚠️  Warning: GROQ_API_KEY environment variable not set!")
-            print("Please set your Groq API key in the .env file to use the LLM functionality.")
-            raise ValueError("Missing GROQ_API_KEY")
-        
-        # Build and test the graph
-        print("📊 Pre-warming YojnaPath LangGraph...")
-        graph = build_yojnapath_graph()
-        print("✅ Graph pre-warmed successfully!")
-        return graph
-    except Exception as e:
-        print(f"❌ Error pre-warming resources: {e}")
-        raise
-
 async def entrypoint(ctx: agents.JobContext):
     if not speech_key:
         raise ValueError("Missing Google Speech credentials")
 
     # Connect and wait for participant
     await ctx.connect()
+    # This call's LLM/TTS requests and loop lag count towards the worker's load
+    start_load_reporter()
     participant = await ctx.wait_for_participant()
-    thread_id = get_thread_id(participant.sid)
+    # The identity survives reconnects (the sid doesn't), so a caller whose call dropped
+    # resumes their conversation from the shared state store on any worker; a call that
+    # ended clears its thread, so calling again starts over
+    thread_id = get_thread_id(participant.identity)
+    # The job metadata picks the flow (tenant) this call runs
+    try:
+        flow = call_flow(json.loads(ctx.job.metadata) if ctx.job.metadata else None)
+    except (json.JSONDecodeError, AttributeError):
+        flow = call_flow(None)
     
-    print(f"🚀 Starting YojnaPath voice assistant for participant {participant.identity} (thread ID: {thread_id})")
+    logger.info(
+        "Starting YojnaPath voice assistant for participant %s (thread ID: %s, flow: %s)",
+        sensitive(participant.identity), thread_id, flow
+    )
 
     try:
         # Build your YojnaPath graph
-        print("📊 Building YojnaPath LangGraph...")
-        graph = build_yojnapath_graph()
-        print("✅ Graph built successfully!")
+        # The adapter only sends the new user message, so state is kept per thread,
+        # in the shared state store when YOJNAPATH_STATE_STORE is set
+        graph = build_yojnapath_graph(checkpointer=shared_checkpointer() or MemorySaver())
+        logger.debug("Graph built for thread %s", thread_id)
         
         # Create LangGraph adapter with thread configuration
-        langgraph_llm = LangGraphAdapter(
-            graph=graph,
-            config={
-                "configurable": {
-                    "thread_id": thread_id
-                },
-                "recursion_limit": 10
-            }
-        )
+        graph_config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "locale": AGENT_LOCALE,
+                "flow": flow
+            },
+            "recursion_limit": 10
+        }
+        langgraph_llm = LangGraphAdapter(graph=graph, config=graph_config)
 
-        # Get the directory of the current script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        credentials_path = os.path.join(script_dir, "zynga-backend-5558169672f7.json")
-        
         session = AgentSession(
             stt=google.STT(
                 languages="hi-IN",
-                credentials_file=credentials_path
+                credentials_file=GOOGLE_CREDENTIALS_PATH
             ),
             llm=langgraph_llm,  # Use YojnaPath LangGraph adapter
-            tts=google.TTS(
-                voice_name="hi-IN-Standard-B",  # Use Standard Hindi voice (more reliable)
-                language="hi-IN",
-                credentials_file=credentials_path,
-                use_streaming=False
-            ),
+            tts=make_tts(),  # Standard Hindi voice (more reliable), fixed utterances cached
             vad=silero.VAD.load(),
             turn_detection=MultilingualModel(),
         )
+        
+        # A conversation that already ended isn't resumed
+        await aopen_conversation(graph, graph_config)
+        
+        # The finished call's stages, latencies and tokens go to the archive (YOJNAPATH_ARCHIVE_DIR);
+        # then its thread is cleared so the caller's next call starts over
+        ctx.add_shutdown_callback(lambda: end_call(graph, graph_config))
+        if speculation_enabled():
+            SpeculativeResponder(graph, graph_config).attach(session)
+        if preroute_enabled():
+            PreRouter(graph, graph_config).attach(session)
 
         await session.start(
             room=ctx.room,
@@ -125,35 +129,37 @@ async def entrypoint(ctx: agents.JobContext):
             ),
         )
 
-        # Initial greeting in Hindi - using YojnaPath context
-        await session.generate_reply(
-            instructions="""यूज़र का अभिवादन करें और उन्हें YojnaPath के बारे में बताएं। 
-            कहें कि आप सरकारी योजनाओं की जानकारी देने में सहायता कर सकते हैं।
-            उदाहरण के लिए: PM Kisan, Pradhan Mantri Awas Yojana, आदि।"""
-        )
+        # Initial greeting in Hindi, rendered from the START stage template (no LLM call)
+        await session.say(render_stage_reply(current_registry(flow).start_stage, AGENT_LOCALE))
 
-        print("✅ YojnaPath voice assistant started successfully!")
+        logger.info("YojnaPath voice assistant started for thread %s", thread_id)
         
     except Exception as e:
-        print(f"❌ Error starting YojnaPath assistant: {e}")
-        print("This might be due to missing Groq API key or network issues.")
-        print("You can set GROQ_API_KEY in a .env file or as an environment variable.")
+        logger.error(
+            "Error starting YojnaPath assistant: %s (check GROQ_API_KEY and network access)", e
+        )
         raise
 
 # Custom worker options with pre-warming
 class YojnaPathWorkerOptions(agents.WorkerOptions):
     def __init__(self):
+        # Load-aware admission unless YOJNAPATH_ADMIT_MAX_JOBS=0
+        admission = {}
+        if admission_enabled():
+            controller = AdmissionController()
+            admission = dict(load_fnc=controller.load_fnc, request_fnc=controller.request_fnc,
+                             load_threshold=FULL_LOAD)
         super().__init__(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=lambda proc: prewarm_resources(),
-            agent_name="yojna-path-agent"
-
+            agent_name="yojna-path-agent",
+            **admission
         )
 
 def main():
     """Main function to run the YojnaPath LiveKit agent"""
-    print("🎯 Starting YojnaPath LiveKit Voice Agent")
-    print("=" * 50)
+    setup_logging()
+    logger.info("Starting YojnaPath LiveKit Voice Agent")
     
     # Validate environment
     required_env_vars = [
@@ -163,21 +169,18 @@ def main():
     
     missing_vars = [var for var in required_env_vars if not os.getenv(var)]
     if missing_vars:
-        print(f"❌ Missing required environment variables: {missing_vars}")
-        print("Please set these in your .env file:")
-        for var in missing_vars:
-            print(f"  {var}=your_value_here")
+        logger.error("Missing required environment variables: %s; set them in your .env file", missing_vars)
         return
     
-    print("✅ Environment validation passed")
+    logger.info("Environment validation passed")
     
     # Run the agent
     try:
         agents.cli.run_app(YojnaPathWorkerOptions())
     except KeyboardInterrupt:
-        print("\n👋 YojnaPath agent stopped by user")
+        logger.info("YojnaPath agent stopped by user")
     except Exception as e:
-        print(f"❌ Error running YojnaPath agent: {e}")
+        logger.error("Error running YojnaPath agent: %s", e)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
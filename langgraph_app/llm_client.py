@@ -0,0 +1,368 @@
+"""
+Resilient LLM calls: retries, hedging, circuit breaking and tier fallback.
+
+Every turn's LLM call goes through LLMClient:
+    retries     failed attempts are retried with full-jitter exponential backoff
+    hedging     (async) if an attempt is still running after the tier's p95
+                latency, a second identical request is fired and the first
+                answer wins; the loser is cancelled
+    breaker     after consecutive failures a tier's circuit opens and calls
+                skip it until a probe succeeds after a cool-down
+    fallback    when the large tier is exhausted or open, the small tier is
+                tried; when every tier fails LLMUnavailable is raised and the
+                graph replies with a localized template, keeping the stage
+    content     unusable output (LLMContentError: unparseable, a stage that
+                isn't allowed) means the tier is up, so it doesn't count
+                towards its breaker; it is asked once more, then falls back
+
+Configuration:
+    YOJNAPATH_LLM_RETRIES           retries per tier after the first attempt (default 2)
+    YOJNAPATH_LLM_TIMEOUT           seconds per async attempt (default 15)
+    YOJNAPATH_LLM_HEDGE_PERCENTILE  latency percentile that triggers a hedge; 0 disables (default 95)
+    YOJNAPATH_LLM_BREAKER           consecutive failures that open a tier's circuit (default 5)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from langgraph_app.admission import inflight
+from langgraph_app.model_router import TIER_LARGE, TIER_SMALL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Tier tried when a tier fails; tiers not listed have no model fallback
+FALLBACK_TIERS = {TIER_LARGE: TIER_SMALL}
+
+# Latency samples kept per tier for the hedge delay, and the minimum before hedging
+LATENCY_WINDOW = 256
+MIN_HEDGE_SAMPLES = 20
+
+# HTTP statuses that won't get better by asking again
+_PERMANENT_STATUSES = {400, 401, 403, 404, 422}
+
+# Times a tier is asked again after answering with unusable output
+CONTENT_RETRIES = 1
+
+
+class LLMUnavailable(RuntimeError):
+    """Every tier failed or is switched off by its circuit breaker"""
+
+
+class LLMContentError(ValueError):
+    """The model answered, but with output that can't be used"""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", name, os.getenv(name))
+        return default
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    retries: int = 2
+    base_delay_s: float = 0.2
+    max_delay_s: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** attempt))
+
+
+def is_retryable(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status not in _PERMANENT_STATUSES
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; after `reset_after_s` one
+    probe call is let through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after_s: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.reset_after_s = reset_after_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_after_s:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self._clock() - self._opened_at < self.reset_after_s:
+                return False
+            self._probing = True
+            return True
+
+    def release_probe(self) -> None:
+        """
+        Free the probe slot of a call that ended without an outcome (cancelled
+        by barge-in, a scheduler timeout or a lost hedge) so the next call can
+        probe; at worst this lets a second probe through
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failed call; returns True if this opened the circuit"""
+        with self._lock:
+            self._failures += 1
+            reopened = self._probing
+            self._probing = False
+            if reopened or (self._opened_at is None and self._failures >= self.threshold):
+                self._opened_at = self._clock()
+                return True
+            return False
+
+
+@dataclass
+class LLMClientStats:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    fallbacks: int = 0
+    breaker_opens: int = 0
+    content_errors: int = 0
+    failures: int = 0
+    # Successful request latencies per tier, the basis of the hedge delay
+    latencies_s: Dict[str, Deque[float]] = field(default_factory=dict, repr=False)
+
+
+class LLMClient:
+    """
+    Calls a tier's LLM through `call(tier)` / `await acall(tier)` callables.
+
+    The callable should raise on unusable output (e.g. a parse error) so that
+    it is retried like a transport error. Returns (result, tier used).
+    """
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        timeout_s: Optional[float] = 15.0,
+        hedge_percentile: float = 95.0,
+        breaker_threshold: int = 5,
+        breaker_reset_s: float = 30.0,
+        fallback_tiers: Optional[Dict[str, str]] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.retry = retry or RetryPolicy()
+        self.timeout_s = timeout_s
+        self.hedge_percentile = hedge_percentile
+        self.fallback_tiers = FALLBACK_TIERS if fallback_tiers is None else fallback_tiers
+        self._breaker_threshold = breaker_threshold
+        self._breaker_reset_s = breaker_reset_s
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.stats = LLMClientStats()
+
+    def breaker(self, tier: str) -> CircuitBreaker:
+        with self._lock:
+            if tier not in self._breakers:
+                self._breakers[tier] = CircuitBreaker(self._breaker_threshold, self._breaker_reset_s)
+            return self._breakers[tier]
+
+    def _tier_chain(self, tier: str) -> List[str]:
+        chain = [tier]
+        while chain[-1] in self.fallback_tiers and self.fallback_tiers[chain[-1]] not in chain:
+            chain.append(self.fallback_tiers[chain[-1]])
+        return chain
+
+    def _record_latency(self, tier: str, latency_s: float) -> None:
+        with self._lock:
+            self.stats.latencies_s.setdefault(tier, deque(maxlen=LATENCY_WINDOW)).append(latency_s)
+
+    def hedge_delay(self, tier: str) -> Optional[float]:
+        """Seconds after which a second request is fired, or None to not hedge"""
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            samples = sorted(self.stats.latencies_s.get(tier, ()))
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(self.hedge_percentile / 100 * len(samples)))]
+
+    def _record_outcome(self, tier: str, error: Optional[BaseException]) -> None:
+        breaker = self.breaker(tier)
+        if error is None:
+            breaker.record_success()
+            return
+        if breaker.record_failure():
+            self.stats.breaker_opens += 1
+            logger.warning("LLM circuit for tier %s opened after: %r", tier, error)
+
+    def _note_content_error(self, tier: str) -> None:
+        # The tier is reachable: not a breaker failure, but a probe mustn't stay taken
+        self.stats.content_errors += 1
+        self.breaker(tier).release_probe()
+
+    def _note_fallback(self, from_tier: str, to_tier: str, error: BaseException) -> None:
+        self.stats.fallbacks += 1
+        # While a circuit stays open every call falls back; the opening was already logged
+        log = logger.debug if self.breaker(from_tier).state == "open" else logger.warning
+        log("LLM tier %s unavailable (%r), falling back to %s", from_tier, error, to_tier)
+
+    def call(self, tier: str, call: Callable[[str], T]) -> tuple[T, str]:
+        """Synchronous call with retries, circuit breaking and fallback (no hedging)"""
+        self.stats.calls += 1
+        last_error: BaseException = LLMUnavailable(f"circuit open for tier {tier}")
+        chain = self._tier_chain(tier)
+        for index, current in enumerate(chain):
+            if index:
+                self._note_fallback(chain[index - 1], current, last_error)
+            content_errors = 0
+            for attempt in range(self.retry.retries + 1):
+                if not self.breaker(current).allow():
+                    break
+                if attempt:
+                    self.stats.retries += 1
+                    time.sleep(self.retry.delay(attempt - 1))
+                self.stats.attempts += 1
+                start = time.perf_counter()
+                try:
+                    with inflight("llm"):
+                        result = call(current)
+                except LLMContentError as e:
+                    last_error = e
+                    self._note_content_error(current)
+                    content_errors += 1
+                    if content_errors > CONTENT_RETRIES:
+                        break
+                    continue
+                except Exception as e:
+                    last_error = e
+                    self._record_outcome(current, e)
+                    if not is_retryable(e):
+                        break
+                    continue
+                except BaseException:
+                    self.breaker(current).release_probe()
+                    raise
+                self._record_latency(current, time.perf_counter() - start)
+                self._record_outcome(current, None)
+                return result, current
+        self.stats.failures += 1
+        raise LLMUnavailable(f"LLM call failed on every tier from {tier}: {last_error!r}") from last_error
+
+    async def _timed(self, tier: str, acall: Callable[[str], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        # Hedges count too: each is a request in flight
+        with inflight("llm"):
+            if self.timeout_s:
+                result = await asyncio.wait_for(acall(tier), self.timeout_s)
+            else:
+                result = await acall(tier)
+        self._record_latency(tier, time.perf_counter() - start)
+        return result
+
+    async def _hedged_attempt(self, tier: str, acall: Callable[[str], Awaitable[T]]) -> T:
+        """One attempt; a duplicate request is fired if it outlives the tier's hedge delay"""
+        tasks = [asyncio.ensure_future(self._timed(tier, acall))]
+        try:
+            delay = self.hedge_delay(tier)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.stats.hedges += 1
+                    tasks.append(asyncio.ensure_future(self._timed(tier, acall)))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.stats.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def acall(self, tier: str, acall: Callable[[str], Awaitable[T]]) -> tuple[T, str]:
+        """Async call with retries, hedging, circuit breaking and fallback"""
+        self.stats.calls += 1
+        last_error: BaseException = LLMUnavailable(f"circuit open for tier {tier}")
+        chain = self._tier_chain(tier)
+        for index, current in enumerate(chain):
+            if index:
+                self._note_fallback(chain[index - 1], current, last_error)
+            content_errors = 0
+            for attempt in range(self.retry.retries + 1):
+                if not self.breaker(current).allow():
+                    break
+                if attempt:
+                    self.stats.retries += 1
+                    await self._sleep(self.retry.delay(attempt - 1))
+                self.stats.attempts += 1
+                try:
+                    result = await self._hedged_attempt(current, acall)
+                except LLMContentError as e:
+                    last_error = e
+                    self._note_content_error(current)
+                    content_errors += 1
+                    if content_errors > CONTENT_RETRIES:
+                        break
+                    continue
+                except Exception as e:
+                    last_error = e
+                    self._record_outcome(current, e)
+                    if not is_retryable(e):
+                        break
+                    continue
+                except BaseException:
+                    # Cancelled: neither a success nor a failure, but a half-open
+                    # probe must not keep the tier shut for the rest of the process
+                    self.breaker(current).release_probe()
+                    raise
+                self._record_outcome(current, None)
+                return result, current
+        self.stats.failures += 1
+        raise LLMUnavailable(f"LLM call failed on every tier from {tier}: {last_error!r}") from last_error
+
+
+@lru_cache(maxsize=None)
+def llm_client() -> LLMClient:
+    """Process-wide client configured from YOJNAPATH_LLM_* (breakers are shared by all conversations)"""
+    return LLMClient(
+        retry=RetryPolicy(retries=int(_env_float("YOJNAPATH_LLM_RETRIES", 2))),
+        timeout_s=_env_float("YOJNAPATH_LLM_TIMEOUT", 15.0) or None,
+        hedge_percentile=_env_float("YOJNAPATH_LLM_HEDGE_PERCENTILE", 95.0),
+        breaker_threshold=int(_env_float("YOJNAPATH_LLM_BREAKER", 5)),
+    )
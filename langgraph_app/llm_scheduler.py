@@ -0,0 +1,373 @@
+"""
+Process-wide scheduling of async LLM requests under provider rate limits.
+
+Groq limits requests and tokens per minute per model; sessions calling it
+independently run into those limits together and get 429s in bursts. Every
+async request of a turn goes through LLMScheduler.submit instead:
+
+    token buckets   one for requests (RPM) and one for tokens (TPM) per model; a
+                    request starts once both hold its cost. The token cost is
+                    estimated from the prompt and settled with the real usage
+    priorities      live voice turns go before speculative calls, which go
+                    before background work
+    fair queuing    within a priority, sessions take turns, so one busy session
+                    can't hold back the others
+    coalescing      a request identical to one another session has in flight
+                    (same model, schema and prompt) shares its provider call
+    429s            a rate-limited request empties its model's buckets for the
+                    retry-after period and is queued again at the front
+
+The sync path (process_stage) calls the provider directly.
+
+Configuration:
+    YOJNAPATH_LLM_LIMITS   JSON object of per-model limits, e.g.
+                           {"llama-3.3-70b-versatile": {"rpm": 30, "tpm": 6000}};
+                           models not listed are only limited by their 429s
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterator, Optional
+
+from langgraph_app.metrics import LLM_QUEUE_WAIT, LLM_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LIVE = 0
+PRIORITY_SPECULATIVE = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = ("live", "speculative", "background")
+
+# Prompt characters per token; Devanagari text takes more tokens per character than English
+CHARS_PER_TOKEN = 3
+# Completion tokens assumed until the response reports its usage
+COMPLETION_TOKENS_ESTIMATE = 200
+# Pause after a 429 that didn't say how long to wait
+DEFAULT_RETRY_AFTER_S = 1.0
+# A request rate-limited this often fails, leaving the decision to LLMClient
+MAX_REQUEUES = 3
+
+_session: contextvars.ContextVar[str] = contextvars.ContextVar("llm_session", default="")
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_LIVE)
+
+
+@contextmanager
+def llm_context(session: str, priority: int = PRIORITY_LIVE) -> Iterator[None]:
+    """Session and priority of the LLM requests made inside the block (and tasks it starts)"""
+    session_token = _session.set(session)
+    priority_token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(priority_token)
+        _session.reset(session_token)
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // CHARS_PER_TOKEN + COMPLETION_TOKENS_ESTIMATE
+
+
+def used_tokens(output: Any) -> Optional[int]:
+    """Total tokens a structured-output response reports, if it does"""
+    raw = output.get("raw") if isinstance(output, dict) else None
+    usage = getattr(raw, "usage_metadata", None)
+    if not usage:
+        return None
+    return usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+
+def _status(error: BaseException) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after_s(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_S
+
+
+class TokenBucket:
+    """
+    `limit` units per `period_s`, refilled continuously, holding at most one
+    period's worth. The level goes below zero when a request used more than
+    was estimated.
+    """
+
+    def __init__(self, limit: float, period_s: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(limit)
+        self.rate = limit / period_s
+        self.level = float(limit)
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` is available; requests above capacity wait for a full bucket"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def settle(self, estimated: float, actual: float) -> None:
+        self.level += min(estimated, self.capacity) - actual
+
+    def drain(self) -> None:
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class _Request:
+    __slots__ = ("model", "priority", "session", "cost", "make", "future", "waiters", "task", "requeues",
+                 "queued_at", "waited")
+
+    def __init__(self, model: str, priority: int, session: str, cost: int,
+                 make: Callable[[], Awaitable[Any]], future: "asyncio.Future[Any]", queued_at: float):
+        self.model = model
+        self.priority = priority
+        self.session = session
+        self.cost = cost
+        self.make = make
+        self.future = future
+        self.waiters = 0
+        self.task: Optional[asyncio.Task] = None
+        self.requeues = 0
+        self.queued_at = queued_at
+        self.waited = False
+
+
+class _ModelQueue:
+    """Pending requests of one model by priority, then session (round robin), plus its buckets"""
+
+    def __init__(self, limits: Dict[str, float], period_s: float, clock: Callable[[], float]):
+        self.requests = TokenBucket(limits["rpm"], period_s, clock) if limits.get("rpm") else None
+        self.tokens = TokenBucket(limits["tpm"], period_s, clock) if limits.get("tpm") else None
+        self.blocked_until = 0.0
+        self.wakeup = asyncio.Event()
+        self._clock = clock
+        self._pending: Dict[int, "OrderedDict[str, Deque[_Request]]"] = {}
+
+    def push(self, request: _Request, front: bool = False) -> None:
+        sessions = self._pending.setdefault(request.priority, OrderedDict())
+        requests = sessions.setdefault(request.session, deque())
+        if front:
+            requests.appendleft(request)
+            sessions.move_to_end(request.session, last=False)
+        else:
+            requests.append(request)
+        self.wakeup.set()
+
+    def next(self) -> Optional[_Request]:
+        """The request to start next, without removing it; abandoned requests are dropped"""
+        for priority in sorted(self._pending):
+            sessions = self._pending[priority]
+            for session in list(sessions):
+                requests = sessions[session]
+                while requests and requests[0].future.done():
+                    requests.popleft()
+                if requests:
+                    return requests[0]
+                del sessions[session]
+            del self._pending[priority]
+        return None
+
+    def pop(self, request: _Request) -> None:
+        sessions = self._pending[request.priority]
+        sessions[request.session].popleft()
+        # The session goes to the back of its priority's round
+        if sessions[request.session]:
+            sessions.move_to_end(request.session)
+        else:
+            del sessions[request.session]
+
+    def delay(self, request: _Request) -> float:
+        delays = [self.blocked_until - self._clock()]
+        if self.requests:
+            delays.append(self.requests.delay(1))
+        if self.tokens:
+            delays.append(self.tokens.delay(request.cost))
+        return max(delays)
+
+    def take(self, request: _Request) -> None:
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(request.cost)
+
+    def settle(self, request: _Request, actual: Optional[int]) -> None:
+        if self.tokens and actual is not None:
+            self.tokens.settle(request.cost, actual)
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, self._clock() + seconds)
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.drain()
+
+
+@dataclass
+class SchedulerStats:
+    submitted: int = 0
+    coalesced: int = 0
+    # Requests that had to wait for their model's buckets
+    queued: int = 0
+    rate_limited: int = 0
+
+
+class LLMScheduler:
+    """
+    Queues async LLM requests per model and starts them as the model's rate
+    limits allow. Bound to one event loop at a time; the buckets outlive a
+    loop, the queues don't.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, period_s: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = limits or {}
+        self.period_s = period_s
+        self.clock = clock
+        self.stats = SchedulerStats()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._inflight: Dict[Hashable, _Request] = {}
+
+    def _queue(self, model: str) -> _ModelQueue:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._dispatchers = {}
+            self._inflight = {}
+            # Buckets carry over, the old loop's events and requests can't
+            for queue in self._queues.values():
+                queue.wakeup = asyncio.Event()
+                queue._pending = {}
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = _ModelQueue(self.limits.get(model, {}), self.period_s, self.clock)
+        if model not in self._dispatchers:
+            self._dispatchers[model] = loop.create_task(self._dispatch(queue))
+        return queue
+
+    async def submit(self, model: str, make: Callable[[], Awaitable[Any]], prompt: str = "",
+                     key: Optional[Hashable] = None) -> Any:
+        """
+        Run `make()` (one provider request) when `model`'s limits allow. Requests
+        with the same `key` from different sessions share one call.
+        """
+        queue = self._queue(model)
+        self.stats.submitted += 1
+        session = _session.get()
+        if key is not None:
+            key = (model, key)
+            shared = self._inflight.get(key)
+            # A duplicate from the same session is a hedge, which is meant to be a separate request
+            if shared is not None and shared.session != session and not shared.future.done():
+                self.stats.coalesced += 1
+                return await self._wait(shared)
+
+        request = _Request(model, _priority.get(), session, estimate_tokens(prompt), make,
+                           asyncio.get_running_loop().create_future(), self.clock())
+        if key is not None:
+            self._inflight[key] = request
+            request.future.add_done_callback(
+                lambda _, key=key: self._inflight.pop(key) if self._inflight.get(key) is request else None
+            )
+        queue.push(request)
+        return await self._wait(request)
+
+    async def _wait(self, request: _Request) -> Any:
+        request.waiters += 1
+        try:
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            request.waiters -= 1
+            # Nobody wants the answer any more (e.g. the caller timed out)
+            if not request.waiters and not request.future.done():
+                if request.task is not None:
+                    request.task.cancel()
+                else:
+                    request.future.cancel()
+            raise
+
+    async def _dispatch(self, queue: _ModelQueue) -> None:
+        while True:
+            request = queue.next()
+            if request is None:
+                queue.wakeup.clear()
+                await queue.wakeup.wait()
+                continue
+            delay = queue.delay(request)
+            if delay > 0:
+                if not request.waited:
+                    request.waited = True
+                    self.stats.queued += 1
+                # A new request may outrank this one; look again when one arrives
+                queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            queue.pop(request)
+            queue.take(request)
+            LLM_QUEUE_WAIT.observe(self.clock() - request.queued_at, request.model, PRIORITY_NAMES[request.priority])
+            request.task = asyncio.get_running_loop().create_task(self._run(queue, request))
+
+    async def _run(self, queue: _ModelQueue, request: _Request) -> None:
+        try:
+            result = await request.make()
+        except asyncio.CancelledError:
+            request.future.cancel()
+            return
+        except Exception as e:
+            if _status(e) == 429 and request.requeues < MAX_REQUEUES:
+                retry_after_s = _retry_after_s(e)
+                logger.debug("Model %s rate limited, pausing %.1f s", request.model, retry_after_s)
+                self.stats.rate_limited += 1
+                LLM_RATE_LIMITED.inc(request.model)
+                queue.block(retry_after_s)
+                request.requeues += 1
+                request.task = None
+                queue.push(request, front=True)
+                return
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+        queue.settle(request, used_tokens(result))
+        if not request.future.done():
+            request.future.set_result(result)
+
+
+def _configured_limits() -> Dict[str, Dict[str, float]]:
+    raw = os.getenv("YOJNAPATH_LLM_LIMITS", "").strip()
+    if not raw:
+        return {}
+    try:
+        limits = json.loads(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid YOJNAPATH_LLM_LIMITS=%r", raw)
+        return {}
+    return {model: {name: float(value) for name, value in entry.items()} for model, entry in limits.items()}
+
+
+@lru_cache(maxsize=None)
+def llm_scheduler() -> LLMScheduler:
+    """Process-wide scheduler configured from YOJNAPATH_LLM_LIMITS"""
+    return LLMScheduler(_configured_limits())
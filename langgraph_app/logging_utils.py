@@ -0,0 +1,183 @@
+"""
+Non-blocking structured logging for the YojnaPath agents.
+
+Log records are put on a queue by a QueueHandler and written to stderr by a
+QueueListener thread, so the event loop never blocks on a stdout/stderr write.
+INFO/DEBUG records can be sampled, and user text / phone numbers are redacted
+unless redaction is switched off.
+
+Configuration (arguments override environment):
+    YOJNAPATH_LOG_LEVEL        DEBUG, INFO, WARNING, ... (default INFO)
+    YOJNAPATH_LOG_SAMPLE_RATE  fraction of INFO/DEBUG records kept (default 1.0)
+    YOJNAPATH_LOG_REDACT       full, mask or off (default full)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+REDACT_FULL = "full"
+REDACT_MASK = "mask"
+REDACT_OFF = "off"
+
+# Phone numbers, emails and 12 digit (Aadhaar-like) ids
+_PII_PATTERN = re.compile(
+    r"[\w.+-]+@[\w-]+\.[\w.-]+"
+    r"|\+?\d[\d\s-]{8,}\d"
+)
+
+_listener: Optional[QueueListener] = None
+_redaction_mode = REDACT_FULL
+
+
+class Sensitive:
+    """Marks a log argument as user-provided text that must be redacted"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return redact(str(self.value))
+
+    __repr__ = __str__
+
+
+def sensitive(value: Any) -> Sensitive:
+    """Wrap a log argument holding user text, phone numbers or other PII"""
+    return Sensitive(value)
+
+
+def mask_pii(text: str) -> str:
+    """Mask phone numbers, emails and long digit runs, keeping the last two characters"""
+    return _PII_PATTERN.sub(lambda m: "*" * (len(m.group()) - 2) + m.group()[-2:], text)
+
+
+def redact(text: str, mode: Optional[str] = None) -> str:
+    """Redact text according to the configured redaction mode"""
+    mode = mode or _redaction_mode
+    if mode == REDACT_OFF:
+        return text
+    if mode == REDACT_MASK:
+        return mask_pii(text)
+    return f"<redacted:{len(text)} chars>"
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class RedactingQueueHandler(QueueHandler):
+    """
+    QueueHandler that formats each record once, scrubs PII from it and enqueues
+    it without the defensive copy the stdlib handler makes.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if _redaction_mode != REDACT_OFF:
+            message = mask_pii(message)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = message
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra fields passed via `extra=` are kept"""
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED and value is not None:
+                payload[key] = value
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+    redaction: Optional[str] = None,
+    json_format: bool = True,
+    handler: Optional[logging.Handler] = None,
+) -> QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Safe to call more than once; the previous listener is stopped and replaced.
+
+    Args:
+        level: Root log level.
+        sample_rate: Fraction of INFO/DEBUG records to keep.
+        redaction: full, mask or off.
+        json_format: Emit one JSON object per line instead of plain text.
+        handler: Destination handler (defaults to stderr).
+    """
+    global _listener, _redaction_mode
+
+    level = (level or os.getenv("YOJNAPATH_LOG_LEVEL") or "INFO").upper()
+    if sample_rate is None:
+        sample_rate = float(os.getenv("YOJNAPATH_LOG_SAMPLE_RATE", "1.0"))
+    _redaction_mode = (redaction or os.getenv("YOJNAPATH_LOG_REDACT") or REDACT_FULL).lower()
+
+    if _listener is not None:
+        _listener.stop()
+
+    handler = handler or logging.StreamHandler()
+    handler.setFormatter(
+        JsonFormatter() if json_format
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = RedactingQueueHandler(log_queue)
+    if sample_rate < 1.0:
+        queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,254 @@
+"""
+In-process flow metrics with a Prometheus endpoint.
+
+Counters and histograms are kept in per-thread shards: a thread only ever
+writes its own shard, so recording a turn takes no lock. A scrape merges the
+shards of every thread (copying a dict is atomic under the GIL).
+
+Recorded by the graph for every turn:
+    yojnapath_stage_transitions_total{from_stage, to_stage}
+    yojnapath_invalid_transitions_total{stage, requested}   LLM picked a disallowed next stage
+    yojnapath_failed_turns_total{stage}                     no LLM tier answered
+    yojnapath_cancelled_turns_total{stage}                  abandoned mid-turn because the caller barged in
+    yojnapath_clarifications_total{stage, reason}           caller asked to pick the next stage
+    yojnapath_clarification_answers_total{stage, resolved}  answered locally or by the LLM
+    yojnapath_stage_reversals_total{stage}                  straight back to the previous stage
+    yojnapath_llm_confidence{stage}                         histogram of the LLM's confidence
+    yojnapath_turn_latency_seconds{stage}                   histogram of the turn's LLM latency
+    yojnapath_tenant_waits_total{flow}                      turns that waited for one of their flow's LLM slots
+    yojnapath_llm_queue_wait_seconds{model, priority}       histogram of time requests waited for the rate limits
+    yojnapath_llm_rate_limited_total{model}                 429 responses, each requeued by the scheduler
+
+Configuration:
+    YOJNAPATH_METRICS_PORT   port of the /metrics endpoint; unset disables it. Each job
+                             process binds the first free port from there (up to +PORT_RANGE)
+"""
+
+import bisect
+import errno
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PORT_RANGE = 32
+
+LATENCY_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+_Labels = Tuple[str, ...]
+
+
+class MetricsRegistry:
+    """Metric definitions plus the per-thread shards holding their values"""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._shards: List[Dict[str, Dict[_Labels, object]]] = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+
+    def shard(self) -> Dict[str, Dict[_Labels, object]]:
+        """The calling thread's values, metric name -> labels -> value"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[str, Dict[_Labels, object]] = {metric.name: {} for metric in self._metrics}
+            # Only taken once per thread
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def register(self, metric: "_Metric") -> None:
+        if self._shards:
+            raise RuntimeError(f"Metric {metric.name} registered after recording started")
+        self._metrics.append(metric)
+
+    def collect(self) -> Dict[str, Dict[_Labels, object]]:
+        """Values of every metric summed over all threads' shards"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[str, Dict[_Labels, object]] = {}
+        for metric in self._metrics:
+            values: Dict[_Labels, object] = {}
+            for shard in shards:
+                for labels, value in dict(shard[metric.name]).items():
+                    values[labels] = metric.merge(values.get(labels), value)
+            merged[metric.name] = values
+        return merged
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        merged = self.collect()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(merged[metric.name].items()):
+                lines.extend(metric.exposition(labels, value))
+        return "\n".join(lines) + "\n"
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _number(value: float) -> str:
+    # "g" formatting would round large counts
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: MetricsRegistry, name: str, help: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def merge(self, total: Optional[object], value: object) -> object:
+        raise NotImplementedError
+
+    def exposition(self, labels: _Labels, value: object) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        values = self.registry.shard()[self.name]
+        values[labels] = values.get(labels, 0) + amount
+
+    def merge(self, total: Optional[float], value: float) -> float:
+        return (total or 0) + value
+
+    def exposition(self, labels: _Labels, value: float) -> List[str]:
+        return [f"{self.name}{{{_label_text(self.labelnames, labels)}}} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    """Per-bucket counts (the last one is +Inf) followed by the sum of observations"""
+
+    kind = "histogram"
+
+    def __init__(self, registry: MetricsRegistry, name: str, help: str, labelnames: Sequence[str],
+                 buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, help, labelnames)
+
+    def observe(self, value: float, *labels: str) -> None:
+        values = self.registry.shard()[self.name]
+        counts = values.get(labels)
+        if counts is None:
+            counts = values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def merge(self, total: Optional[List[float]], value: List[float]) -> List[float]:
+        # Copied first: the owning thread may be updating the list
+        value = list(value)
+        return value if total is None else [a + b for a, b in zip(total, value)]
+
+    def exposition(self, labels: _Labels, value: List[float]) -> List[str]:
+        label_text = _label_text(self.labelnames, labels)
+        lines = []
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], value[:-1]):
+            cumulative += count
+            le = bound if isinstance(bound, str) else f"{bound:g}"
+            lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum{{{label_text}}} {_number(value[-1])}")
+        lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_TRANSITIONS = Counter(REGISTRY, "yojnapath_stage_transitions_total",
+                            "Turns by stage and the stage they moved to", ["from_stage", "to_stage"])
+INVALID_TRANSITIONS = Counter(REGISTRY, "yojnapath_invalid_transitions_total",
+                              "LLM-chosen next stages that aren't allowed and fell back to the default",
+                              ["stage", "requested"])
+FAILED_TURNS = Counter(REGISTRY, "yojnapath_failed_turns_total",
+                       "Turns answered with the failure template because no LLM tier answered", ["stage"])
+CANCELLED_TURNS = Counter(REGISTRY, "yojnapath_cancelled_turns_total",
+                          "Turns whose LLM and tool calls were cancelled because the caller barged in", ["stage"])
+LLM_CONFIDENCE = Histogram(REGISTRY, "yojnapath_llm_confidence",
+                           "Confidence the LLM reported for its reply", ["stage"], CONFIDENCE_BUCKETS)
+CLARIFICATIONS = Counter(REGISTRY, "yojnapath_clarifications_total",
+                         "Turns that asked the caller to pick the next stage instead of guessing", ["stage", "reason"])
+CLARIFICATION_ANSWERS = Counter(REGISTRY, "yojnapath_clarification_answers_total",
+                                "Answers to a clarification, resolved locally or left to the LLM", ["stage", "resolved"])
+STAGE_REVERSALS = Counter(REGISTRY, "yojnapath_stage_reversals_total",
+                          "Transitions straight back to the previous stage, a sign of a wrong jump", ["stage"])
+TURN_LATENCY = Histogram(REGISTRY, "yojnapath_turn_latency_seconds",
+                         "LLM latency of a turn, including retries and fallback", ["stage"], LATENCY_BUCKETS_S)
+LLM_QUEUE_WAIT = Histogram(REGISTRY, "yojnapath_llm_queue_wait_seconds",
+                           "Time LLM requests waited for their model's rate limits", ["model", "priority"],
+                           LATENCY_BUCKETS_S)
+LLM_RATE_LIMITED = Counter(REGISTRY, "yojnapath_llm_rate_limited_total",
+                           "Rate-limited (429) LLM responses, requeued by the scheduler", ["model"])
+TENANT_WAITS = Counter(REGISTRY, "yojnapath_tenant_waits_total",
+                       "Turns that waited because their flow was at max_concurrent_turns", ["flow"])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("metrics scrape: " + format, *args)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "0.0.0.0") -> Optional[int]:
+    """
+    Serve /metrics from a daemon thread; returns the bound port, or None when
+    YOJNAPATH_METRICS_PORT isn't set. Safe to call more than once.
+    """
+    global _server
+    if port is None:
+        configured = os.getenv("YOJNAPATH_METRICS_PORT", "").strip()
+        if not configured:
+            return None
+        port = int(configured)
+
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        # Several job processes per host: each takes the next free port
+        for candidate in range(port, port + PORT_RANGE):
+            try:
+                _server = ThreadingHTTPServer((host, candidate), _MetricsHandler)
+                break
+            except OSError as e:
+                if e.errno != errno.EADDRINUSE:
+                    raise
+        else:
+            logger.warning("No free metrics port in %d-%d, metrics endpoint disabled", port, port + PORT_RANGE - 1)
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("Serving metrics on :%d/metrics", _server.server_address[1])
+        return _server.server_address[1]
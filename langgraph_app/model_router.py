@@ -0,0 +1,139 @@
+"""
+Per-stage model routing and per-stage latency/cost accounting.
+
+Each stage in stage_config.json can set `model` to a tier:
+    large   rich answers (default)
+    small   routing and short replies, on a small fast model
+    none    no LLM call: the stage prompt is the reply and the first
+            transition is taken (static stages always use this tier)
+
+Tier models can be overridden with YOJNAPATH_MODEL_LARGE / YOJNAPATH_MODEL_SMALL.
+"""
+
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from models import Stage
+
+TIER_LARGE = "large"
+TIER_SMALL = "small"
+TIER_NONE = "none"
+DEFAULT_TIER = TIER_LARGE
+
+DEFAULT_TIER_MODELS = {
+    TIER_LARGE: "llama-3.3-70b-versatile",
+    TIER_SMALL: "llama-3.1-8b-instant",
+}
+
+# USD per million (input, output) tokens, from Groq's published pricing
+MODEL_PRICES: Dict[str, tuple[float, float]] = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+# Latency samples kept per stage for percentiles
+LATENCY_WINDOW = 1024
+
+
+def stage_tier(stage: Stage) -> str:
+    if stage.static:
+        return TIER_NONE
+    return stage.model or DEFAULT_TIER
+
+
+def model_for_tier(tier: str) -> str:
+    """Model name for a tier, honouring YOJNAPATH_MODEL_<TIER> overrides"""
+    return os.getenv(f"YOJNAPATH_MODEL_{tier.upper()}") or DEFAULT_TIER_MODELS[tier]
+
+
+def estimate_cost(model: Optional[str], usage: Optional[Dict[str, int]]) -> float:
+    """Cost in USD of one call from its token usage; 0 for unknown models or usage"""
+    if not model or not usage or model not in MODEL_PRICES:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[model]
+    return (usage.get("input_tokens", 0) * input_price + usage.get("output_tokens", 0) * output_price) / 1e6
+
+
+@dataclass
+class StageModelStats:
+    """Per-stage turn metrics"""
+    turns: int = 0
+    llm_calls: int = 0
+    # Turns no LLM tier could answer (answered from the failure template)
+    failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    total_latency_s: float = 0.0
+    models: Dict[str, int] = field(default_factory=dict)
+    latencies_s: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW), repr=False)
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self.total_latency_s / self.turns * 1000 if self.turns else 0.0
+
+    def percentile_ms(self, p: float) -> float:
+        if not self.latencies_s:
+            return 0.0
+        ordered = sorted(self.latencies_s)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+
+_stats: Dict[str, StageModelStats] = {}
+_stats_lock = threading.Lock()
+
+
+def record_turn(
+    stage_id: str,
+    model: Optional[str],
+    latency_s: float,
+    usage: Optional[Dict[str, int]] = None,
+    failed: bool = False
+) -> None:
+    """Account one turn of a stage; `model` is None when no LLM answered"""
+    with _stats_lock:
+        stats = _stats.setdefault(stage_id, StageModelStats())
+        stats.turns += 1
+        stats.total_latency_s += latency_s
+        stats.latencies_s.append(latency_s)
+        stats.failures += failed
+        if model is None:
+            return
+        stats.llm_calls += 1
+        stats.models[model] = stats.models.get(model, 0) + 1
+        if usage:
+            stats.input_tokens += usage.get("input_tokens", 0)
+            stats.output_tokens += usage.get("output_tokens", 0)
+        stats.cost_usd += estimate_cost(model, usage)
+
+
+def stage_stats() -> Dict[str, StageModelStats]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stage_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def stage_stats_report() -> List[Dict[str, Any]]:
+    """One row per stage: turns, LLM calls, models used, latency and cost"""
+    rows = []
+    for stage_id, stats in sorted(stage_stats().items()):
+        rows.append({
+            "stage": stage_id,
+            "turns": stats.turns,
+            "llm_calls": stats.llm_calls,
+            "failures": stats.failures,
+            "models": ",".join(sorted(stats.models)) or TIER_NONE,
+            "avg_ms": round(stats.avg_latency_ms, 1),
+            "p95_ms": round(stats.percentile_ms(95), 1),
+            "input_tokens": stats.input_tokens,
+            "output_tokens": stats.output_tokens,
+            "cost_usd": round(stats.cost_usd, 6),
+        })
+    return rows
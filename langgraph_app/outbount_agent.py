@@ -3,7 +3,7 @@ import os
 import sys
 import base64
 import logging
-from uuid import uuid4, uuid5, UUID
+from uuid import uuid4
 from typing import cast
 from livekit import agents
 from livekit.agents import AgentSession, Agent, RoomInputOptions
@@ -14,7 +14,6 @@ from livekit.plugins import (
     silero,
 )
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
-from langgraph_adapter import LangGraphAdapter
 import asyncio
 from livekit import api
 
@@ -23,19 +22,31 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import your LangGraph implementation
 from langgraph_app.graph_builder import (
+    aopen_conversation,
     build_yojnapath_graph,
-    init_conversation,
     add_user_input,
     stages,
     State
 )
+from langgraph_app.agent_setup import AGENT_LOCALE, GOOGLE_CREDENTIALS_PATH, get_thread_id, make_tts, prewarm_resources
+from langgraph_app.langgraph_adapter import LangGraphAdapter
+from langgraph_app.logging_utils import setup_logging, sensitive
+from langgraph_app.speculation import SpeculativeResponder, speculation_enabled
+from langgraph_app.prerouter import PreRouter, preroute_enabled
+from langgraph_app.stage_registry import current_registry
+from langgraph_app.tenants import call_flow
+from langgraph_app.templates import render_stage_reply
+from langgraph_app.state_store import shared_checkpointer
+from langgraph_app.call_archive import end_call
+from langgraph_app.admission import FULL_LOAD, AdmissionController, admission_enabled, start_load_reporter
+from langgraph.checkpoint.memory import MemorySaver
 
 load_dotenv()
 
 speech_key = os.getenv("GOOGLE_SPEECH_KEY")
 SIP_TRUNK_ID = os.getenv("LIVEKIT_SIP_TRUNK_ID")
-
-NAMESPACE = UUID("41010b5d-5447-4df5-baf2-97d69f2e9d06")
+# Reported at prewarm if missing; outbound dialing needs the LiveKit API credentials
+PREWARM_ENV = ["GROQ_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"]
 
 logger = logging.getLogger("yojnapath-outbound-agent")
 
@@ -44,66 +55,44 @@ def setup_langfuse(
     host: str | None = None, public_key: str | None = None, secret_key: str | None = None
 ):
     """Setup Langfuse OpenTelemetry tracing for the agent."""
-    print("🔍 Initializing Langfuse OpenTelemetry tracing...")
-    
     try:
         from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
         from opentelemetry.sdk.trace import TracerProvider
         from opentelemetry.sdk.trace.export import BatchSpanProcessor
-        print("✅ OpenTelemetry imports successful")
     except ImportError as e:
-        print(f"❌ Failed to import OpenTelemetry modules: {e}")
-        print("💡 Install missing dependencies: pip install opentelemetry-api opentelemetry-sdk opentelemetry-exporter-otlp-proto-http")
+        logger.error(
+            "Failed to import OpenTelemetry modules: %s. Install opentelemetry-api opentelemetry-sdk "
+            "opentelemetry-exporter-otlp-proto-http to enable tracing", e
+        )
         return False
 
     public_key = public_key or os.getenv("LANGFUSE_PUBLIC_KEY")
     secret_key = secret_key or os.getenv("LANGFUSE_SECRET_KEY")
     host = host or os.getenv("LANGFUSE_HOST")
 
-    print(f"🔑 Credentials check:")
-    print(f"   - Public key: {'✅ Provided' if public_key else '❌ Missing'}")
-    print(f"   - Secret key: {'✅ Provided' if secret_key else '❌ Missing'}")
-    print(f"   - Host: {'✅ Provided' if host else '❌ Missing'} ({host if host else 'None'})")
-
     if not public_key or not secret_key or not host:
-        print("❌ LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY, and LANGFUSE_HOST not set. Tracing disabled.")
         logger.warning("LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY, and LANGFUSE_HOST not set. Tracing disabled.")
         return False
 
     try:
-        print("🔧 Setting up OpenTelemetry configuration...")
         langfuse_auth = base64.b64encode(f"{public_key}:{secret_key}".encode()).decode()
         endpoint = f"{host.rstrip('/')}/api/public/otel"
         
         os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = endpoint
         os.environ["OTEL_EXPORTER_OTLP_HEADERS"] = f"Authorization=Basic {langfuse_auth}"
-        
-        print(f"📡 OTLP Endpoint: {endpoint}")
-        print(f"🔐 Auth header configured")
 
-        print("🏗️  Creating TracerProvider...")
         trace_provider = TracerProvider()
         trace_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
         set_tracer_provider(trace_provider)
         
-        print(f"🎉 Langfuse tracing successfully enabled!")
-        print(f"📊 All agent interactions will be traced to: {host}")
-        logger.info(f"✅ Langfuse tracing enabled with host: {host}")
+        logger.info("Langfuse tracing enabled with host: %s", host)
         return True
         
     except Exception as e:
-        print(f"❌ Failed to setup Langfuse tracing: {e}")
-        print(f"🔍 Error details: {type(e).__name__}: {str(e)}")
-        print("⚠️  Continuing without tracing...")
-        logger.error(f"❌ Failed to setup Langfuse tracing: {e}")
+        logger.error("Failed to setup Langfuse tracing: %s: %s", type(e).__name__, e)
         logger.warning("Continuing without tracing...")
         return False
 
-def get_thread_id(sid: str | None) -> str:
-    if sid is not None:
-        return str(uuid5(NAMESPACE, sid))
-    return str(uuid4())
-
 class YojnaPathAssistant(Agent):
     def __init__(self) -> None:
         super().__init__(
@@ -144,9 +133,10 @@ async def make_outbound_call(phone_number: str, room_name: str = None):
             )
         )
         
-        print(f"✅ Outbound call initiated to {phone_number}")
-        print(f"📞 Room: {room_name}")
-        print(f"🆔 Participant ID: {sip_participant.participant_identity}")
+        logger.info(
+            "Outbound call initiated to %s (room: %s, participant: %s)",
+            sensitive(phone_number), room_name, sensitive(sip_participant.participant_identity)
+        )
         
         return {
             "success": True,
@@ -156,40 +146,18 @@ async def make_outbound_call(phone_number: str, room_name: str = None):
         }
         
     except Exception as e:
-        print(f"❌ Error making outbound call: {e}")
+        logger.error("Error making outbound call: %s", e)
         return {
             "success": False,
             "error": str(e)
         }
 
-def prewarm_resources():
-    try:
-        required_vars = ["GROQ_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"]
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
-        
-        if missing_vars:
-            print(f"⚠️  Warning: Missing environment variables: {missing_vars}")
-            print("Please set these in your .env file for full functionality.")
-        
-        if not os.getenv("GROQ_API_KEY"):
-            raise ValueError("Missing GROQ_API_KEY")
-        
-        print("📊 Pre-warming YojnaPath LangGraph...")
-        graph = build_yojnapath_graph()
-        print("✅ Graph pre-warmed successfully!")
-        return graph
-    except Exception as e:
-        print(f"❌ Error pre-warming resources: {e}")
-        raise
-
 # ✅ Top-level function replacing lambda
 def prewarm_resources_wrapper(proc):
-    return prewarm_resources()
+    return prewarm_resources(PREWARM_ENV)
 
 async def entrypoint(ctx: agents.JobContext):
-    print("\n" + "="*50)
-    print("🚀 Starting YojnaPath Agent Session")
-    print("="*50)
+    logger.info("Starting YojnaPath agent session for room %s", ctx.room.name)
     
     # Setup Langfuse tracing before starting the agent session
     tracing_enabled = setup_langfuse(
@@ -200,11 +168,11 @@ async def entrypoint(ctx: agents.JobContext):
     
     # Log tracing status
     if not tracing_enabled:
-        print("\n⚠️  WARNING: Tracing is disabled. No telemetry data will be collected.")
-        print("   To enable tracing, ensure all required environment variables are set correctly.\n")
+        logger.warning("Tracing is disabled. No telemetry data will be collected.")
     
-    print(f"\n🔗 Connecting to room: {ctx.room.name}")
     await ctx.connect()
+    # This call's LLM/TTS requests and loop lag count towards the worker's load
+    start_load_reporter()
     
     is_outbound_call = False
     dial_info = None
@@ -214,44 +182,37 @@ async def entrypoint(ctx: agents.JobContext):
             import json
             dial_info = json.loads(ctx.job.metadata)
             is_outbound_call = "phone_number" in dial_info
-            print(f"📞 Outbound call detected: {is_outbound_call}")
             if is_outbound_call:
-                print(f"📱 Calling: {dial_info['phone_number']}")
+                logger.info("Outbound call to %s", sensitive(dial_info["phone_number"]))
         except (json.JSONDecodeError, KeyError):
             pass
+    # The job metadata picks the flow (tenant) this call runs
+    flow = call_flow(dial_info if isinstance(dial_info, dict) else None)
     
-    graph = build_yojnapath_graph()
+    # The adapter only sends the new user message, so state is kept per thread,
+    # in the shared state store when YOJNAPATH_STATE_STORE is set
+    graph = build_yojnapath_graph(checkpointer=shared_checkpointer() or MemorySaver())
     thread_id = get_thread_id(ctx.room.name)
-    print(f"🧵 Thread ID: {thread_id}")
-    
-    initial_state = init_conversation(thread_id)
+    logger.debug("Thread ID: %s", thread_id)
     
-    langgraph_adapter = LangGraphAdapter(
-        graph=graph,
-        config={
-            "configurable": {
-                "thread_id": thread_id
-            },
-            "recursion_limit": 10
-        }
-    )
+    graph_config = {
+        "configurable": {
+            "thread_id": thread_id,
+            "locale": AGENT_LOCALE,
+            "flow": flow
+        },
+        "recursion_limit": 10
+    }
+    langgraph_adapter = LangGraphAdapter(graph=graph, config=graph_config)
     
     assistant = YojnaPathAssistant()
     
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    credentials_path = os.path.join(script_dir, "zynga-backend-5558169672f7.json")
-    
     stt = google.STT(
         languages=["hi-IN", "en-IN"],
-        credentials_file=credentials_path
+        credentials_file=GOOGLE_CREDENTIALS_PATH
     )
     
-    tts = google.TTS(
-        voice_name="hi-IN-Standard-B",
-        language="hi-IN",
-        credentials_file=credentials_path,
-        use_streaming=False
-    )
+    tts = make_tts()
     
     session = AgentSession(
         turn_detection=MultilingualModel(),
@@ -261,8 +222,21 @@ async def entrypoint(ctx: agents.JobContext):
         llm=langgraph_adapter,
     )
     
+    # A conversation that already ended isn't resumed
+    await aopen_conversation(graph, graph_config)
+    
+    # The finished call's stages, latencies and tokens go to the archive (YOJNAPATH_ARCHIVE_DIR);
+    # then its thread is cleared so the caller's next call starts over
+    ctx.add_shutdown_callback(lambda: end_call(graph, graph_config))
+    if speculation_enabled():
+        SpeculativeResponder(graph, graph_config).attach(session)
+    if preroute_enabled():
+        PreRouter(graph, graph_config).attach(session)
+    
+    # Opening line rendered from the START stage template; no LLM call before the caller speaks
+    greeting = render_stage_reply(current_registry(flow).start_stage, AGENT_LOCALE)
+    
     if is_outbound_call and dial_info:
-        print("🚀 Starting agent session before dialing...")
         session_started = asyncio.create_task(
             session.start(
                 agent=assistant,
@@ -277,7 +251,7 @@ async def entrypoint(ctx: agents.JobContext):
         participant_identity = f"sip-caller-{phone_number.replace('+', '').replace('-', '')}"
         
         try:
-            print(f"📞 Dialing {phone_number}...")
+            logger.info("Dialing %s", sensitive(phone_number))
             await ctx.api.sip.create_sip_participant(
                 api.CreateSIPParticipantRequest(
                     room_name=ctx.room.name,
@@ -290,30 +264,32 @@ async def entrypoint(ctx: agents.JobContext):
             
             await session_started
             participant = await ctx.wait_for_participant(identity=participant_identity)
-            print(f"✅ Participant joined: {participant.identity}")
+            logger.info("Participant joined: %s", sensitive(participant.identity))
             
             if hasattr(assistant, 'set_participant'):
                 assistant.set_participant(participant)
             
-            await session.generate_reply(
-                instructions="""यह एक आउटबाउंड कॉल है। यूज़र का अभिवादन करें और बताएं कि आप YojnaPath असिस्टेंट हैं। 
-                सरकारी योजनाओं की जानकारी देने में आपकी सहायता कर सकते हैं।"""
-            )
+            await session.say(greeting)
             
         except api.TwirpError as e:
-            print(f"❌ Error creating SIP participant: {e.message}")
-            print(f"SIP status: {e.metadata.get('sip_status_code')} {e.metadata.get('sip_status')}")
+            logger.error(
+                "Error creating SIP participant: %s (SIP status: %s %s)",
+                e.message, e.metadata.get('sip_status_code'), e.metadata.get('sip_status')
+            )
             ctx.shutdown()
             return
     
     else:
         participant = await ctx.wait_for_participant()
         thread_id = get_thread_id(participant.sid)
-        print(f"🚀 Starting YojnaPath voice assistant for participant {participant.identity} (thread ID: {thread_id})")
+        logger.info(
+            "Starting YojnaPath voice assistant for participant %s (thread ID: %s)",
+            sensitive(participant.identity), thread_id
+        )
         
         is_sip_call = participant.kind == "sip"
         if is_sip_call:
-            print(f"📞 SIP call detected from participant: {participant.identity}")
+            logger.info("SIP call detected from participant: %s", sensitive(participant.identity))
         
         await session.start(
             agent=assistant,
@@ -323,30 +299,28 @@ async def entrypoint(ctx: agents.JobContext):
             ),
         )
         
-        if is_sip_call:
-            await session.generate_reply(
-                instructions="""यह एक इनबाउंड फ़ोन कॉल है। यूज़र का अभिवादन करें और बताएं कि आप YojnaPath असिस्टेंट हैं। 
-                सरकारी योजनाओं की जानकारी देने में आपकी सहायता कर सकते हैं।"""
-            )
-        else:
-            await session.generate_reply(
-                instructions="""यूज़र का अभिवादन करें और उन्हें YojnaPath के बारे में बताएं। 
-                कहें कि आप सरकारी योजनाओं की जानकारी देने में सहायता कर सकते हैं।"""
-            )
+        await session.say(greeting)
 
-    print("✅ YojnaPath voice assistant started successfully!")
+    logger.info("YojnaPath voice assistant started for thread %s", thread_id)
 
 class YojnaPathWorkerOptions(agents.WorkerOptions):
     def __init__(self):
+        # Load-aware admission unless YOJNAPATH_ADMIT_MAX_JOBS=0
+        admission = {}
+        if admission_enabled():
+            controller = AdmissionController()
+            admission = dict(load_fnc=controller.load_fnc, request_fnc=controller.request_fnc,
+                             load_threshold=FULL_LOAD)
         super().__init__(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=prewarm_resources_wrapper,  # ✅ FIXED here
-            agent_name="yojna-path-agent"
+            agent_name="yojna-path-agent",
+            **admission
         )
 
 def main():
-    print("🎯 Starting YojnaPath LiveKit Voice Agent with SIP Support")
-    print("=" * 60)
+    setup_logging()
+    logger.info("Starting YojnaPath LiveKit Voice Agent with SIP Support")
     
     required_env_vars = [
         "GOOGLE_SPEECH_KEY",
@@ -362,24 +336,23 @@ def main():
     missing_optional = [var for var in optional_env_vars if not os.getenv(var)]
     
     if missing_vars:
-        print(f"❌ Missing required environment variables: {missing_vars}")
-        print("Please set these in your .env file:")
-        for var in missing_vars:
-            print(f"  {var}=your_value_here")
+        logger.error("Missing required environment variables: %s; set them in your .env file", missing_vars)
         return
     
     if missing_optional:
-        print(f"⚠️  Missing optional environment variables: {missing_optional}")
-        print("Set LIVEKIT_SIP_TRUNK_ID to enable outbound calling functionality")
+        logger.warning(
+            "Missing optional environment variables: %s; set LIVEKIT_SIP_TRUNK_ID to enable outbound calling",
+            missing_optional
+        )
     
-    print("✅ Environment validation passed")
+    logger.info("Environment validation passed")
     
     try:
         agents.cli.run_app(YojnaPathWorkerOptions())
     except KeyboardInterrupt:
-        print("\n👋 YojnaPath agent stopped by user")
+        logger.info("YojnaPath agent stopped by user")
     except Exception as e:
-        print(f"❌ Error running YojnaPath agent: {e}")
+        logger.error("Error running YojnaPath agent: %s", e)
 
 async def test_outbound_call():
     phone_number = input("Enter phone number to call (e.g., +1234567890): ")
@@ -0,0 +1,246 @@
+"""
+Intent pre-routing on streaming STT partials.
+
+While the caller is speaking, every interim transcript is fed to a lightweight
+keyword router that scores the stages reachable from the current stage. When
+the leading candidate's tool (scheme_tool) is one the current stage declares,
+that declared call is made in the background with the partial transcript, so
+when the final transcript arrives the graph's tool node can use the result
+instead of calling the tool again. A result is only used if the tool node would
+make exactly the same call (same tool, same arguments, the final transcript
+equal to the partial); anything else is dropped.
+
+Enable with YOJNAPATH_PREROUTE=1.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from langgraph_app.text_normalizer import normalize_utterance
+from langgraph_app.tool_executor import default_tool_executor, format_tool_result
+from models import Stage
+
+logger = logging.getLogger(__name__)
+
+# Hindi, Hinglish and English cue words per stage
+STAGE_KEYWORDS: Dict[str, tuple[str, ...]] = {
+    "scheme_doubt_solving": (
+        "eligibility", "eligible", "patrata", "पात्रता", "document", "documents", "dastavej", "दस्तावेज़",
+        "benefit", "benefits", "labh", "लाभ", "scheme", "yojana", "yojna", "योजना", "kisan", "awas",
+    ),
+    "gather_info": ("recommend", "suggest", "batao", "बताओ", "pata", "पता", "nahi", "नहीं"),
+    "preference": ("more", "different", "other", "aur", "और", "dusri", "दूसरी", "category"),
+    "recommend_scheme": (
+        "education", "shiksha", "शिक्षा", "women", "mahila", "महिला", "housing", "ghar", "घर",
+        "agriculture", "kheti", "खेती", "preference",
+    ),
+    "kb_tool_call": ("apply", "application", "aavedan", "आवेदन", "form", "फॉर्म", "kaise", "कैसे", "register", "help"),
+    "farewell": ("bye", "thanks", "thank", "dhanyavad", "धन्यवाद", "shukriya", "शुक्रिया", "alvida", "bas", "बस"),
+}
+
+# Tool pre-fetched when a stage is the likely next stage
+STAGE_PREFETCH_TOOLS: Dict[str, str] = {
+    "scheme_doubt_solving": "scheme_tool",
+    "recommend_scheme": "scheme_tool",
+}
+
+MIN_PARTIAL_WORDS = 3
+
+# \w alone splits Devanagari words at vowel signs, so the whole block is included
+_WORD = re.compile(r"[\w\u0900-\u097F]+")
+
+
+def preroute_enabled() -> bool:
+    return os.getenv("YOJNAPATH_PREROUTE", "").lower() in ("1", "true", "yes")
+
+
+class IncrementalRouter:
+    """
+    Scores candidate next stages from a growing transcript.
+
+    Partials usually extend the previous one, so only the new words are scored;
+    a revised partial (not an extension) restarts scoring from scratch.
+    """
+
+    def __init__(self, candidate_stages: Iterable[str], keywords: Optional[Dict[str, Iterable[str]]] = None):
+        keywords = keywords or STAGE_KEYWORDS
+        self.candidates = list(dict.fromkeys(candidate_stages))
+        # word -> stages it votes for, restricted to the reachable stages. Keywords are
+        # indexed normalized, as transcripts are ("yojna" and "yojnaa" are both "yojana")
+        self._index: Dict[str, List[str]] = {}
+        for stage_id in self.candidates:
+            for word in keywords.get(stage_id, ()):
+                stages = self._index.setdefault(normalize_utterance(word), [])
+                if stage_id not in stages:
+                    stages.append(stage_id)
+        self.reset()
+
+    def reset(self) -> None:
+        self._text = ""
+        self._words_seen = 0
+        self.scores: Dict[str, int] = {stage_id: 0 for stage_id in self.candidates}
+
+    def update(self, partial: str) -> Optional[str]:
+        """Feed the latest partial transcript; returns the leading candidate, if any"""
+        partial = partial.lower()
+        if not partial.startswith(self._text):
+            self.reset()
+        words = _WORD.findall(partial)
+        for word in words[self._words_seen:]:
+            for stage_id in self._index.get(word, ()):
+                self.scores[stage_id] += 1
+        self._text = partial
+        self._words_seen = len(words)
+        return self.best()
+
+    def best(self) -> Optional[str]:
+        if not self.scores:
+            return None
+        stage_id, score = max(self.scores.items(), key=lambda item: item[1])
+        return stage_id if score > 0 else None
+
+
+@dataclass
+class PreRoute:
+    """Pre-routing state for one upcoming user turn"""
+    router: IncrementalRouter
+    # The stage the turn will run on, whose declared tool calls may be pre-fetched
+    stage: Optional[Stage] = None
+    config_version: Optional[int] = None
+    text: str = ""
+    candidate: Optional[str] = None
+    prefetch: Optional[asyncio.Task] = None
+    # The exact tool call ({"tool", "tool_input"}) the pre-fetch is making
+    prefetch_call: Optional[Dict[str, Any]] = None
+
+
+# Pending pre-routes keyed by LangGraph thread_id
+_routes: Dict[str, PreRoute] = {}
+
+
+async def consume_preroute(thread_id: str, calls: Sequence[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Take the pending pre-route for a thread.
+
+    Returns {tool name: formatted result} if the pre-fetch made one of `calls`
+    (the tool node's calls for the final transcript) exactly, otherwise an
+    empty dict; a pre-fetch that matches none of them is cancelled.
+    """
+    route = _routes.pop(thread_id, None)
+    if route is None or route.prefetch is None or route.prefetch_call is None:
+        return {}
+
+    if route.prefetch_call not in calls:
+        route.prefetch.cancel()
+        return {}
+
+    try:
+        return {route.prefetch_call["tool"]: await route.prefetch}
+    except (asyncio.CancelledError, Exception) as e:
+        logger.debug("Pre-fetch failed: %s", e)
+        return {}
+
+
+def drop_preroute(thread_id: str) -> None:
+    """Cancel and forget a thread's pending pre-route, e.g. when the session closes"""
+    route = _routes.pop(thread_id, None)
+    if route and route.prefetch:
+        route.prefetch.cancel()
+
+
+async def _run_prefetch(call: Dict[str, Any]) -> str:
+    result = await default_tool_executor().ainvoke(call)
+    return format_tool_result(call["tool"], result)
+
+
+class PreRouter:
+    """
+    Feeds one AgentSession's interim transcripts into an IncrementalRouter.
+
+    Usage:
+        PreRouter(graph, config).attach(session)
+    """
+
+    def __init__(self, graph: Any, config: Dict[str, Any]):
+        self._graph = graph
+        self._config = config
+        self._thread_id = config["configurable"]["thread_id"]
+        self._prepare_task: Optional[asyncio.Task] = None
+
+    def attach(self, session: Any) -> None:
+        session.on("user_state_changed", self._on_user_state_changed)
+        session.on("user_input_transcribed", self._on_user_input_transcribed)
+        session.on("close", self._on_close)
+
+    def _on_user_state_changed(self, ev: Any) -> None:
+        if ev.new_state == "speaking":
+            self._prepare_task = asyncio.create_task(self.on_speech_start())
+
+    def _on_user_input_transcribed(self, ev: Any) -> None:
+        if not ev.is_final:
+            self.on_partial(normalize_utterance(ev.transcript))
+
+    def _on_close(self, ev: Any = None) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Drop the session's pre-route; a hang-up leaves no turn to consume it"""
+        if self._prepare_task:
+            self._prepare_task.cancel()
+        drop_preroute(self._thread_id)
+
+    async def on_speech_start(self) -> None:
+        """Set up a router over the stages reachable from the current stage"""
+        from langgraph_app.graph_builder import stage_registry_for
+
+        try:
+            snapshot = await self._graph.aget_state(self._config)
+        except Exception as e:
+            logger.debug("No state to pre-route on: %s", e)
+            return
+
+        values = snapshot.values if snapshot else {}
+        registry = stage_registry_for(values, self._config)
+        stage_id = values.get("current_stage")
+        stage = registry.stages.get(stage_id) if stage_id else None
+        if stage is None:
+            return
+
+        candidates = [stage.id] + [ns.nextStageId for ns in stage.nextStages or []]
+        previous = _routes.pop(self._thread_id, None)
+        if previous and previous.prefetch:
+            previous.prefetch.cancel()
+        _routes[self._thread_id] = PreRoute(
+            router=IncrementalRouter(candidates), stage=stage, config_version=registry.version
+        )
+
+    def on_partial(self, text: str) -> None:
+        """Update the candidate stage and start pre-fetching the tool call it needs"""
+        from langgraph_app.graph_builder import stage_tool_calls
+
+        route = _routes.get(self._thread_id)
+        if route is None:
+            return
+
+        # Stage prompts are precompiled with the stage config, so only the tool needs warming
+        route.candidate = candidate = route.router.update(text)
+
+        if len(text.split()) < MIN_PARTIAL_WORDS:
+            return
+        tool_name = STAGE_PREFETCH_TOOLS.get(candidate or "")
+        if tool_name is None:
+            return
+        # Only a call the turn's stage declares can be used, with the arguments it declares
+        call = next((c for c in stage_tool_calls(route.stage, text) if c["tool"] == tool_name), None)
+        if call is None or call == route.prefetch_call:
+            return
+
+        if route.prefetch:
+            route.prefetch.cancel()
+        route.text = text
+        route.prefetch_call = call
+        route.prefetch = asyncio.create_task(_run_prefetch(call))
@@ -0,0 +1,205 @@
+"""
+Offline replay of recorded conversations through the YojnaPath graph.
+
+Reads JSONL transcripts, runs many conversations concurrently with asyncio and
+writes one compact record per turn (stage transition, latency, token counts).
+
+Transcript format, one conversation per line:
+
+    {"conversation_id": "c1", "turns": ["Hello", "PM Kisan ke baare mein batao"],
+     "expected_stages": ["scheme_doubt_solving", "scheme_doubt_solving"]}
+
+`expected_stages` is optional; when present every turn is checked against it so
+the replay can be used as a stage-flow regression test.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, cast
+
+from langchain_core.messages import AIMessage
+
+from langgraph_app.graph_builder import (
+    build_yojnapath_graph,
+    init_conversation,
+    add_user_input,
+    State
+)
+
+# Column order of the per-turn output
+TURN_FIELDS = [
+    "conversation_id",
+    "turn",
+    "from_stage",
+    "to_stage",
+    "expected_stage",
+    "latency_ms",
+    "input_tokens",
+    "output_tokens",
+    "error",
+]
+
+
+@dataclass
+class Transcript:
+    conversation_id: str
+    turns: List[str]
+    expected_stages: Optional[List[str]] = None
+
+
+@dataclass
+class TurnRecord:
+    conversation_id: str
+    turn: int
+    from_stage: str
+    to_stage: str
+    expected_stage: Optional[str]
+    latency_ms: float
+    input_tokens: int
+    output_tokens: int
+    error: Optional[str] = None
+
+    @property
+    def mismatch(self) -> bool:
+        return self.expected_stage is not None and self.expected_stage != self.to_stage
+
+
+@dataclass
+class ReplaySummary:
+    conversations: int = 0
+    turns: int = 0
+    errors: int = 0
+    mismatches: int = 0
+    wall_time_s: float = 0.0
+    latencies_ms: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.wall_time_s if self.wall_time_s else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used when the provider does not report usage"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def load_transcripts(path: str) -> List[Transcript]:
+    """Load transcripts from a JSONL file"""
+    transcripts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            turns = [t["user"] if isinstance(t, dict) else t for t in data["turns"]]
+            transcripts.append(Transcript(
+                conversation_id=str(data.get("conversation_id") or f"replay-{line_no}"),
+                turns=turns,
+                expected_stages=data.get("expected_stages"),
+            ))
+    return transcripts
+
+
+def _turn_tokens(user_input: str, message: Any) -> tuple[int, int]:
+    """Token usage of a turn, preferring the usage reported by the provider"""
+    usage = getattr(message, "usage_metadata", None) if isinstance(message, AIMessage) else None
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    reply = message.content if isinstance(message, AIMessage) else ""
+    return estimate_tokens(user_input), estimate_tokens(str(reply))
+
+
+async def replay_conversation(graph: Any, transcript: Transcript) -> List[TurnRecord]:
+    """Run one transcript turn by turn and return a record per turn"""
+    records = []
+    state = init_conversation(transcript.conversation_id)
+    expected = transcript.expected_stages or []
+
+    for i, user_input in enumerate(transcript.turns):
+        from_stage = state.get("current_stage", "")
+        error = None
+        start = time.perf_counter()
+        try:
+            result = await graph.ainvoke(add_user_input(state, user_input), config={"recursion_limit": 10})
+            state = cast(State, result)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        messages = state.get("messages", [])
+        input_tokens, output_tokens = _turn_tokens(user_input, messages[-1]) if messages and not error else (0, 0)
+        records.append(TurnRecord(
+            conversation_id=transcript.conversation_id,
+            turn=i,
+            from_stage=from_stage,
+            to_stage=state.get("current_stage", ""),
+            expected_stage=expected[i] if i < len(expected) else None,
+            latency_ms=round(latency_ms, 2),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            error=error,
+        ))
+        if error:
+            break
+    return records
+
+
+async def replay(
+    transcripts: List[Transcript],
+    graph: Any = None,
+    concurrency: int = 32,
+) -> tuple[List[TurnRecord], ReplaySummary]:
+    """Replay transcripts concurrently, at most `concurrency` conversations at a time"""
+    graph = graph or build_yojnapath_graph()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(transcript: Transcript) -> List[TurnRecord]:
+        async with semaphore:
+            return await replay_conversation(graph, transcript)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run(t) for t in transcripts))
+
+    summary = ReplaySummary(conversations=len(transcripts), wall_time_s=time.perf_counter() - start)
+    records = [record for conversation in results for record in conversation]
+    for record in records:
+        summary.turns += 1
+        summary.errors += record.error is not None
+        summary.mismatches += record.mismatch
+        summary.latencies_ms.append(record.latency_ms)
+    return records, summary
+
+
+def write_records(records: List[TurnRecord], path: str, output_format: str = "jsonl") -> None:
+    """Write turn records as JSONL rows or as a single columnar JSON object"""
+    rows = [asdict(r) for r in records]
+    with open(path, "w", encoding="utf-8") as f:
+        if output_format == "columnar":
+            columns: Dict[str, List[Any]] = {name: [row[name] for row in rows] for name in TURN_FIELDS}
+            json.dump(columns, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def run_replay(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 32,
+    output_format: str = "jsonl",
+) -> ReplaySummary:
+    """Replay a transcript file and write per-turn outcomes to `output_path`"""
+    transcripts = load_transcripts(input_path)
+    records, summary = asyncio.run(replay(transcripts, concurrency=concurrency))
+    write_records(records, output_path, output_format)
+    return summary
@@ -0,0 +1,251 @@
+"""
+Speculative LLM calls started while the user is still speaking.
+
+After a recommendation or a doubt-solving answer the next user turn is very
+predictable. When the user starts speaking (VAD), the conversation is
+snapshotted; on each interim STT transcript a provisional LLM call is started. When the final
+transcript arrives, aprocess_stage commits the speculative result if the final
+text matches the interim text closely, otherwise the call is cancelled and a
+normal LLM call is made.
+
+Enable with YOJNAPATH_SPECULATIVE=1; YOJNAPATH_SPECULATIVE_STAGES overrides the
+comma separated list of stages to speculate in.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+from langgraph_app.text_normalizer import normalize_utterance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPECULATIVE_STAGES = ("recommend_scheme", "scheme_doubt_solving")
+
+# Minimum similarity between the interim and final transcript to commit a speculation
+MATCH_THRESHOLD = 0.85
+# Interim transcripts shorter than this carry too little intent to speculate on
+MIN_INTERIM_WORDS = 3
+# Speculative calls restarted at most this many times per user turn
+MAX_RESTARTS = 3
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def speculation_enabled() -> bool:
+    return os.getenv("YOJNAPATH_SPECULATIVE", "").lower() in ("1", "true", "yes")
+
+
+def speculative_stages() -> tuple[str, ...]:
+    configured = os.getenv("YOJNAPATH_SPECULATIVE_STAGES")
+    if not configured:
+        return DEFAULT_SPECULATIVE_STAGES
+    return tuple(s.strip() for s in configured.split(",") if s.strip())
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+def transcript_similarity(a: str, b: str) -> float:
+    """Similarity ratio of two transcripts after normalization (0.0 to 1.0)"""
+    a, b = normalize_transcript(a), normalize_transcript(b)
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Every started call ends up counted once: committed or discarded when the
+    final transcript decides it, cancelled when nothing does (a restart, the
+    next turn's speech or the session closing first)
+    """
+    started: int = 0
+    committed: int = 0
+    discarded: int = 0
+    cancelled: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        decided = self.committed + self.discarded
+        return self.committed / decided if decided else 0.0
+
+
+stats = SpeculationStats()
+
+
+@dataclass
+class SpeculativeTurn:
+    """Speculation state for one upcoming user turn of a conversation"""
+    stage_id: str
+    history: List[Any]
+    config_version: Optional[int] = None
+    flow: Optional[str] = None
+    text: str = ""
+    task: Optional[asyncio.Task] = None
+    restarts: int = 0
+
+    def cancel(self) -> None:
+        """Cancel a call no final transcript will decide"""
+        if self.task and not self.task.done():
+            self.task.cancel()
+            stats.cancelled += 1
+
+
+# Pending speculations keyed by LangGraph thread_id
+_turns: Dict[str, SpeculativeTurn] = {}
+
+
+async def consume_speculation(thread_id: str, stage_id: str, final_text: str) -> Optional[Any]:
+    """
+    Take the pending speculation for a thread.
+
+    Returns the speculative LLM output when it was made for the same stage and
+    the final transcript matches, otherwise cancels it and returns None.
+    """
+    turn = _turns.pop(thread_id, None)
+    if turn is None or turn.task is None:
+        return None
+
+    if turn.stage_id != stage_id or transcript_similarity(turn.text, final_text) < MATCH_THRESHOLD:
+        turn.task.cancel()
+        stats.discarded += 1
+        return None
+
+    try:
+        output = await turn.task
+    except (asyncio.CancelledError, Exception) as e:
+        logger.debug("Speculative call failed, falling back to a normal call: %s", e)
+        stats.discarded += 1
+        return None
+    # No output when the call was skipped (its flow was busy)
+    if output is None:
+        stats.discarded += 1
+        return None
+
+    stats.committed += 1
+    return output
+
+
+def drop_speculation(thread_id: str) -> None:
+    """Cancel and forget a thread's pending speculation, e.g. when the caller hangs up mid-utterance"""
+    turn = _turns.pop(thread_id, None)
+    if turn:
+        turn.cancel()
+
+
+class SpeculativeResponder:
+    """
+    Drives speculation for one AgentSession from its VAD and STT events.
+
+    Usage:
+        responder = SpeculativeResponder(graph, config)
+        responder.attach(session)
+    """
+
+    def __init__(self, graph: Any, config: Dict[str, Any], stages: Optional[tuple[str, ...]] = None):
+        self._graph = graph
+        self._config = config
+        self._thread_id = config["configurable"]["thread_id"]
+        self._stages = stages or speculative_stages()
+        self._prepare_task: Optional[asyncio.Task] = None
+
+    def attach(self, session: Any) -> None:
+        session.on("user_state_changed", self._on_user_state_changed)
+        session.on("user_input_transcribed", self._on_user_input_transcribed)
+        session.on("close", self._on_close)
+
+    def _on_user_state_changed(self, ev: Any) -> None:
+        if ev.new_state == "speaking":
+            self._prepare_task = asyncio.create_task(self.on_speech_start())
+
+    def _on_user_input_transcribed(self, ev: Any) -> None:
+        if not ev.is_final:
+            self.on_interim(normalize_utterance(ev.transcript))
+
+    def _on_close(self, ev: Any = None) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Drop the session's speculation; a hang-up leaves no final transcript to consume it"""
+        if self._prepare_task:
+            self._prepare_task.cancel()
+        drop_speculation(self._thread_id)
+
+    async def on_speech_start(self) -> None:
+        """Snapshot the conversation for the coming turn"""
+        from langgraph_app import graph_builder
+
+        try:
+            snapshot = await self._graph.aget_state(self._config)
+        except Exception as e:
+            logger.debug("No state to speculate on: %s", e)
+            return
+
+        values = snapshot.values if snapshot else {}
+        stage_id = values.get("current_stage")
+        if stage_id not in self._stages:
+            return
+        # Stages routed to no model have nothing to speculate on
+        registry = graph_builder.stage_registry_for(values, self._config)
+        stage = registry.stages.get(stage_id)
+        if stage is None or graph_builder.stage_tier(stage) == graph_builder.TIER_NONE:
+            return
+
+        previous = _turns.pop(self._thread_id, None)
+        if previous:
+            previous.cancel()
+        _turns[self._thread_id] = SpeculativeTurn(
+            stage_id=stage_id,
+            history=list(values.get("messages", [])),
+            config_version=values.get("config_version"),
+            flow=registry.flow,
+        )
+
+    def on_interim(self, text: str) -> None:
+        """Start (or restart) the provisional LLM call on an interim transcript"""
+        turn = _turns.get(self._thread_id)
+        if turn is None or len(text.split()) < MIN_INTERIM_WORDS:
+            return
+        if turn.task and transcript_similarity(turn.text, text) >= MATCH_THRESHOLD:
+            return
+        if turn.restarts >= MAX_RESTARTS:
+            return
+
+        turn.cancel()
+        turn.text = text
+        turn.restarts += 1
+        turn.task = asyncio.create_task(
+            self._speculate(turn.stage_id, turn.history, text, turn.config_version, turn.flow, self._thread_id)
+        )
+        stats.started += 1
+
+    @staticmethod
+    async def _speculate(stage_id: str, history: List[Any], text: str, config_version: Optional[int],
+                         flow: Optional[str] = None, thread_id: str = "") -> Any:
+        from langchain_core.messages import HumanMessage
+        from langgraph_app import graph_builder
+        from langgraph_app.llm_scheduler import PRIORITY_SPECULATIVE, llm_context
+
+        # Versions are per flow: without it another tenant's turn would use the default flow's config
+        registry = graph_builder.get_registry(config_version, flow or graph_builder.DEFAULT_FLOW)
+        # A provisional call mustn't take a slot a real turn of a busy flow is waiting for
+        if graph_builder.tenant_limiter(registry.flow).busy():
+            return None
+        stage = graph_builder.resolve_stage(registry, stage_id)
+        tier = graph_builder.stage_tier(stage)
+        context = await graph_builder.afetch_stage_context(stage, text) if stage.tools else ""
+        prompt = graph_builder.build_stage_prompt(
+            stage, history + [HumanMessage(content=text)], context, registry
+        )
+        # Queued behind live turns when the model is at its rate limit
+        with llm_context(thread_id, PRIORITY_SPECULATIVE):
+            return await graph_builder.scheduled_llm_call(tier, registry.transitions[stage.id], prompt)
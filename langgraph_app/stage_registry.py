@@ -0,0 +1,365 @@
+"""
+Versioned, hot-reloadable stage registry.
+
+stage_config.json is parsed, validated and compiled (stage lookup, transition
+table and the static prompt text of every stage) into an immutable
+StageRegistry, or loaded from the artifact built by flow_compiler. A
+background watcher polls the file and, when it changes, builds the next
+version off the hot path and swaps it in with a single reference assignment.
+
+Conversations pin the version they started on (State.config_version), so a
+reload only affects new conversations. Recent versions are retained so pinned
+conversations can keep resolving their stages.
+
+One process can host several flows (tenants, e.g. state-specific scheme bots),
+each with its own stage config, listed in YOJNAPATH_FLOWS:
+
+    {"mp_schemes": {"config": "flows/mp.json", "max_concurrent_turns": 8}}
+
+Config paths are relative to that file. Version numbers are assigned per
+process, so a pinned version is only used if it belongs to the conversation's
+flow here (a conversation moved from another worker may carry another flow's
+number); otherwise the flow's latest version is used. Flows with
+identical configs share one compiled registry, and the static prompt text of
+all flows is interned so repeated text is held once.
+
+Configuration:
+    YOJNAPATH_STAGE_CONFIG     path to the stage config of the default flow (default: stage_config.json in the repo root)
+    YOJNAPATH_FLOWS            JSON file of further flows; unset hosts only the default flow
+    YOJNAPATH_CONFIG_RELOAD    poll interval in seconds; 0 or unset disables the watcher
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from models import Stage, StageType
+from langgraph_app.flow_compiler import FlowReport, analyze_flow, artifact_path, read_artifact, transition_table
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stage_config.json")
+
+# Versions kept per flow for conversations pinned to an older config
+MAX_RETAINED_VERSIONS = 16
+
+DEFAULT_FLOW = "default"
+
+
+@dataclass(frozen=True)
+class FlowSpec:
+    """A flow hosted by this process"""
+    name: str
+    config: str
+    # Turns of this flow calling the LLM at once; 0 is unlimited
+    max_concurrent_turns: int = 0
+
+
+@lru_cache(maxsize=None)
+def _read_flow_specs(flows_path: str, default_config: str) -> Dict[str, FlowSpec]:
+    specs = {DEFAULT_FLOW: FlowSpec(DEFAULT_FLOW, default_config)}
+    if not flows_path:
+        return specs
+    with open(flows_path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, dict):
+        raise ValueError(f"{flows_path} must map flow names to their config")
+    base = os.path.dirname(os.path.abspath(flows_path))
+    for name, entry in entries.items():
+        specs[name] = FlowSpec(
+            name=name,
+            config=os.path.join(base, entry["config"]),
+            max_concurrent_turns=int(entry.get("max_concurrent_turns", 0)),
+        )
+    return specs
+
+
+def flow_specs() -> Dict[str, FlowSpec]:
+    """Every hosted flow by name, the default one included"""
+    return _read_flow_specs(os.getenv("YOJNAPATH_FLOWS", ""), os.getenv("YOJNAPATH_STAGE_CONFIG") or DEFAULT_CONFIG_PATH)
+
+
+def flow_spec(flow: str) -> FlowSpec:
+    spec = flow_specs().get(flow)
+    if spec is None:
+        raise ValueError(f"Unknown flow {flow!r}")
+    return spec
+
+
+def stage_config_path(flow: str = DEFAULT_FLOW) -> str:
+    return flow_spec(flow).config
+
+
+def render_prompt_parts(stage: Stage, stages: Dict[str, Stage]) -> tuple[str, str]:
+    """Static prompt text before and after the conversation context of a stage"""
+    # Get possible next stages for context
+    next_stages_info = ""
+    if stage.nextStages:
+        next_stages_info = "\n\nPossible next stages:\n"
+        for next_stage in stage.nextStages:
+            next_stage_obj = stages.get(next_stage.nextStageId)
+            if next_stage_obj:
+                next_stages_info += f"- {next_stage.nextStageId} ({next_stage_obj.name}): {next_stage.condition}\n"
+
+    head = f"""You are YojnaPath, a helpful government scheme assistant for rural citizens.
+
+Current Stage: {stage.name}
+Stage Description: {stage.prompt}
+
+"""
+    tail = f"""
+
+{next_stages_info}
+
+Instructions:
+1. Respond helpfully to the user's message
+2. Choose the most appropriate next stage based on the user's intent
+3. If user wants to end conversation or says goodbye, choose 'farewell'
+4. If user has scheme-related doubts, choose 'scheme_doubt_solving'
+5. If user needs application help, choose 'kb_tool_call'
+
+Respond with:
+- response: Your helpful response to the user
+- next_stage: The ID of the next appropriate stage
+- confidence: Your confidence in the stage choice (0.0 to 1.0)"""
+    return head, tail
+
+
+@dataclass(frozen=True)
+class StageRegistry:
+    """One compiled version of the stage configuration; never mutated after creation"""
+    version: int
+    stages: Dict[str, Stage]
+    start_stage: Stage
+    prompt_parts: Dict[str, tuple[str, str]]
+    # Allowed next stage ids per stage, in config order
+    transitions: Dict[str, tuple[str, ...]]
+    digest: str
+    source: str = ""
+    flow: str = DEFAULT_FLOW
+
+
+def parse_stages(stages_data: List[Dict[str, Any]]) -> Dict[str, Stage]:
+    """Parse stage definitions into Stage models, keyed by id"""
+    if not isinstance(stages_data, list):
+        raise ValueError("Stage config must be a JSON list of stages")
+
+    stages: Dict[str, Stage] = {}
+    for stage_data in stages_data:
+        stage = Stage(**stage_data)
+        if stage.id in stages:
+            raise ValueError(f"Invalid stage config: duplicate stage id '{stage.id}'")
+        stages[stage.id] = stage
+    return stages
+
+
+def _build_registry(stages: Dict[str, Stage], version: int, source: str, digest: str) -> StageRegistry:
+    start_stage = next(s for s in stages.values() if s.type == StageType.START)
+    return StageRegistry(
+        version=version,
+        stages=stages,
+        start_stage=start_stage,
+        prompt_parts={stage_id: render_prompt_parts(stage, stages) for stage_id, stage in stages.items()},
+        transitions=transition_table(stages),
+        digest=digest,
+        source=source,
+    )
+
+
+def compile_registry(stages_data: List[Dict[str, Any]], version: int, source: str = "", digest: str = "") -> StageRegistry:
+    """Validate stage definitions and precompute everything a turn needs; raises ValueError on an invalid flow"""
+    stages = parse_stages(stages_data)
+    report = analyze_flow(stages)
+    if not report.ok:
+        raise ValueError("Invalid stage config: " + "; ".join(report.errors))
+    for warning in report.warnings:
+        logger.warning("Stage config %s: %s", source, warning)
+    return _build_registry(stages, version, source, digest)
+
+
+def _share_prompts(registry: StageRegistry) -> StageRegistry:
+    # Stage prompts repeat across flows and config versions; keep one copy of each text
+    prompt_parts = {
+        stage_id: (sys.intern(head), sys.intern(tail)) for stage_id, (head, tail) in registry.prompt_parts.items()
+    }
+    return replace(registry, prompt_parts=prompt_parts)
+
+
+def _read_raw(path: str) -> tuple[bytes, str]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def compile_config(path: str) -> tuple[Optional[StageRegistry], FlowReport]:
+    """Parse and analyze a config file; the registry is None if the flow has errors"""
+    raw, digest = _read_raw(path)
+    stages = parse_stages(json.loads(raw))
+    report = analyze_flow(stages)
+    if not report.ok:
+        return None, report
+    return _build_registry(stages, 0, path, digest), report
+
+
+# The live registry of each flow is swapped by reference; readers never take the lock
+_current: Dict[str, StageRegistry] = {}
+_versions: Dict[int, StageRegistry] = {}
+_last_version = 0
+_swap_lock = threading.Lock()
+
+
+def _load_unversioned(path: str) -> StageRegistry:
+    """
+    Registry for a config file, from its compiled artifact when that is up to
+    date, otherwise parsed and validated from the JSON.
+    """
+    if path.endswith(".pkl"):
+        registry = read_artifact(path)
+        if registry is None:
+            raise ValueError(f"Not a usable flow artifact: {path}")
+        return registry
+
+    raw, digest = _read_raw(path)
+    # Any flow already running this exact config shares its stages and prompts
+    for loaded in list(_current.values()):
+        if loaded.digest == digest:
+            return loaded
+    registry = read_artifact(artifact_path(path), source_digest=digest)
+    if registry is not None:
+        logger.debug("Using compiled flow artifact for %s", path)
+        return _share_prompts(registry)
+    return _share_prompts(compile_registry(json.loads(raw), 0, source=path, digest=digest))
+
+
+def load_registry(path: Optional[str] = None, flow: str = DEFAULT_FLOW) -> StageRegistry:
+    """
+    Load the config at `path` (default: the flow's config) and make it the
+    flow's current registry.
+
+    The version is only bumped when the config content changed.
+    """
+    global _last_version
+    path = path or stage_config_path(flow)
+    # Compiled outside the lock; only the swap is serialized
+    compiled = _load_unversioned(path)
+
+    with _swap_lock:
+        current = _current.get(flow)
+        if current is not None and current.digest == compiled.digest:
+            return current
+        _last_version += 1
+        version = _last_version
+        registry = replace(compiled, version=version, source=path, flow=flow)
+        _versions[version] = registry
+        flow_versions = sorted(v for v, r in _versions.items() if r.flow == flow)
+        for old_version in flow_versions[:-MAX_RETAINED_VERSIONS]:
+            del _versions[old_version]
+        _current[flow] = registry
+
+    logger.info("Loaded stage config version %d of flow %s (%d stages) from %s",
+                version, flow, len(registry.stages), path)
+    return registry
+
+
+def current_registry(flow: str = DEFAULT_FLOW) -> StageRegistry:
+    """The flow's latest registry, loaded on first use"""
+    return _current.get(flow) or load_registry(flow=flow)
+
+
+def get_registry(version: Optional[int] = None, flow: str = DEFAULT_FLOW) -> StageRegistry:
+    """
+    Registry for a pinned version, or the flow's latest one if the version is
+    unknown, evicted or another flow's
+    """
+    # Versions start at 1; 0/None means the conversation isn't pinned yet
+    if version:
+        registry = _versions.get(version)
+        if registry is not None and registry.flow == flow:
+            return registry
+        if registry is None:
+            logger.warning("Stage config version %s is no longer retained, using the latest of flow %s", version, flow)
+        else:
+            logger.warning("Stage config version %s belongs to flow %s here, using the latest of flow %s",
+                           version, registry.flow, flow)
+    return current_registry(flow)
+
+
+def load_flows() -> Dict[str, StageRegistry]:
+    """Load every hosted flow up front, so no caller pays for compiling one"""
+    return {flow: current_registry(flow) for flow in flow_specs()}
+
+
+class StageConfigWatcher:
+    """
+    Polls the stage config and hot-swaps the registry when it changes.
+
+    Invalid configs are logged and ignored; the previous version stays live.
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: float = 2.0, flow: str = DEFAULT_FLOW):
+        self.flow = flow
+        self.path = path or stage_config_path(flow)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_stat: Optional[tuple[int, int]] = None
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; returns True on a swap"""
+        stat = self._stat()
+        if stat is None or stat == self._last_stat:
+            return False
+        self._last_stat = stat
+
+        previous = _current.get(self.flow)
+        try:
+            registry = load_registry(self.path, self.flow)
+        except (OSError, ValueError) as e:
+            logger.error("Stage config reload failed, keeping version %s: %s",
+                         previous.version if previous else None, e)
+            return False
+        return registry is not previous
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> "StageConfigWatcher":
+        self._last_stat = self._stat()
+        current_registry(self.flow)
+        self._thread = threading.Thread(target=self._run, name=f"stage-config-watcher-{self.flow}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+_watchers: Dict[str, StageConfigWatcher] = {}
+
+
+def start_config_watcher(interval: Optional[float] = None) -> List[StageConfigWatcher]:
+    """Start a watcher for every hosted flow (once); interval defaults to YOJNAPATH_CONFIG_RELOAD"""
+    if interval is None:
+        interval = float(os.getenv("YOJNAPATH_CONFIG_RELOAD", "0") or 0)
+    if interval <= 0:
+        return []
+    for flow in flow_specs():
+        if flow not in _watchers:
+            _watchers[flow] = StageConfigWatcher(interval=interval, flow=flow).start()
+    return list(_watchers.values())
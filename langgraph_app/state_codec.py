@@ -0,0 +1,273 @@
+"""
+Compact binary encoding of conversation checkpoints.
+
+Used by SharedCheckpointSaver for the records in the shared state store:
+    interning   channel names, graph node names and stage ids are written as
+                small integers: a fixed table of well-known names (append-only,
+                never reorder it) plus a per-record table for anything else
+    messages    packed as (kind, text, id, usage) tuples and compressed as one
+                chunk with a preset Hindi/English dictionary, zstd if the
+                `zstandard` package is installed, zlib otherwise. The whole
+                history is compressed each time: the store keeps only a
+                thread's latest checkpoint, so there is no parent to refer to,
+                and one chunk compresses better than several. Records that
+                hold a list of chunks still decode
+
+Everything else in the checkpoint is plain msgpack, with LangGraph's serializer
+as the fallback for values msgpack can't represent.
+
+Configuration:
+    YOJNAPATH_STATE_COMPRESSION   "zlib" writes zlib even when zstandard is installed, for
+                                  stores shared with workers that don't have it
+"""
+
+import os
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import ormsgpack
+from langchain_core.messages import AIMessage, HumanMessage
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Append-only: records refer to these by position
+KNOWN_STRINGS: Tuple[str, ...] = (
+    # State channels
+    "conversation_id", "current_stage", "messages", "user_input", "tool_context",
+    "config_version", "locale", "slots",
+    # Graph nodes and LangGraph's own channels
+    "__start__", "__input__", "__interrupt__", "tools", "conversation",
+    "branch:to:tools", "branch:to:conversation",
+    # Stage ids of the shipped stage_config.json
+    "start_greet", "scheme_doubt_solving", "gather_info", "preference",
+    "recommend_scheme", "kb_tool_call", "farewell",
+    # Added later
+    "turns", "clarify_options", "flow", "default",
+)
+_KNOWN_INDEX = {s: i for i, s in enumerate(KNOWN_STRINGS)}
+
+# Preset dictionary: phrases that recur in YojnaPath conversations. The most
+# common ones go last, where they are cheapest to reference. Changing it makes
+# existing records undecodable, so add a new entry to _DICTIONARIES instead.
+_DICTIONARY_V1 = "\n".join([
+    "scheme eligibility documents benefits application apply form registration Aadhaar card bank account",
+    "income certificate caste certificate ration card land records farmer women education housing health",
+    "PM Kisan Samman Nidhi Pradhan Mantri Awas Yojana Ayushman Bharat Ujjwala Mudra loan scholarship pension",
+    "Could you please tell me your age, state, occupation and annual income?",
+    "Thank you for using YojnaPath. Have a great day!",
+    "I apologize, but I'm having trouble processing your request. Could you please try again?",
+    "प्रधानमंत्री किसान सम्मान निधि आवास योजना आयुष्मान भारत उज्ज्वला मुद्रा लोन छात्रवृत्ति पेंशन",
+    "आधार कार्ड बैंक खाता आय प्रमाण पत्र जाति प्रमाण पत्र राशन कार्ड ज़मीन के कागज़ात",
+    "किसान महिला शिक्षा आवास खेती स्वास्थ्य रोज़गार गाँव ग्राम पंचायत",
+    "माफ़ करें, मुझे कुछ तकनीकी समस्या हो रही है। कृपया दोबारा कोशिश करें।",
+    "क्या आप किसी खास योजना के बारे में जानना चाहते हैं?",
+    "कृपया अपनी उम्र, राज्य, व्यवसाय और सालाना आय बताइए।",
+    "आवेदन करने के लिए आपको इन दस्तावेज़ों की ज़रूरत होगी:",
+    "इस योजना के लिए पात्रता इस प्रकार है:",
+    "इस योजना के लाभ इस प्रकार हैं:",
+    "मुझे योजना के बारे में बताइए। मैं आवेदन कैसे करूँ? क्या मैं पात्र हूँ?",
+    "योजना पात्रता दस्तावेज़ लाभ आवेदन जानकारी सरकारी है हैं के लिए में की का को और से आप आपको आपकी",
+]).encode("utf-8")
+
+_DICTIONARIES = {1: _DICTIONARY_V1}
+DICTIONARY_ID = 1
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+
+def default_compression() -> str:
+    requested = os.getenv("YOJNAPATH_STATE_COMPRESSION", "").lower()
+    if requested == CODEC_ZLIB or zstandard is None:
+        return CODEC_ZLIB
+    return CODEC_ZSTD
+
+
+# zstd contexts are expensive to set up and can't be shared between threads
+_local = threading.local()
+
+
+def _zstd(dictionary_id: int, decompress: bool) -> Any:
+    contexts = _local.__dict__.setdefault("zstd", {})
+    key = (dictionary_id, decompress)
+    if key not in contexts:
+        zdict = zstandard.ZstdCompressionDict(_DICTIONARIES[dictionary_id], dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        # The record names the dictionary, so frames don't repeat its id
+        contexts[key] = (
+            zstandard.ZstdDecompressor(dict_data=zdict) if decompress
+            else zstandard.ZstdCompressor(level=6, dict_data=zdict, write_dict_id=False)
+        )
+    return contexts[key]
+
+
+def _compress(data: bytes, codec: str, dictionary_id: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        return _zstd(dictionary_id, decompress=False).compress(data)
+    compressor = zlib.compressobj(level=6, zdict=_DICTIONARIES[dictionary_id])
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(data: bytes, codec: str, dictionary_id: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Conversation state is zstd-compressed but zstandard isn't installed")
+        return _zstd(dictionary_id, decompress=True).decompress(data)
+    decompressor = zlib.decompressobj(zdict=_DICTIONARIES[dictionary_id])
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class _Interner:
+    """Refs for strings: well-known ones by position, others through a per-record table"""
+
+    def __init__(self, table: Optional[List[str]] = None):
+        self.table: List[str] = list(table or [])
+        self._index = {s: i for i, s in enumerate(self.table)}
+
+    def ref(self, s: str) -> int:
+        known = _KNOWN_INDEX.get(s)
+        if known is not None:
+            return known
+        if s not in self._index:
+            self._index[s] = len(self.table)
+            self.table.append(s)
+        return len(KNOWN_STRINGS) + self._index[s]
+
+    def lookup(self, ref: int) -> str:
+        return KNOWN_STRINGS[ref] if ref < len(KNOWN_STRINGS) else self.table[ref - len(KNOWN_STRINGS)]
+
+
+def _pack_message(message: Any) -> Optional[list]:
+    if not isinstance(message.content, str):
+        return None
+    if isinstance(message, HumanMessage):
+        return [0, message.content, message.id]
+    if isinstance(message, AIMessage) and not message.tool_calls:
+        return [1, message.content, message.id, message.usage_metadata]
+    return None
+
+
+def _unpack_message(packed: list) -> Any:
+    if packed[0] == 0:
+        return HumanMessage(content=packed[1], id=packed[2])
+    return AIMessage(content=packed[1], id=packed[2], usage_metadata=packed[3])
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(m, (HumanMessage, AIMessage)) for m in value)
+
+
+def _pack_any(value: Any, serde: Any) -> list:
+    """["p", value] when msgpack can hold it as is, else LangGraph's typed serialization"""
+    if value is None or isinstance(value, (str, int, float, bool, dict, list)):
+        try:
+            ormsgpack.packb(value)
+            return ["p", value]
+        except TypeError:
+            pass
+    return ["s", *serde.dumps_typed(value)]
+
+
+def _unpack_any(packed: list, serde: Any) -> Any:
+    if packed[0] == "p":
+        return packed[1]
+    return serde.loads_typed((packed[1], packed[2]))
+
+
+class StateCodec:
+    """Encodes a checkpoint, its channel values and metadata into one compact msgpack-friendly dict"""
+
+    def __init__(self, compression: Optional[str] = None, dictionary_id: int = DICTIONARY_ID):
+        self.compression = compression or default_compression()
+        self.dictionary_id = dictionary_id
+
+    def _message_chunk(self, messages: Sequence[Any]) -> Optional[list]:
+        packed = [_pack_message(m) for m in messages]
+        if any(m is None for m in packed):
+            return None
+        return [len(packed), _compress(ormsgpack.packb(packed), self.compression, self.dictionary_id)]
+
+    def encode(
+        self,
+        checkpoint: Dict[str, Any],
+        values: Dict[str, Any],
+        metadata: Dict[str, Any],
+        serde: Any,
+    ) -> Dict[str, Any]:
+        """Encode a checkpoint (without channel_values), its values and metadata"""
+        interner = _Interner()
+
+        packed_values = []
+        for channel, value in values.items():
+            ref = interner.ref(channel)
+            if _is_message_list(value):
+                chunk = self._message_chunk(value)
+                if chunk is not None:
+                    packed_values.append([ref, "m", [chunk]])
+                    continue
+            if channel == "current_stage" and isinstance(value, str):
+                packed_values.append([ref, "i", interner.ref(value)])
+                continue
+            packed_values.append([ref, *_pack_any(value, serde)])
+
+        checkpoint = dict(checkpoint)
+        packed_checkpoint = [
+            checkpoint.pop("v"),
+            checkpoint.pop("id"),
+            checkpoint.pop("ts"),
+            [[interner.ref(ch), version] for ch, version in checkpoint.pop("channel_versions").items()],
+            [
+                [interner.ref(node), [[interner.ref(ch), version] for ch, version in seen.items()]]
+                for node, seen in checkpoint.pop("versions_seen").items()
+            ],
+            [interner.ref(ch) for ch in checkpoint.pop("updated_channels", None) or []],
+            # Fields added by future LangGraph versions
+            _pack_any(checkpoint, serde) if checkpoint else None,
+        ]
+        return {
+            "codec": [self.compression, self.dictionary_id],
+            "strings": interner.table,
+            "checkpoint": packed_checkpoint,
+            "values": packed_values,
+            "metadata": _pack_any(metadata, serde),
+        }
+
+    @staticmethod
+    def decode(encoded: Dict[str, Any], serde: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """(checkpoint with channel_values, metadata)"""
+        interner = _Interner(encoded["strings"])
+        compression, dictionary_id = encoded["codec"]
+
+        values: Dict[str, Any] = {}
+        for ref, kind, *payload in encoded["values"]:
+            channel = interner.lookup(ref)
+            if kind == "m":
+                messages = []
+                for _, data in payload[0]:
+                    messages.extend(
+                        _unpack_message(m) for m in ormsgpack.unpackb(_decompress(data, compression, dictionary_id))
+                    )
+                values[channel] = messages
+            elif kind == "i":
+                values[channel] = interner.lookup(payload[0])
+            else:
+                values[channel] = _unpack_any([kind, *payload], serde)
+
+        v, checkpoint_id, ts, channel_versions, versions_seen, updated_channels, extra = encoded["checkpoint"]
+        checkpoint = _unpack_any(extra, serde) if extra else {}
+        checkpoint.update({
+            "v": v,
+            "id": checkpoint_id,
+            "ts": ts,
+            "channel_versions": {interner.lookup(ch): version for ch, version in channel_versions},
+            "versions_seen": {
+                interner.lookup(node): {interner.lookup(ch): version for ch, version in seen}
+                for node, seen in versions_seen
+            },
+            "updated_channels": [interner.lookup(ch) for ch in updated_channels],
+            "channel_values": values,
+        })
+        return checkpoint, _unpack_any(encoded["metadata"], serde)
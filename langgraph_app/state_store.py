@@ -0,0 +1,411 @@
+"""
+Conversation state shared between worker processes.
+
+The agents' LangGraph checkpointer keeps each thread's latest checkpoint in a
+StateStore instead of process memory, so a caller who reconnects and lands on
+another worker continues where they left off. The agents clear a thread when
+its call ends (after archiving it) and when a call starts on a thread whose
+conversation already reached an END stage.
+
+Backends:
+    InMemoryStateStore  one process (and a stand-in for a Redis-like store in development)
+    SQLiteStateStore    a SQLite file (WAL) shared by every worker on the host
+
+Every record carries a version and writes are compare-and-swap: a checkpoint
+is only stored if the thread is still at the checkpoint it was computed from,
+otherwise CheckpointConflict is raised and nothing is overwritten. Clearing a
+thread leaves an empty record behind at the next version, so a thread's
+versions never repeat and a worker's cached or expected version can't match
+a later conversation on the same thread.
+
+Checkpoints are encoded by state_codec (interned names, dictionary-compressed
+message history). Only the latest checkpoint per thread is kept.
+
+Configuration:
+    YOJNAPATH_STATE_STORE   "memory" or "sqlite:<path>"; unset keeps state in the worker (MemorySaver)
+    YOJNAPATH_STATE_TTL     seconds after which an idle conversation starts over (default 3600)
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+import ormsgpack
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+
+from langgraph_app.state_codec import StateCodec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_S = 3600.0
+# Decoded records kept per worker so a turn doesn't re-read what it just wrote
+RECORD_CACHE_SIZE = 1024
+
+RECORD_FORMAT = 2
+THREAD_LOCK_STRIPES = 64
+
+
+class VersionConflict(Exception):
+    """A compare-and-swap write found a different version than expected"""
+
+
+class CheckpointConflict(RuntimeError):
+    """The thread was advanced by another worker since this worker last saw it"""
+
+
+class StateStore(ABC):
+    """Versioned key-value records keyed by (thread_id, namespace)"""
+
+    @abstractmethod
+    def get(self, thread_id: str, ns: str = "") -> Optional[Tuple[int, bytes, float]]:
+        """(version, data, last write time), or None if there is no record; data is empty once cleared"""
+
+    @abstractmethod
+    def put(self, thread_id: str, ns: str, data: bytes, expected_version: int) -> int:
+        """Write if the record is at `expected_version` (0: absent); returns the new version"""
+
+    @abstractmethod
+    def clear(self, thread_id: str) -> None:
+        """Empty every record of a thread, moving each to its next version"""
+
+
+class InMemoryStateStore(StateStore):
+    def __init__(self, clock=time.time):
+        self._records: Dict[Tuple[str, str], Tuple[int, bytes, float]] = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    def get(self, thread_id: str, ns: str = "") -> Optional[Tuple[int, bytes, float]]:
+        with self._lock:
+            return self._records.get((thread_id, ns))
+
+    def put(self, thread_id: str, ns: str, data: bytes, expected_version: int) -> int:
+        with self._lock:
+            current = self._records.get((thread_id, ns))
+            if (current[0] if current else 0) != expected_version:
+                raise VersionConflict(f"{thread_id}: expected version {expected_version}, found {current[0] if current else 0}")
+            self._records[(thread_id, ns)] = (expected_version + 1, data, self._clock())
+        return expected_version + 1
+
+    def clear(self, thread_id: str) -> None:
+        with self._lock:
+            now = self._clock()
+            for key, (version, _, _) in list(self._records.items()):
+                if key[0] == thread_id:
+                    self._records[key] = (version + 1, b"", now)
+
+
+class SQLiteStateStore(StateStore):
+    """Records in a SQLite file; safe for several worker processes on one host"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_state ("
+            " thread_id TEXT NOT NULL, ns TEXT NOT NULL, version INTEGER NOT NULL,"
+            " data BLOB NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (thread_id, ns))"
+        )
+
+    def get(self, thread_id: str, ns: str = "") -> Optional[Tuple[int, bytes, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, data, updated_at FROM conversation_state WHERE thread_id = ? AND ns = ?",
+                (thread_id, ns),
+            ).fetchone()
+        return None if row is None else (row[0], bytes(row[1]), row[2])
+
+    def put(self, thread_id: str, ns: str, data: bytes, expected_version: int) -> int:
+        now = self._clock()
+        with self._lock:
+            if expected_version == 0:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO conversation_state VALUES (?, ?, 1, ?, ?)",
+                    (thread_id, ns, data, now),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE conversation_state SET version = version + 1, data = ?, updated_at = ?"
+                    " WHERE thread_id = ? AND ns = ? AND version = ?",
+                    (data, now, thread_id, ns, expected_version),
+                )
+        if cursor.rowcount != 1:
+            raise VersionConflict(f"{thread_id}: record is no longer at version {expected_version}")
+        return expected_version + 1
+
+    def clear(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE conversation_state SET version = version + 1, data = X'', updated_at = ? WHERE thread_id = ?",
+                (self._clock(), thread_id),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer over a StateStore, keeping the latest checkpoint
+    (and its pending writes) of each thread.
+
+    Checkpoint history isn't retained, so time travel to older checkpoints
+    isn't supported; the agents only ever resume from the latest one.
+    """
+
+    def __init__(
+        self,
+        store: StateStore,
+        ttl_s: Optional[float] = DEFAULT_TTL_S,
+        serde: Any = None,
+        codec: Optional[StateCodec] = None,
+    ):
+        super().__init__(serde=serde)
+        self.store = store
+        self.ttl_s = ttl_s
+        self.codec = codec or StateCodec()
+        # (thread_id, ns) -> (store version, decoded record)
+        self._records: "OrderedDict[Tuple[str, str], Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # LangGraph saves checkpoints and task writes concurrently; updates of
+        # one thread are serialized by one of these (striped) locks
+        self._thread_locks = [threading.Lock() for _ in range(THREAD_LOCK_STRIPES)]
+
+    def _thread_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        return self._thread_locks[hash(key) % THREAD_LOCK_STRIPES]
+
+    def _remember(self, key: Tuple[str, str], version: int, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records[key] = (version, record)
+            self._records.move_to_end(key)
+            while len(self._records) > RECORD_CACHE_SIZE:
+                self._records.popitem(last=False)
+
+    def _load(self, key: Tuple[str, str]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Store version and record of a thread; the record is None if there is
+        none, it was cleared, expired or is unreadable (the version is still
+        needed to replace it).
+        """
+        stored = self.store.get(*key)
+        if stored is None:
+            return 0, None
+        version, data, updated_at = stored
+        if not data:
+            return version, None
+        if self.ttl_s is not None and time.time() - updated_at > self.ttl_s:
+            return version, None
+        with self._lock:
+            cached = self._records.get(key)
+        if cached is not None and cached[0] == version:
+            return cached
+        record = ormsgpack.unpackb(data)
+        if record.get("format") != RECORD_FORMAT:
+            logger.warning("Ignoring conversation state of thread %s in unknown format", key[0])
+            return version, None
+        self._remember(key, version, record)
+        return version, record
+
+    def _save(self, key: Tuple[str, str], expected_version: int, record: Dict[str, Any]) -> None:
+        try:
+            version = self.store.put(key[0], key[1], ormsgpack.packb(record), expected_version)
+        except VersionConflict as e:
+            with self._lock:
+                self._records.pop(key, None)
+            raise CheckpointConflict(f"Conversation {key[0]} was updated by another worker") from e
+        self._remember(key, version, record)
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        key = self._key(config)
+        record = self._load(key)[1]
+        if record is None or record["id"] is None:
+            return None
+        checkpoint_id = config["configurable"].get("checkpoint_id")
+        if checkpoint_id and checkpoint_id != record["id"]:
+            return None
+
+        checkpoint, metadata = self.codec.decode(record["state"], self.serde)
+        thread_id, ns = key
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": record["id"]}},
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": record["parent"]}}
+                if record["parent"] else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for write_checkpoint_id, task_id, _, channel, type_, value, _ in sorted(
+                    record["writes"], key=lambda w: (w[1], w[2])
+                )
+                if write_checkpoint_id == record["id"]
+            ],
+        )
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is None or before is not None or limit == 0:
+            return
+        checkpoint_tuple = self.get_tuple(config)
+        if checkpoint_tuple is None:
+            return
+        if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+            return
+        yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        key = self._key(config)
+        parent_id = config["configurable"].get("checkpoint_id")
+        c = checkpoint.copy()
+        values = c.pop("channel_values")
+        metadata = get_checkpoint_metadata(config, metadata)
+
+        with self._thread_lock(key):
+            expected_version, current = self._load(key)
+            # A new or expired thread has no checkpoint; its first one has no parent
+            current_id = current["id"] if current is not None else None
+            if current_id != parent_id:
+                raise CheckpointConflict(f"Conversation {key[0]} is at checkpoint {current_id}, not {parent_id}")
+            record = {
+                "format": RECORD_FORMAT,
+                "id": checkpoint["id"],
+                "parent": parent_id,
+                "state": self.codec.encode(c, values, metadata, self.serde),
+                # Task writes can be saved before the checkpoint they belong to
+                "writes": [w for w in current["writes"] if w[0] == checkpoint["id"]] if current is not None else [],
+            }
+            self._save(key, expected_version, record)
+        return {"configurable": {"thread_id": key[0], "checkpoint_ns": key[1], "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        key = self._key(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        packed = [
+            (WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value))
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._thread_lock(key):
+            version, record = self._load(key)
+            if record is None:
+                record = {"format": RECORD_FORMAT, "id": None, "writes": []}
+            # Writes of older checkpoints are dropped
+            new_writes = [w for w in record["writes"] if w[0] == checkpoint_id]
+            existing = {(w[1], w[2]) for w in new_writes}
+            for write_idx, channel, type_, value in packed:
+                if write_idx >= 0 and (task_id, write_idx) in existing:
+                    continue
+                new_writes.append([checkpoint_id, task_id, write_idx, channel, type_, value, task_path])
+            self._save(key, version, {**record, "writes": new_writes})
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.store.clear(thread_id)
+        with self._lock:
+            for key in [key for key in self._records if key[0] == thread_id]:
+                del self._records[key]
+
+    # SQLite calls are short, but they still shouldn't run on the event loop
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for checkpoint_tuple in await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        ):
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def state_store_from_env() -> Optional[StateStore]:
+    """The StateStore configured by YOJNAPATH_STATE_STORE, or None for per-worker memory"""
+    spec = os.getenv("YOJNAPATH_STATE_STORE", "").strip()
+    if not spec:
+        return None
+    if spec == "memory":
+        return InMemoryStateStore()
+    if spec.startswith("sqlite:"):
+        return SQLiteStateStore(spec[len("sqlite:"):])
+    raise ValueError(f"Unknown YOJNAPATH_STATE_STORE {spec!r} (expected 'memory' or 'sqlite:<path>')")
+
+
+@lru_cache(maxsize=None)
+def shared_checkpointer() -> Optional[SharedCheckpointSaver]:
+    """Process-wide checkpointer over the configured store, or None if none is configured"""
+    store = state_store_from_env()
+    if store is None:
+        return None
+    ttl = float(os.getenv("YOJNAPATH_STATE_TTL", DEFAULT_TTL_S) or 0) or None
+    return SharedCheckpointSaver(store, ttl_s=ttl)
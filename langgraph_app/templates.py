@@ -0,0 +1,120 @@
+"""
+Deterministic replies for static stages.
+
+A stage with `"static": true` in stage_config.json never calls an LLM: its
+reply is rendered from `templates` (locale -> text, falling back to `prompt`)
+with {slot} placeholders filled from the conversation's slots and the stage's
+default `slots`; literal braces are written doubled ({{ and }}). The same
+rendering gives the LiveKit agents their opening greeting from the START stage.
+Templates are checked when a config is loaded (flow_compiler); one that still
+can't be rendered raises TemplateError and the turn goes to the LLM instead.
+
+The locale comes from State.locale, then the graph config's
+`configurable.locale`, then YOJNAPATH_LOCALE (default en).
+"""
+
+import os
+import string
+from typing import Any, Iterator, Mapping, Optional, Sequence
+
+from models import NextStage, Stage, StageType
+
+SUPPORTED_LOCALES = ("hi", "en")
+DEFAULT_LOCALE = "en"
+
+# Spoken when no LLM tier could answer a turn; the conversation stays on its stage
+FAILED_TURN_REPLIES = {
+    "hi": "माफ़ करें, मुझे कुछ तकनीकी समस्या हो रही है। कृपया दोबारा कोशिश करें।",
+    "en": "I apologize, but I'm having trouble processing your request. Could you please try again?",
+}
+
+# Asked instead of guessing when the LLM's choice of next stage is doubtful; {options}
+# lists the allowed next stages
+CLARIFY_QUESTIONS = {
+    "hi": "माफ़ कीजिए, मैं ठीक से समझ नहीं पाया। आप क्या करना चाहेंगे: {options}?",
+    "en": "Sorry, I want to make sure I understood. Would you like to {options}?",
+}
+_OR = {"hi": "या", "en": "or"}
+
+_FORMATTER = string.Formatter()
+
+
+class TemplateError(ValueError):
+    """A template with unbalanced braces or a placeholder that isn't a plain slot name"""
+
+
+class _Slots(dict):
+    # Unfilled slots render as nothing rather than as "{name}" in speech
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def default_locale() -> str:
+    locale = (os.getenv("YOJNAPATH_LOCALE") or DEFAULT_LOCALE).lower()
+    return locale if locale in SUPPORTED_LOCALES else DEFAULT_LOCALE
+
+
+def resolve_locale(state: Mapping[str, Any], config: Optional[Mapping[str, Any]] = None) -> str:
+    """Locale for a turn: state, then graph config, then the process default"""
+    locale = state.get("locale") or ((config or {}).get("configurable") or {}).get("locale")
+    return locale if locale in SUPPORTED_LOCALES else default_locale()
+
+
+def stage_template(stage: Stage, locale: str) -> str:
+    """Template text of a stage for a locale, falling back to English and then to the prompt"""
+    templates = stage.templates or {}
+    return templates.get(locale) or templates.get(DEFAULT_LOCALE) or stage.prompt or ""
+
+
+def template_error(template: str) -> Optional[str]:
+    """Why a template can't be rendered, or None if it can"""
+    try:
+        fields = [(field, spec, conversion) for _, field, spec, conversion in _FORMATTER.parse(template)
+                  if field is not None]
+    except ValueError as e:
+        return f"{e} (write literal braces as {{{{ and }}}})"
+    for field, spec, conversion in fields:
+        if not field.isidentifier() or spec or conversion:
+            return f"placeholder {{{field}}} is not a slot name"
+    return None
+
+
+def render_template(template: str, slots: Optional[Mapping[str, Any]] = None) -> str:
+    try:
+        return template.format_map(_Slots(slots or {}))
+    except (ValueError, LookupError, AttributeError, TypeError) as e:
+        raise TemplateError(template_error(template) or str(e)) from e
+
+
+def render_stage_reply(stage: Stage, locale: str, slots: Optional[Mapping[str, Any]] = None) -> str:
+    """A static stage's reply: stage default slots, overridden by the conversation's slots"""
+    return render_template(stage_template(stage, locale), {**(stage.slots or {}), **(slots or {})})
+
+
+def failed_turn_reply(locale: str) -> str:
+    return FAILED_TURN_REPLIES.get(locale) or FAILED_TURN_REPLIES[DEFAULT_LOCALE]
+
+
+def clarification_question(options: Sequence[NextStage], locale: str) -> str:
+    """Numbered question offering `options`, each by its label in `locale` (or its condition)"""
+    locale = locale if locale in CLARIFY_QUESTIONS else DEFAULT_LOCALE
+    phrases = [
+        f"{i}) {(option.labels or {}).get(locale) or option.condition or option.nextStageId}"
+        for i, option in enumerate(options, 1)
+    ]
+    listed = ", ".join(phrases[:-1]) + f", {_OR[locale]} {phrases[-1]}" if len(phrases) > 1 else phrases[0]
+    return CLARIFY_QUESTIONS[locale].format(options=listed)
+
+
+def static_utterances(stages: Mapping[str, Stage]) -> Iterator[tuple[str, str, str]]:
+    """(stage id, locale, text) of every fixed utterance that doesn't depend on conversation slots"""
+    for stage in stages.values():
+        if not (stage.static or stage.type in (StageType.START, StageType.END)):
+            continue
+        for locale in SUPPORTED_LOCALES:
+            try:
+                yield stage.id, locale, render_stage_reply(stage, locale)
+            except TemplateError:
+                # Not a fixed utterance: its turns are answered by the LLM
+                continue
+
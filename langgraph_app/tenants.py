@@ -0,0 +1,102 @@
+"""
+Flow selection per call and per-flow (tenant) limits on concurrent LLM turns.
+
+A call runs the flow named by the "flow" key of its job metadata (the same
+JSON that carries an outbound call's phone number), or the default flow.
+
+Flows hosted by one worker process share its LLM rate limits. A flow's
+`max_concurrent_turns` in YOJNAPATH_FLOWS caps how many of its turns call the
+LLM at once, so one busy program can't starve the others; turns over the
+limit wait for a slot, and speculative calls are skipped while the flow is at
+its limit.
+
+Sync turns (threads) and async turns (each event loop) have their own slots.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Mapping, Optional
+
+from langgraph_app.metrics import TENANT_WAITS
+from langgraph_app.stage_registry import DEFAULT_FLOW, flow_spec, flow_specs
+
+logger = logging.getLogger(__name__)
+
+
+class TenantLimiter:
+    """Concurrent LLM turns of one flow; a limit of 0 never waits"""
+
+    def __init__(self, flow: str, limit: int = 0):
+        self.flow = flow
+        self.limit = limit
+        # Only read by busy(), so an approximate count is enough
+        self.active = 0
+        self._threads = threading.BoundedSemaphore(limit) if limit else None
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def busy(self) -> bool:
+        return bool(self.limit) and self.active >= self.limit
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the flow's slots for a blocking LLM call"""
+        if self._threads is None:
+            yield
+            return
+        if not self._threads.acquire(blocking=False):
+            TENANT_WAITS.inc(self.flow)
+            self._threads.acquire()
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._threads.release()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        """Hold one of the flow's slots for an async LLM call"""
+        if not self.limit:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        semaphore = self._loops.get(loop)
+        if semaphore is None:
+            semaphore = self._loops[loop] = asyncio.Semaphore(self.limit)
+        if semaphore.locked():
+            TENANT_WAITS.inc(self.flow)
+        async with semaphore:
+            self.active += 1
+            try:
+                yield
+            finally:
+                self.active -= 1
+
+
+_limiters: Dict[str, TenantLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def tenant_limiter(flow: str) -> TenantLimiter:
+    """The process-wide limiter of a flow, sized from its FlowSpec"""
+    limiter = _limiters.get(flow)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(flow)
+            if limiter is None:
+                limiter = _limiters[flow] = TenantLimiter(flow, flow_spec(flow).max_concurrent_turns)
+    return limiter
+
+
+def call_flow(metadata: Optional[Mapping[str, Any]]) -> str:
+    """The flow a call's job metadata asks for; unknown flows fall back to the default"""
+    flow = (metadata or {}).get("flow") or DEFAULT_FLOW
+    if flow not in flow_specs():
+        logger.warning("Job asked for unknown flow %r, using %s", flow, DEFAULT_FLOW)
+        return DEFAULT_FLOW
+    return flow
@@ -0,0 +1,363 @@
+"""
+Normalization of Hindi/English (code-mixed) caller utterances.
+
+STT for hi-IN/en-IN writes the same words differently from call to call:
+"yojna", "yojana" and "yojnaa"; "दस्तावेज़" with or without the nukta; "पाँच",
+"paanch", "५" and "5". Every utterance is normalized once before it reaches
+the graph (and every interim transcript before it reaches the speculation and
+pre-routing matchers), so scheme search, intent routing and the tool result
+cache all see one form:
+
+    unicode          NFC; the nukta of Perso-Arabic loan letters (क़ ख़ ग़ ज़ फ़),
+                     chandrabindu (ँ, written as ं) and zero-width joiners are
+                     dropped, since STT uses them inconsistently
+    script           nukta clean-up and lowercasing only run for the scripts the
+                     utterance is written in (detect_script)
+    spelling         Romanized Hindi words of TRANSLITERATIONS get one Roman
+                     spelling, matched by a spelling key that ignores vowel
+                     length and the inherent "a" (yojna, yojnaa -> yojana);
+                     English words stay as they are. Words are never moved to
+                     another script: converting only the words in the table
+                     would turn "main kisan hoon" into "main किसान hoon", so
+                     matchers list a word's Devanagari and Roman forms
+    numbers          Devanagari digits become ASCII, and number words in Hindi,
+                     Hinglish and English become digits ("paanch hazaar" -> 5000,
+                     "डेढ़ लाख" -> 150000). Words that are also something else
+                     ("एक" is also "a", "do" is English) only count next to
+                     another number
+
+Latin text is lowercased and whitespace collapsed. All tables are compiled at
+import, and results are memoized: interim transcripts, retries and common
+answers ("haan ji", "नहीं") repeat the same text.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Memoized utterances, and Latin words (which repeat across utterances)
+CACHE_SIZE = 8192
+
+SCRIPT_DEVANAGARI = "devanagari"
+SCRIPT_LATIN = "latin"
+SCRIPT_MIXED = "mixed"
+SCRIPT_NONE = "none"
+
+# Devanagari word -> Romanized spellings STT writes it in; the first is the one
+# the others are normalized to. Spellings that only differ in vowel length or
+# the inherent "a" share a key, so one per key is enough
+TRANSLITERATIONS: Dict[str, Tuple[str, ...]] = {
+    # Schemes and eligibility
+    "योजना": ("yojana",),
+    "योजनाएं": ("yojanayen", "yojnaye"),
+    "किसान": ("kisan", "kishan"),
+    "आवास": ("awas",),
+    "पात्रता": ("patrata",),
+    "दस्तावेज": ("dastavej", "dastavez"),
+    "लाभ": ("labh",),
+    "आवेदन": ("aavedan", "avedan"),
+    "शिक्षा": ("shiksha",),
+    "महिला": ("mahila",),
+    "घर": ("ghar",),
+    "खेती": ("kheti",),
+    "फसल": ("fasal",),
+    "बीमा": ("bima",),
+    "राशन": ("rashan",),
+    "सरकार": ("sarkar",),
+    "सरकारी": ("sarkari",),
+    "पीएम": ("pm",),
+    "प्रधानमंत्री": ("pradhanmantri",),
+    "प्रधान": ("pradhan",),
+    "मंत्री": ("mantri",),
+    "पैसा": ("paisa",),
+    "पैसे": ("paise",),
+    "रुपये": ("rupaye", "rupye"),
+    "मदद": ("madad",),
+    "जानकारी": ("jankari",),
+    "खाता": ("khata",),
+    "आधार": ("aadhar",),
+    "परिवार": ("parivar",),
+    "बच्चे": ("bacche", "bachche"),
+    "उम्र": ("umar", "umr"),
+    "गांव": ("gaon", "gaanv"),
+    "शहर": ("shahar",),
+    "गरीब": ("garib",),
+    "नौकरी": ("naukri",),
+    "साल": ("saal",),
+    # Questions, answers and fillers
+    "मुझे": ("mujhe",),
+    "मुझको": ("mujhko",),
+    "क्या": ("kya",),
+    "है": ("hai",),
+    "हैं": ("hain",),
+    "कैसे": ("kaise", "kese"),
+    "बताओ": ("batao",),
+    "बताइए": ("bataiye", "bataie", "batayiye"),
+    "चाहिए": ("chahiye", "chahie"),
+    "के": ("ke",),
+    "की": ("ki",),
+    "का": ("ka",),
+    "से": ("se",),
+    "लिए": ("liye", "liae"),
+    "में": ("mein", "mei"),
+    "और": ("aur",),
+    "नहीं": ("nahi", "nahin"),
+    "हां": ("haan", "haa"),
+    "जी": ("ji",),
+    "ठीक": ("theek", "thik"),
+    "धन्यवाद": ("dhanyavad",),
+    "शुक्रिया": ("shukriya",),
+    "बस": ("bas",),
+    "अलविदा": ("alvida",),
+    "कौन": ("kaun",),
+    "कौनसी": ("kaunsi",),
+    "कितना": ("kitna",),
+    "कितने": ("kitne",),
+    "बारे": ("bare",),
+    "पता": ("pata",),
+    "अपना": ("apna",),
+    "मेरा": ("mera",),
+    "मेरे": ("mere",),
+    "मेरी": ("meri",),
+    "हम": ("hum",),
+    "आप": ("aap",),
+    "कोई": ("koi",),
+    "सब": ("sab",),
+    "अभी": ("abhi",),
+    "कहां": ("kahan",),
+    "कब": ("kab",),
+    "क्यों": ("kyon", "kyun"),
+    "वाला": ("wala",),
+    "वाली": ("wali",),
+    "वाले": ("wale",),
+    "करना": ("karna",),
+    "मिलेगा": ("milega",),
+    "एक": ("ek",),
+    # Ordinals (option numbers in clarification answers)
+    "पहला": ("pehla", "pahla"),
+    "पहली": ("pehli", "pahli"),
+    "पहले": ("pehle", "pahle"),
+    "दूसरा": ("doosra", "dusra"),
+    "दूसरी": ("doosri", "dusri"),
+    "दूसरे": ("doosre", "dusre"),
+    "तीसरा": ("teesra", "tisra"),
+    "तीसरी": ("teesri", "tisri"),
+    "चौथा": ("chautha",),
+}
+
+# English words a Romanized Hindi spelling key would otherwise claim
+_ENGLISH_WORDS = frozenset({"hi", "he", "me", "main", "may", "app", "bus", "so", "to", "pat", "bar", "car"})
+
+# Hindi cardinals 1-99; every number below 100 has its own word
+_HINDI_CARDINALS = (
+    "एक दो तीन चार पांच छह सात आठ नौ दस ग्यारह बारह तेरह चौदह पंद्रह सोलह सत्रह अठारह उन्नीस बीस "
+    "इक्कीस बाईस तेईस चौबीस पच्चीस छब्बीस सत्ताईस अट्ठाईस उनतीस तीस इकतीस बत्तीस तैंतीस चौंतीस पैंतीस "
+    "छत्तीस सैंतीस अड़तीस उनतालीस चालीस इकतालीस बयालीस तैंतालीस चवालीस पैंतालीस छियालीस सैंतालीस अड़तालीस "
+    "उनचास पचास इक्यावन बावन तिरेपन चौवन पचपन छप्पन सत्तावन अट्ठावन उनसठ साठ इकसठ बासठ तिरसठ चौंसठ "
+    "पैंसठ छियासठ सड़सठ अड़सठ उनहत्तर सत्तर इकहत्तर बहत्तर तिहत्तर चौहत्तर पचहत्तर छिहत्तर सतहत्तर अठहत्तर "
+    "उन्यासी अस्सी इक्यासी बयासी तिरासी चौरासी पचासी छियासी सत्तासी अट्ठासी नवासी नब्बे इक्यानवे बानवे "
+    "तिरानवे चौरानवे पचानवे छियानवे सत्तानवे अट्ठानवे निन्यानवे"
+)
+
+_NUMBER_WORDS: Dict[str, float] = {
+    **{word: float(value) for value, word in enumerate(_HINDI_CARDINALS.split(), start=1)},
+    "शून्य": 0, "छः": 6, "छै": 6, "डेढ़": 1.5, "ढाई": 2.5,
+    **{word: float(value) for value, word in enumerate((
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+        "sixteen seventeen eighteen nineteen"
+    ).split())},
+    **{word: float(value) for word, value in zip(
+        "twenty thirty forty fifty sixty seventy eighty ninety".split(), range(20, 100, 10)
+    )},
+}
+
+# Romanized Hindi numbers, matched by spelling key like TRANSLITERATIONS.
+# "saath" (60) is left out: it is far more often "साथ" (with)
+_ROMAN_NUMBERS: Dict[str, float] = {
+    "ek": 1, "do": 2, "teen": 3, "char": 4, "paanch": 5, "chhe": 6, "chah": 6, "saat": 7, "aath": 8,
+    "nau": 9, "das": 10, "gyarah": 11, "barah": 12, "terah": 13, "chaudah": 14, "pandrah": 15,
+    "solah": 16, "satrah": 17, "atharah": 18, "unnees": 19, "bees": 20, "pachees": 25, "tees": 30,
+    "chalees": 40, "pachaas": 50, "sattar": 70, "assi": 80, "nabbe": 90, "dedh": 1.5, "dhai": 2.5,
+}
+
+_SCALES: Dict[str, float] = {
+    "सौ": 100, "हजार": 1000, "लाख": 1e5, "करोड़": 1e7,
+    "hundred": 100, "thousand": 1000, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "crore": 1e7, "crores": 1e7,
+    "million": 1e6,
+}
+_ROMAN_SCALES: Dict[str, float] = {"sau": 100, "hazaar": 1000, "karod": 1e7}
+
+# Number words that are also something else, converted only next to another number
+_AMBIGUOUS_NUMBERS = frozenset({"एक", "one", "ek", "do", "teen", "char", "bees", "das"})
+
+# Devanagari digits, chandrabindu and zero-width (non-)joiners
+_CHAR_MAP = {
+    **{0x0966 + digit: str(digit) for digit in range(10)},
+    0x0901: "ं",
+    0x200C: None,
+    0x200D: None,
+}
+# After NFC every nukta letter is base + U+093C; ड़ and ढ़ are letters of their own
+_LOAN_NUKTA = re.compile("(?<=[कखगजफ])़")
+# A Devanagari word (vowel signs included, dandas excluded), a Latin word or a number
+_TOKEN = re.compile(r"[ऀ-ॣॱ-ॿ]+|[a-z]+|[0-9]+(?:\.[0-9]+)?")
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_LATIN = re.compile(r"[A-Za-z]")
+# Only whitespace or a hyphen between the words of one number
+_NUMBER_GAP = re.compile(r"[\s-]*")
+_SPACES = re.compile(r"\s+")
+
+# Spelling variants of Romanized Hindi, folded before the inherent "a" is dropped
+_SPELLING_VARIANTS = (("aa", "a"), ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"),
+                      ("w", "v"), ("ph", "f"), ("z", "j"), ("q", "k"), ("sh", "s"))
+_INHERENT_A = re.compile(r"(?<=[b-df-hj-np-tv-z])a(?=[b-df-hj-np-tv-z]|$)")
+
+
+def _roman_key(word: str) -> str:
+    """Spelling key of a Romanized Hindi word: "yojana", "yojna" and "yojnaa" all give "yojn" """
+    for variant, canonical in _SPELLING_VARIANTS:
+        word = word.replace(variant, canonical)
+    return _INHERENT_A.sub("", word)
+
+
+def _clean_unicode(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).translate(_CHAR_MAP)
+    return _LOAN_NUKTA.sub("", text) if _DEVANAGARI.search(text) else text
+
+
+_SPELLING_KEYS: Dict[str, str] = {
+    _roman_key(spelling): spellings[0]
+    for spellings in TRANSLITERATIONS.values()
+    for spelling in spellings
+}
+_NUMBER_VALUES: Dict[str, float] = {
+    **{_clean_unicode(word): value for word, value in _NUMBER_WORDS.items()},
+    **{_roman_key(word): value for word, value in _ROMAN_NUMBERS.items()},
+}
+_SCALE_VALUES: Dict[str, float] = {
+    **{_clean_unicode(word): value for word, value in _SCALES.items()},
+    **{_roman_key(word): value for word, value in _ROMAN_SCALES.items()},
+}
+
+
+def detect_script(text: str) -> str:
+    """SCRIPT_DEVANAGARI, SCRIPT_LATIN, SCRIPT_MIXED or SCRIPT_NONE (digits and punctuation only)"""
+    devanagari = _DEVANAGARI.search(text) is not None
+    latin = _LATIN.search(text) is not None
+    if devanagari and latin:
+        return SCRIPT_MIXED
+    if devanagari:
+        return SCRIPT_DEVANAGARI
+    return SCRIPT_LATIN if latin else SCRIPT_NONE
+
+
+def _key(word: str) -> str:
+    """Table key of a lowercased word: itself if Devanagari or English, else its spelling key"""
+    return word if not word.isascii() or word in _NUMBER_WORDS or word in _SCALES else _roman_key(word)
+
+
+_AMBIGUOUS_KEYS = frozenset(_key(word) for word in _AMBIGUOUS_NUMBERS)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _lookup(word: str) -> Tuple[Optional[float], bool, str]:
+    """(number value, is a scale, canonical spelling) of one lowercased word"""
+    if word[0].isdigit():
+        return float(word), False, word
+    key = _key(word)
+    if key in _SCALE_VALUES:
+        return _SCALE_VALUES[key], True, word
+    if key in _NUMBER_VALUES:
+        canonical = _SPELLING_KEYS.get(key, word) if word.isascii() else word
+        return _NUMBER_VALUES[key], False, canonical
+    if word.isascii() and word not in _ENGLISH_WORDS:
+        return None, False, _SPELLING_KEYS.get(key, word)
+    return None, False, word
+
+
+def _joins(previous: Tuple[float, bool, bool], value: float, scale: bool, is_digit: bool) -> bool:
+    """Whether a number word continues the number phrase ending in `previous`"""
+    previous_value, previous_scale, previous_digit = previous
+    if scale or previous_scale:
+        return True
+    # "twenty five"; any other two plain numbers in a row ("दो तीन दिन") are two numbers
+    return (not is_digit and not previous_digit and previous_value % 10 == 0
+            and 20 <= previous_value <= 90 and 1 <= value <= 9)
+
+
+def _phrase_value(values: List[Tuple[float, bool, bool]]) -> float:
+    total = current = 0.0
+    for value, scale, _ in values:
+        if not scale:
+            current += value
+        elif value < 1000:
+            current = (current or 1) * value
+        else:
+            total += (current or 1) * value
+            current = 0.0
+    return total + current
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if value == int(value) else f"{value:g}"
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).translate(_CHAR_MAP)
+    script = detect_script(text)
+    if script in (SCRIPT_DEVANAGARI, SCRIPT_MIXED):
+        text = _LOAN_NUKTA.sub("", text)
+    if script in (SCRIPT_LATIN, SCRIPT_MIXED):
+        text = text.lower()
+    pieces: List[str] = []
+    emitted = 0
+    # Number phrase being collected: its words, their (value, is a scale, is digits) and where it ends
+    phrase_words: List[str] = []
+    phrase: List[Tuple[float, bool, bool]] = []
+    phrase_end = 0
+
+    def flush_phrase() -> None:
+        nonlocal emitted
+        if not phrase:
+            return
+        if len(phrase) == 1 and (phrase[0][2] or _key(phrase_words[0]) in _AMBIGUOUS_KEYS):
+            pieces.append(_lookup(phrase_words[0])[2])
+        else:
+            pieces.append(_format_number(_phrase_value(phrase)))
+        emitted = phrase_end
+        phrase_words.clear()
+        phrase.clear()
+
+    for match in _TOKEN.finditer(text):
+        word = match.group()
+        value, scale, canonical = _lookup(word)
+        if value is not None:
+            entry = (value, scale, word[0].isdigit())
+            continues = (
+                phrase
+                and _NUMBER_GAP.fullmatch(text, phrase_end, match.start())
+                and _joins(phrase[-1], value, scale, entry[2])
+            )
+            if not continues:
+                flush_phrase()
+                pieces.append(text[emitted:match.start()])
+            phrase_words.append(word)
+            phrase.append(entry)
+            phrase_end = match.end()
+            continue
+        flush_phrase()
+        pieces.append(text[emitted:match.start()])
+        pieces.append(canonical)
+        emitted = match.end()
+    flush_phrase()
+    pieces.append(text[emitted:])
+    return _SPACES.sub(" ", "".join(pieces)).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_utterance(text: str) -> str:
+    """Canonical form of a caller utterance (see the module docstring)"""
+    if not text:
+        return text
+    return _normalize(text)
@@ -1,16 +1,135 @@
-from typing import Dict, Any, List
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence
+
+# Upper bound on the characters a single tool result may add to a prompt
+MAX_RESULT_CHARS = 600
+
+
+def format_tool_result(tool_name: str, result: Any) -> str:
+    """
+    Render a tool result compactly for inclusion in a prompt.
+    
+    Lists of records (e.g. schemes) become one line per record.
+    """
+    if isinstance(result, list):
+        lines = []
+        for item in result:
+            if isinstance(item, dict):
+                head = item.get("name") or item.get("title") or ""
+                rest = "; ".join(f"{k}: {v}" for k, v in item.items() if k not in ("name", "title"))
+                lines.append(f"- {head}: {rest}" if head else f"- {rest}")
+            else:
+                lines.append(f"- {item}")
+        text = "\n".join(lines)
+    else:
+        text = str(result)
+    
+    if len(text) > MAX_RESULT_CHARS:
+        text = text[:MAX_RESULT_CHARS].rsplit(" ", 1)[0] + " ..."
+    return f"[{tool_name}]\n{text}"
+
+class ToolNotFoundError(ValueError):
+    """Raised when a tool invocation names a tool the executor doesn't have"""
+
+
+@dataclass
+class ToolStats:
+    """Per-tool call metrics"""
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    total_latency_s: float = 0.0
+    
+    @property
+    def hit_rate(self) -> float:
+        return self.cache_hits / self.calls if self.calls else 0.0
+    
+    @property
+    def avg_latency_ms(self) -> float:
+        executed = self.calls - self.cache_hits
+        return self.total_latency_s / executed * 1000 if executed else 0.0
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool results with a time-to-live.
+    
+    Keys are the tool name plus its canonicalized (key-sorted JSON) arguments,
+    so argument order and dict construction don't affect hits.
+    """
+    
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(tool_name: str, tool_input: Any) -> str:
+        return tool_name + ":" + json.dumps(tool_input, sort_keys=True, ensure_ascii=False, default=str)
+    
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < self._clock():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+    
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class ToolExecutor:
     """
-    A simple tool executor that can run tools.
+    Runs tools synchronously (invoke) or concurrently (ainvoke, invoke_many),
+    with per-tool timeouts, a result cache and per-tool metrics.
     """
     
-    def __init__(self, tools: List[Any]):
+    def __init__(
+        self,
+        tools: List[Any],
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = 10.0,
+        cache: Optional[ToolResultCache] = None,
+        uncached_tools: Sequence[str] = (),
+        max_workers: int = 8,
+    ):
         """
         Initialize the tool executor with a list of tools.
         
         Args:
             tools: A list of tools to execute.
+            timeouts: Per-tool timeout in seconds for async calls.
+            default_timeout: Timeout for tools without an entry in `timeouts`.
+            cache: Result cache; a default 256 entry / 5 minute cache is used if None.
+            uncached_tools: Tools whose results must never be cached.
+            max_workers: Size of the thread pool blocking tools are offloaded to.
         """
         self.tools = {}
         for tool in tools:
@@ -22,6 +141,51 @@ class ToolExecutor:
             else:
                 # For tools without a name attribute, use the function itself as the key
                 self.tools[str(tool)] = tool
+        
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.cache = cache if cache is not None else ToolResultCache()
+        self.uncached_tools = set(uncached_tools)
+        self.stats: Dict[str, ToolStats] = {name: ToolStats() for name in self.tools}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        # Identical calls already running are shared instead of executed twice
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Callers still waiting for each shared call
+        self._waiters: Dict[asyncio.Future, int] = {}
+    
+    def _resolve(self, tool_invocation: Dict[str, Any]) -> tuple[str, Any, Any]:
+        tool_name = tool_invocation.get("tool")
+        tool_input = tool_invocation.get("tool_input", {})
+        
+        if not tool_name or tool_name not in self.tools:
+            raise ToolNotFoundError(f"Tool '{tool_name}' not found")
+        return tool_name, self.tools[tool_name], tool_input
+    
+    @staticmethod
+    def _call(tool: Any, tool_input: Any) -> Any:
+        # LangChain tools take their arguments as one dict
+        if hasattr(tool, "invoke"):
+            return tool.invoke(tool_input)
+        if isinstance(tool_input, dict):
+            return tool(**tool_input)
+        return tool(tool_input)
+    
+    @staticmethod
+    def _acall(tool: Any, tool_input: Any) -> Any:
+        if hasattr(tool, "ainvoke"):
+            return tool.ainvoke(tool_input)
+        if isinstance(tool_input, dict):
+            return tool(**tool_input)
+        return tool(tool_input)
+    
+    @staticmethod
+    def _is_async(tool: Any) -> bool:
+        return getattr(tool, "coroutine", None) is not None or asyncio.iscoroutinefunction(tool)
+    
+    def _cache_key(self, tool_name: str, tool_input: Any) -> Optional[str]:
+        if tool_name in self.uncached_tools:
+            return None
+        return ToolResultCache.make_key(tool_name, tool_input)
     
     def invoke(self, tool_invocation: Dict[str, Any]) -> Any:
         """
@@ -33,15 +197,121 @@ class ToolExecutor:
         Returns:
             The result of the tool execution.
         """
-        tool_name = tool_invocation.get("tool")
-        tool_input = tool_invocation.get("tool_input", {})
+        tool_name, tool, tool_input = self._resolve(tool_invocation)
+        stats = self.stats[tool_name]
+        stats.calls += 1
         
-        if not tool_name or tool_name not in self.tools:
-            raise ValueError(f"Tool '{tool_name}' not found. Available tools: {list(self.tools.keys())}")
+        key = self._cache_key(tool_name, tool_input)
+        if key is not None:
+            hit, value = self.cache.get(key)
+            if hit:
+                stats.cache_hits += 1
+                return value
         
-        tool = self.tools[tool_name]
+        start = time.perf_counter()
+        try:
+            result = self._call(tool, tool_input)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.total_latency_s += time.perf_counter() - start
         
-        if isinstance(tool_input, dict):
-            return tool(**tool_input)
-        else:
-            return tool(tool_input) 
\ No newline at end of file
+        if key is not None:
+            self.cache.set(key, result)
+        return result
+    
+    async def _execute(self, tool_name: str, tool: Any, tool_input: Any) -> Any:
+        stats = self.stats[tool_name]
+        start = time.perf_counter()
+        try:
+            if self._is_async(tool):
+                call = self._acall(tool, tool_input)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self._pool, self._call, tool, tool_input)
+            return await asyncio.wait_for(call, self.timeouts.get(tool_name, self.default_timeout))
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.total_latency_s += time.perf_counter() - start
+    
+    async def ainvoke(self, tool_invocation: Dict[str, Any]) -> Any:
+        """
+        Invoke a tool without blocking the event loop.
+        
+        Blocking tools run in the executor's thread pool; every call is bounded by
+        the tool's timeout (asyncio.TimeoutError). Results are cached.
+        
+        Identical calls share one execution, which is cancelled once every caller
+        is (the caller barged in). A blocking tool's thread still runs to the end,
+        but nothing waits for it.
+        """
+        tool_name, tool, tool_input = self._resolve(tool_invocation)
+        stats = self.stats[tool_name]
+        stats.calls += 1
+        
+        key = self._cache_key(tool_name, tool_input)
+        if key is None:
+            return await self._execute(tool_name, tool, tool_input)
+        
+        hit, value = self.cache.get(key)
+        if hit:
+            stats.cache_hits += 1
+            return value
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            stats.cache_hits += 1
+            return await self._share(inflight)
+        
+        future = asyncio.ensure_future(self._execute(tool_name, tool, tool_input))
+        self._inflight[key] = future
+        self._waiters[future] = 0
+        future.add_done_callback(lambda _: self._finish(key, future))
+        result = await self._share(future)
+        self.cache.set(key, result)
+        return result
+    
+    async def _share(self, future: asyncio.Future) -> Any:
+        self._waiters[future] += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if not future.done():
+                # This caller was cancelled; the call keeps running for the others
+                self._waiters[future] -= 1
+                if not self._waiters[future]:
+                    future.cancel()
+    
+    def _finish(self, key: str, future: asyncio.Future) -> None:
+        self._waiters.pop(future, None)
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+    
+    async def invoke_many(self, tool_invocations: Sequence[Dict[str, Any]]) -> List[Any]:
+        """
+        Run independent tool calls concurrently.
+        
+        Returns results in the order of `tool_invocations`; a failed or timed-out
+        call yields its exception in place so the other results are still usable.
+        """
+        return await asyncio.gather(*(self.ainvoke(inv) for inv in tool_invocations), return_exceptions=True)
+    
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def default_tool_executor() -> ToolExecutor:
+    """Process-wide executor over the YojnaPath tools, so all callers share one cache"""
+    from tools import kb_tool, scheme_tool
+    
+    return ToolExecutor([scheme_tool, kb_tool], timeouts={"scheme_tool": 5.0, "kb_tool": 5.0})
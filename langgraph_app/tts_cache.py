@@ -0,0 +1,334 @@
+"""
+Content-addressed cache of synthesized speech.
+
+Fixed utterances (the greeting, static stage replies, farewell and error
+fallbacks) are the same audio on every call. CachedTTS wraps a LiveKit TTS and
+stores its PCM output on disk keyed by sha256(text, voice, language, rate), so
+a repeated sentence is played from the cache instead of being synthesized
+(and paid for) again.
+
+The AgentSession wraps a non-streaming TTS in a StreamAdapter that synthesizes
+sentence by sentence, so entries are per sentence. Fixed utterances are
+pre-rendered at worker prewarm through the same adapter; at runtime a sentence
+is stored the second time it is synthesized, so one-off LLM replies don't
+churn the cache.
+
+Configuration:
+    YOJNAPATH_TTS_CACHE_DIR    cache directory (default: ~/.cache/yojnapath/tts)
+    YOJNAPATH_TTS_CACHE_MB     disk budget in MB, least recently played evicted first; 0 disables (default 200)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from livekit.agents import tts
+from livekit.agents.types import APIConnectOptions, DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.utils import shortuuid
+
+from langgraph_app.admission import inflight
+from langgraph_app.stage_registry import load_flows
+from langgraph_app.templates import static_utterances
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MB = 200
+# Decoded clips kept in memory in front of the disk cache
+MEMORY_ITEMS = 64
+# Sentences remembered for the second-occurrence admission rule
+SEEN_ITEMS = 4096
+
+_NO_RETRY = APIConnectOptions(max_retry=0)
+
+
+def default_cache_dir() -> str:
+    return os.getenv("YOJNAPATH_TTS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "yojnapath", "tts")
+
+
+def cache_budget_bytes() -> int:
+    return int(float(os.getenv("YOJNAPATH_TTS_CACHE_MB", DEFAULT_CACHE_MB) or 0) * 1024 * 1024)
+
+
+def tts_cache_enabled() -> bool:
+    return cache_budget_bytes() > 0
+
+
+def cache_key(text: str, voice: str, language: str, rate: float, sample_rate: int, num_channels: int) -> str:
+    """Content address of one synthesized utterance"""
+    # The StreamAdapter keeps sentence separators, so surrounding whitespace isn't part of the key
+    payload = json.dumps([text.strip(), voice, language, rate, sample_rate, num_channels], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Disk-backed LRU of raw PCM clips, one `<key>.pcm` file per entry.
+
+    Recency is the file mtime (touched on every hit), so the order survives
+    restarts and is shared by the worker processes using the same directory.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None, memory_items: int = MEMORY_ITEMS):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = cache_budget_bytes() if max_bytes is None else max_bytes
+        self._memory_items = memory_items
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        # key -> size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".pcm"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, entry.name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+        self._bytes = sum(self._index.values())
+        # Synthesis count of recently missed sentences, for admission
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # The budget may have been lowered since the entries were written
+        self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            # Evicted by another worker sharing the directory
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(key, audio)
+        return audio
+
+    def note_synthesized(self, key: str) -> int:
+        """Count one synthesis of `key`; returns how often it was synthesized recently"""
+        with self._lock:
+            count = self._seen.pop(key, 0) + 1
+            self._seen[key] = count
+            while len(self._seen) > SEEN_ITEMS:
+                self._seen.popitem(last=False)
+            return count
+
+    def put(self, key: str, audio: bytes) -> None:
+        if not audio or len(audio) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write TTS cache entry %s: %s", key, e)
+            return
+
+        with self._lock:
+            self._drop(key)
+            self._index[key] = len(audio)
+            self._bytes += len(audio)
+            self._remember(key, audio)
+            self._evict()
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_items:
+            self._memory.popitem(last=False)
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._index.pop(key, 0)
+        self._memory.pop(key, None)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._index:
+            key, _ = next(iter(self._index.items()))
+            self._drop(key)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+@lru_cache(maxsize=None)
+def shared_cache() -> AudioCache:
+    """The process-wide cache, so prewarm and every job share the in-memory clips"""
+    return AudioCache()
+
+
+class CachedTTS(tts.TTS):
+    """
+    Wraps a non-streaming TTS and serves repeated sentences from an AudioCache.
+
+    `voice`, `language` and `rate` must describe the wrapped TTS; they are part
+    of the cache key. A sentence is stored after it was synthesized
+    `admit_after` times (1 stores everything).
+    """
+
+    def __init__(
+        self,
+        inner: tts.TTS,
+        *,
+        voice: str,
+        language: str,
+        rate: float = 1.0,
+        cache: Optional[AudioCache] = None,
+        admit_after: int = 2,
+    ):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=inner.sample_rate,
+            num_channels=inner.num_channels,
+        )
+        self.inner = inner
+        self.voice = voice
+        self.language = language
+        self.rate = rate
+        self.cache = cache if cache is not None else shared_cache()
+        self.admit_after = admit_after
+
+    @property
+    def model(self) -> str:
+        return self.inner.model
+
+    @property
+    def provider(self) -> str:
+        return self.inner.provider
+
+    def pinned(self) -> "CachedTTS":
+        """A view on the same inner TTS and cache that stores every sentence it synthesizes"""
+        return CachedTTS(self.inner, voice=self.voice, language=self.language, rate=self.rate,
+                         cache=self.cache, admit_after=1)
+
+    def key_for(self, text: str) -> str:
+        return cache_key(text, self.voice, self.language, self.rate, self.sample_rate, self.num_channels)
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "_CachedChunkedStream":
+        # The wrapped TTS retries on its own; retrying here as well would multiply attempts
+        return _CachedChunkedStream(tts=self, input_text=text, conn_options=_NO_RETRY, inner_conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self.inner.prewarm()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class _CachedChunkedStream(tts.ChunkedStream):
+    def __init__(self, *, tts: CachedTTS, input_text: str, conn_options: APIConnectOptions,
+                 inner_conn_options: APIConnectOptions):
+        super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+        self._cached_tts = tts
+        self._inner_conn_options = inner_conn_options
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        cached_tts = self._cached_tts
+        output_emitter.initialize(
+            request_id=shortuuid(),
+            sample_rate=cached_tts.sample_rate,
+            num_channels=cached_tts.num_channels,
+            mime_type="audio/pcm",
+        )
+        if not self.input_text.strip():
+            return
+
+        key = cached_tts.key_for(self.input_text)
+        if key in cached_tts.cache:
+            audio = await asyncio.to_thread(cached_tts.cache.get, key)
+            if audio is not None:
+                output_emitter.push(audio)
+                output_emitter.flush()
+                return
+
+        chunks: List[bytes] = []
+        with inflight("tts"):
+            async with cached_tts.inner.synthesize(self.input_text, conn_options=self._inner_conn_options) as stream:
+                async for ev in stream:
+                    data = ev.frame.data.tobytes()
+                    chunks.append(data)
+                    output_emitter.push(data)
+        output_emitter.flush()
+
+        if chunks and cached_tts.cache.note_synthesized(key) >= cached_tts.admit_after:
+            await asyncio.to_thread(cached_tts.cache.put, key, b"".join(chunks))
+
+
+def fixed_utterances(locale: str, extra: Iterable[str] = ()) -> List[str]:
+    """Every static stage reply of the hosted flows' current stage configs in `locale`, plus `extra`"""
+    texts = [
+        text
+        for registry in load_flows().values()
+        for _, text_locale, text in static_utterances(registry.stages)
+        if text_locale == locale
+    ]
+    return [text for text in dict.fromkeys([*texts, *extra]) if text.strip()]
+
+
+async def prerender(cached_tts: CachedTTS, texts: Iterable[str]) -> int:
+    """
+    Synthesize `texts` into the cache through a StreamAdapter, the same
+    sentence splitting the AgentSession uses; returns the number of new entries.
+    """
+    pinned = cached_tts.pinned()
+    before = len(pinned.cache)
+    adapter = tts.StreamAdapter(tts=pinned)
+    for text in texts:
+        async with adapter.stream() as stream:
+            stream.push_text(text)
+            stream.end_input()
+            async for _ in stream:
+                pass
+    return len(pinned.cache) - before
+
+
+def prerender_blocking(cached_tts: CachedTTS, texts: Iterable[str]) -> None:
+    """prerender() for synchronous worker prewarm; failures are logged, never raised"""
+    texts = list(texts)
+    try:
+        added = asyncio.run(prerender(cached_tts, texts))
+    except Exception as e:
+        logger.warning("TTS cache prewarm failed, utterances will be synthesized on first use: %s", e)
+        return
+    logger.info("TTS cache: %d fixed utterances ready (%d newly synthesized, %.1f MB on disk)",
+                len(texts), added, cached_tts.cache.size_bytes / 1e6)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from enum import Enum
 from pydantic import BaseModel
 
@@ -13,6 +13,16 @@ class StageType(str, Enum):
 class NextStage(BaseModel):
     nextStageId: str
     condition: Optional[str] = ""
+    # Locale -> how the option is offered when the caller is asked to clarify
+    labels: Optional[Dict[str, str]] = None
+
+
+class StageTool(BaseModel):
+    """A tool called for a stage before the LLM answers"""
+    name: str
+    args: Dict[str, Any] = {}
+    # Argument that receives the user's message; None to call with `args` only
+    inputArg: Optional[str] = "query"
 
 
 class Stage(BaseModel):
@@ -24,6 +34,13 @@ class Stage(BaseModel):
     final_prompt: Optional[str] = None
     generic_prompt: Optional[str] = None
     inCondition: Optional[str] = None
+    tools: Optional[List[StageTool]] = None
+    # Model tier: "large" (default), "small", or "none" to reply with the prompt without an LLM call
+    model: Optional[Literal["small", "large", "none"]] = None
+    # Static stages reply with a rendered template (locale -> text, {slot} placeholders), never an LLM
+    static: Optional[bool] = False
+    templates: Optional[Dict[str, str]] = None
+    slots: Optional[Dict[str, str]] = None
 
 
 class LLMResponse(BaseModel):
@@ -45,7 +45,7 @@ class Boto3StageManager():
         self.prompt_manager._stage_manager = self
         
         self.load_stages(stages_info)
-        logger.info(f"Loaded {len(self.stage_id_2_stage)} stages.")
+        logger.info("Loaded %d stages.", len(self.stage_id_2_stage))
     
     def check_if_stage_exists(self, stage_id: str) -> bool:
         return stage_id in self.stage_id_2_stage
@@ -54,7 +54,7 @@ class Boto3StageManager():
         stages_data = json.loads(stages_info)
         
         global_stages = [Stage(**stage_data) for stage_data in stages_data if stage_data.get("type") == StageType.GLOBAL]
-        logger.debug(f"Global stages: {global_stages}")
+        logger.debug("Global stages: %s", global_stages)
         
         # Load each stage
         for stage_data in stages_data:
@@ -90,10 +90,10 @@ class Boto3StageManager():
             # Use string formatting to replace placeholders
             return text.format(**self.input_variables)
         except KeyError as e:
-            logger.warning(f"Missing variable in stage prompt: {e}")
+            logger.warning("Missing variable in stage prompt: %s", e)
             return text
         except Exception as e:
-            logger.error(f"Error substituting variables: {e}")
+            logger.error("Error substituting variables: %s", e)
             return text
     
     def formulate_prompt_for_stage(self, stage: Stage) -> str:
@@ -116,7 +116,7 @@ class Boto3StageManager():
             active_stage = self.get_start_stage()
             self.set_active_stage(conversation_id, active_stage.id)
             stage_id = active_stage.id
-            logger.info(f"Set initial active stage for conversation ID: {conversation_id} to stage ID: {active_stage.id} and stage name is {active_stage.name}")
+            logger.debug("Set initial active stage for conversation ID: %s to stage ID: %s (%s)", conversation_id, active_stage.id, active_stage.name)
         
         return self.stage_id_2_stage.get(stage_id) if stage_id else None
     
@@ -145,17 +145,17 @@ class Boto3StageManager():
         if self.check_if_stage_exists(stage_id):
             stage = self.stage_id_2_stage.get(stage_id)
             if stage:
-                logger.debug(f"Setting active stage for conversation ID: {conversation_id} to stage ID: {stage_id} with stage name: {stage.name}")
+                logger.debug("Setting active stage for conversation ID: %s to stage ID: %s (%s)", conversation_id, stage_id, stage.name)
                 self.conversation_id_2_active_stage[conversation_id] = stage_id
                 return
             
         # If not found by direct ID, try to find by name
         stage = self.find_stage_by_name(stage_id)
         if stage:
-            logger.debug(f"Setting active stage for conversation ID: {conversation_id} to stage ID: {stage.id} with stage name: {stage.name}")
+            logger.debug("Setting active stage for conversation ID: %s to stage ID: %s (%s)", conversation_id, stage.id, stage.name)
             self.conversation_id_2_active_stage[conversation_id] = stage.id
         else:
-            logger.warning(f"Stage not found for identifier: {stage_id}")
+            logger.warning("Stage not found for identifier: %s", stage_id)
     
     def get_start_stage(self) -> Stage:
         start_stage = next((stage for stage in self.stage_id_2_stage.values() if stage.type == StageType.START), None)
@@ -175,11 +175,11 @@ class Boto3StageManager():
         if not active_stage:
             active_stage = self.get_start_stage()
             self.set_active_stage(conversation_id, active_stage.id)
-            logger.info(f"Set initial active stage for conversation ID: {conversation_id} to stage ID: {active_stage.id} and stage name is {active_stage.name}")
+            logger.debug("Set initial active stage for conversation ID: %s to stage ID: %s (%s)", conversation_id, active_stage.id, active_stage.name)
         else:
-            logger.info(f"Retrieved active stage for conversation ID: {conversation_id} is stage ID: {active_stage.id} and stage name is {active_stage.name}")
+            logger.debug("Retrieved active stage for conversation ID: %s is stage ID: %s (%s)", conversation_id, active_stage.id, active_stage.name)
         
-        logger.info(f"Using standard prompt for stage ID: {active_stage.id} and stage name: {active_stage.name}")
+        logger.debug("Using standard prompt for stage ID: %s (%s)", active_stage.id, active_stage.name)
         return active_stage.final_prompt
     
     def get_active_stage_message(self, conversation_id: str) -> Optional[str]:
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+from langchain_core.messages import AIMessage
+from pydantic import ValidationError
+
+from langgraph_app import graph_builder
+from langgraph_app.llm_client import LLMClient, RetryPolicy
+from models import LLMResponse
+
+
+class FakeStructuredLLM:
+    """
+    Stands in for `get_llm(tier).with_structured_output(schema, include_raw=True)`:
+    replies with scripted tool-call arguments and parses them with the real schema.
+    """
+
+    def __init__(self, replies: List[Dict[str, Any]]):
+        self.replies = list(replies)
+        self.prompts: List[str] = []
+        self.schema = LLMResponse
+
+    def _output(self, prompt: str) -> Dict[str, Any]:
+        self.prompts.append(prompt)
+        # The last reply repeats once the script runs out
+        args = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        raw = AIMessage(content="", tool_calls=[{"name": self.schema.__name__, "args": args, "id": "call-1"}])
+        try:
+            return {"raw": raw, "parsed": self.schema.model_validate(args), "parsing_error": None}
+        except ValidationError as e:
+            return {"raw": raw, "parsed": None, "parsing_error": e}
+
+    def invoke(self, prompt: str) -> Dict[str, Any]:
+        return self._output(prompt)
+
+    async def ainvoke(self, prompt: str) -> Dict[str, Any]:
+        await asyncio.sleep(0)
+        return self._output(prompt)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Routes the graph's LLM calls to a FakeStructuredLLM through a fresh, non-retrying client"""
+
+    def install(*replies: Dict[str, Any]) -> FakeStructuredLLM:
+        fake = FakeStructuredLLM(list(replies))
+
+        def get_structured_llm(tier: str = "large", allowed_stages: Optional[tuple] = None):
+            fake.schema = graph_builder.stage_response_model(allowed_stages) if allowed_stages else LLMResponse
+            return fake
+
+        client = LLMClient(retry=RetryPolicy(retries=0), timeout_s=None, hedge_percentile=0, fallback_tiers={})
+        monkeypatch.setattr(graph_builder, "get_structured_llm", get_structured_llm)
+        monkeypatch.setattr(graph_builder, "llm_client", lambda: client)
+        return fake
+
+    return install
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+
+from langgraph_app import admission
+from langgraph_app.admission import ADAPT_INTERVAL_S, FULL_LOAD, AdmissionController, read_load
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeJobRequest:
+    id = "job-1"
+
+    def __init__(self):
+        self.outcome = None
+
+    async def accept(self):
+        self.outcome = "accepted"
+
+    async def reject(self):
+        self.outcome = "rejected"
+
+
+def _publish(directory, llm=0, tts=0, lag_ms=0.0, pid=None):
+    """Write a job process's load file as LoadReporter does"""
+    path = os.path.join(str(directory), f"{pid or os.getpid()}.load")
+    with open(path, "wb") as f:
+        f.write(admission._SLOT.pack(time.time(), llm, tts, lag_ms))
+
+
+def _controller(tmp_path, **kwargs):
+    options = dict(max_jobs=4, max_llm=10, max_tts=10, lag_ms=100.0, queue_s=0.0, directory=str(tmp_path))
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def _request(controller):
+    request = FakeJobRequest()
+    asyncio.run(controller.request_fnc(request))
+    return request.outcome
+
+
+def test_admits_below_capacity(tmp_path):
+    controller = _controller(tmp_path)
+    assert controller.load(jobs=2) == 0.5
+    assert _request(controller) == "accepted"
+    assert controller.jobs == 3
+
+
+def test_rejects_at_call_capacity(tmp_path):
+    controller = _controller(tmp_path)
+    assert controller.load(jobs=4) == FULL_LOAD
+    assert _request(controller) == "rejected"
+    assert controller.rejected == 1
+    assert controller.jobs == 4
+
+
+def test_rejects_when_llm_requests_saturate(tmp_path):
+    controller = _controller(tmp_path)
+    _publish(tmp_path, llm=6)
+    _publish(tmp_path, llm=4, pid=1)
+    assert read_load(str(tmp_path)).llm == 10
+    assert controller.load(jobs=1) == FULL_LOAD
+    assert _request(controller) == "rejected"
+
+
+def test_rejects_on_loop_lag(tmp_path):
+    controller = _controller(tmp_path)
+    _publish(tmp_path, lag_ms=150.0)
+    assert controller.load(jobs=0) == FULL_LOAD
+    assert _request(controller) == "rejected"
+
+
+def test_stale_load_files_are_ignored(tmp_path):
+    path = os.path.join(str(tmp_path), "999999999.load")
+    with open(path, "wb") as f:
+        f.write(admission._SLOT.pack(time.time() - 60, 50, 0, 0.0))
+    assert read_load(str(tmp_path)).llm == 0
+    assert not os.path.exists(path)
+
+
+def test_queued_job_is_accepted_when_a_call_ends(tmp_path):
+    controller = _controller(tmp_path, queue_s=2.0)
+    controller.load(jobs=4)
+
+    async def scenario():
+        request = FakeJobRequest()
+        pending = asyncio.ensure_future(controller.request_fnc(request))
+        await asyncio.sleep(0.05)
+        assert request.outcome is None
+        controller.load(jobs=3)
+        await pending
+        return request.outcome
+
+    assert asyncio.run(scenario()) == "accepted"
+    assert controller.queued == 1
+
+
+def test_capacity_shrinks_under_pressure_and_recovers(tmp_path):
+    clock = FakeClock()
+    controller = _controller(tmp_path, clock=clock)
+    _publish(tmp_path, llm=10)
+    controller.load(jobs=4)
+    clock.now += ADAPT_INTERVAL_S
+    controller.load(jobs=4)
+    assert int(controller.capacity) == 3
+
+    _publish(tmp_path, llm=0)
+    controller.load(jobs=3)
+    clock.now += ADAPT_INTERVAL_S
+    controller.load(jobs=3)
+    assert int(controller.capacity) == 4
@@ -0,0 +1,34 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from azure_stt import RecognitionResult, RecognitionService, run_graph_consumer
+
+
+class FlakyGraph:
+    """Fails the first turn, then echoes the caller's message"""
+
+    def __init__(self):
+        self.inputs = []
+
+    async def ainvoke(self, state, config):
+        self.inputs.append(state["messages"][0].content)
+        if len(self.inputs) == 1:
+            raise RuntimeError("LLM down")
+        return {"messages": [AIMessage(content="ok")]}
+
+
+def test_failed_turn_does_not_stop_the_consumer():
+    graph = FlakyGraph()
+
+    async def run():
+        service = RecognitionService()
+        consumer = asyncio.create_task(run_graph_consumer(service, graph))
+        service.results.put_nowait(RecognitionResult("a.wav", "PM Kisan yojnaa"))
+        service.results.put_nowait(RecognitionResult("a.wav", "paanch hazaar rupaye"))
+        await asyncio.wait_for(service.results.join(), 1)
+        consumer.cancel()
+
+    asyncio.run(run())
+    # Both turns reached the graph, normalized
+    assert graph.inputs == ["pm kisan yojana", "5000 rupaye"]
@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from langgraph_app import call_archive
+from langgraph_app.call_archive import CallArchive, compact, end_call, load_parts, report
+from langgraph_app.graph_builder import aopen_conversation, build_yojnapath_graph
+
+
+def _say(graph, config, text):
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, config)
+
+
+def test_repeat_caller_is_archived_once_per_call(fake_llm, monkeypatch, tmp_path):
+    fake_llm(
+        {"response": "PM Kisan...", "next_stage": "scheme_doubt_solving", "confidence": 0.9},
+        {"response": "Namaste", "next_stage": "gather_info", "confidence": 0.9},
+    )
+    archive = CallArchive(str(tmp_path))
+    monkeypatch.setattr(call_archive, "shared_archive", lambda: archive)
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "caller-1", "locale": "hi"}, "recursion_limit": 10}
+
+    async def call(*utterances):
+        await aopen_conversation(graph, config)
+        for text in utterances:
+            await asyncio.to_thread(_say, graph, config, text)
+        await end_call(graph, config)
+
+    # The first call drops mid-flow; the caller rings back and starts over
+    asyncio.run(call("PM Kisan ke baare mein batao"))
+    asyncio.run(call("namaste"))
+    archive.close()
+    compact(str(tmp_path))
+
+    result = report(load_parts(str(tmp_path)))
+    assert result["calls"] == 2
+    assert result["outcomes"] == {"completed": 0, "abandoned": 2, "failed": 0}
+    turns = {row["stage"]: row["turns"] for row in result["stages"]}
+    assert turns["start_greet"] == 2
+    assert sum(turns.values()) == 2
+
+
+def test_crashed_compaction_counts_each_call_once(monkeypatch, tmp_path):
+    archive = CallArchive(str(tmp_path))
+    for outcome in ("completed", "abandoned"):
+        archive.submit({"thread_id": outcome, "conversation_id": "", "ended_at": 0.0, "outcome": outcome,
+                        "flow": "default", "config_version": 1, "locale": "hi", "turns": []})
+    archive.close()
+    # A compaction that died half-way through writing its part
+    os.makedirs(tmp_path / "part-20260101T000000-1.tmp")
+
+    # The next one dies after publishing its part, before deleting the segments
+    def killed(path):
+        raise OSError("killed")
+
+    with monkeypatch.context() as m:
+        m.setattr(call_archive.os, "remove", killed)
+        with pytest.raises(OSError):
+            compact(str(tmp_path))
+    assert compact(str(tmp_path)) is None
+
+    assert report(load_parts(str(tmp_path)))["calls"] == 2
+    assert not list(tmp_path.glob("calls-*"))
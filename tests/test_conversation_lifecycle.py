@@ -0,0 +1,66 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from langgraph_app.graph_builder import aclear_conversation, aopen_conversation, build_yojnapath_graph
+from langgraph_app.state_store import InMemoryStateStore, SharedCheckpointSaver
+
+
+def _config(thread_id="caller-1"):
+    return {"configurable": {"thread_id": thread_id, "locale": "hi"}, "recursion_limit": 10}
+
+
+def _say(graph, config, text):
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, config)
+
+
+def _finish_call(graph, config):
+    """start_greet -> scheme_doubt_solving -> farewell"""
+    _say(graph, config, "PM Kisan ke baare mein batao")
+    _say(graph, config, "bas, dhanyavaad")
+    assert graph.get_state(config).values["current_stage"] == "farewell"
+
+
+def test_repeat_caller_starts_over_after_finished_call(fake_llm):
+    fake_llm(
+        {"response": "PM Kisan...", "next_stage": "scheme_doubt_solving", "confidence": 0.9},
+        {"response": "Dhanyavaad!", "next_stage": "farewell", "confidence": 0.9},
+        {"response": "Namaste", "next_stage": "gather_info", "confidence": 0.9},
+    )
+    graph = build_yojnapath_graph(checkpointer=SharedCheckpointSaver(InMemoryStateStore()))
+    config = _config()
+    _finish_call(graph, config)
+
+    # Same identity, same thread id: the next call doesn't resume at farewell
+    asyncio.run(aopen_conversation(graph, config))
+    assert not graph.get_state(config).values
+
+    state = _say(graph, config, "namaste")
+    assert state["turns"][0][0] == "start_greet"
+    assert state["current_stage"] == "gather_info"
+    assert len(state["messages"]) == 2
+
+
+def test_unfinished_conversation_is_resumed(fake_llm):
+    fake_llm({"response": "PM Kisan...", "next_stage": "scheme_doubt_solving", "confidence": 0.9})
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    config = _config()
+    _say(graph, config, "PM Kisan ke baare mein batao")
+
+    asyncio.run(aopen_conversation(graph, config))
+    assert graph.get_state(config).values["current_stage"] == "scheme_doubt_solving"
+
+
+def test_cleared_thread_starts_at_start_stage(fake_llm):
+    fake_llm(
+        {"response": "PM Kisan...", "next_stage": "scheme_doubt_solving", "confidence": 0.9},
+        {"response": "Namaste", "next_stage": "gather_info", "confidence": 0.9},
+    )
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    config = _config()
+    _say(graph, config, "PM Kisan ke baare mein batao")
+
+    asyncio.run(aclear_conversation(graph, config))
+    state = _say(graph, config, "namaste")
+    assert [row[0] for row in state["turns"]] == ["start_greet"]
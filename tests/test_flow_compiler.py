@@ -0,0 +1,59 @@
+import pickle
+
+from langgraph_app import flow_compiler
+from langgraph_app.flow_compiler import ARTIFACT_FORMAT, code_digest, read_artifact, write_artifact
+from langgraph_app.stage_registry import DEFAULT_CONFIG_PATH, compile_config
+
+
+def _registry():
+    registry, report = compile_config(DEFAULT_CONFIG_PATH)
+    assert report.ok
+    return registry
+
+
+def test_artifact_round_trip(tmp_path):
+    registry = _registry()
+    path = str(tmp_path / "flow.pkl")
+    write_artifact(registry, path)
+
+    loaded = read_artifact(path, source_digest=registry.digest)
+    assert loaded == registry
+    assert read_artifact(path, source_digest="edited-config") is None
+
+
+def test_artifact_from_other_code_is_a_miss(tmp_path, monkeypatch):
+    registry = _registry()
+    path = str(tmp_path / "flow.pkl")
+    monkeypatch.setattr(flow_compiler, "code_digest", lambda: "older-models")
+    write_artifact(registry, path)
+    monkeypatch.undo()
+
+    assert read_artifact(path, source_digest=registry.digest) is None
+
+
+def test_stale_registry_is_never_unpickled(tmp_path):
+    # A registry pickled under a class this code no longer has
+    path = tmp_path / "flow.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"format": ARTIFACT_FORMAT, "code": "older-models", "digest": "d"}, f)
+        f.write(b"\x80\x05cmodels\nRemovedStage\n.")
+    assert read_artifact(str(path), source_digest="d") is None
+
+
+def test_unpickling_errors_are_a_miss(tmp_path):
+    path = tmp_path / "flow.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"format": ARTIFACT_FORMAT, "code": code_digest(), "digest": "d"}, f)
+        f.write(b"\x80\x05cmodels\nRemovedStage\n.")
+    assert read_artifact(str(path), source_digest="d") is None
+
+    path.write_bytes(b"not a pickle")
+    assert read_artifact(str(path)) is None
+
+
+def test_format_1_artifacts_are_a_miss(tmp_path):
+    registry = _registry()
+    path = tmp_path / "flow.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"format": 1, "registry": registry}, f)
+    assert read_artifact(str(path), source_digest=registry.digest) is None
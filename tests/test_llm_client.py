@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from langgraph_app.llm_client import CircuitBreaker, LLMClient, LLMContentError, LLMUnavailable, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _open_breaker(clock):
+    breaker = CircuitBreaker(threshold=1, reset_after_s=10.0, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_breaker_lets_one_probe_through_after_reset():
+    clock = FakeClock()
+    breaker = _open_breaker(clock)
+    assert not breaker.allow()
+
+    clock.now = 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_released_probe_does_not_wedge_breaker():
+    clock = FakeClock()
+    breaker = _open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.allow()
+
+    breaker.release_probe()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+async def _no_sleep(_):
+    pass
+
+
+def _client():
+    return LLMClient(
+        retry=RetryPolicy(retries=0),
+        timeout_s=None,
+        hedge_percentile=0,
+        breaker_threshold=1,
+        breaker_reset_s=0.0,
+        fallback_tiers={},
+        sleep=_no_sleep,
+    )
+
+
+def test_cancelled_half_open_probe_frees_the_tier():
+    client = _client()
+
+    async def failing(tier):
+        raise ConnectionError("down")
+
+    async def hanging(tier):
+        await asyncio.sleep(3600)
+
+    async def answering(tier):
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(LLMUnavailable):
+            await client.acall("small", failing)
+        assert client.breaker("small").state == "half-open"
+
+        probe = asyncio.ensure_future(client.acall("small", hanging))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        return await client.acall("small", answering)
+
+    assert asyncio.run(scenario()) == ("ok", "small")
+    assert client.breaker("small").state == "closed"
+
+
+def test_timed_out_probe_frees_the_tier():
+    client = _client()
+
+    async def hanging(tier):
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        client.breaker("small").record_failure()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.acall("small", hanging), 0.01)
+        return await client.acall("small", lambda tier: asyncio.sleep(0, "ok"))
+
+    assert asyncio.run(scenario()) == ("ok", "small")
+
+
+def test_content_errors_do_not_open_the_breaker():
+    client = LLMClient(retry=RetryPolicy(retries=2, base_delay_s=0), breaker_threshold=2, fallback_tiers={})
+    calls = []
+
+    def malformed(tier):
+        calls.append(tier)
+        raise LLMContentError("next_stage 'apply_online' is not allowed")
+
+    for _ in range(5):
+        with pytest.raises(LLMUnavailable):
+            client.call("large", malformed)
+
+    # Asked once more per call, not once per retry, and the tier stays available
+    assert len(calls) == 10
+    assert client.breaker("large").state == "closed"
+    assert client.stats.breaker_opens == 0
+
+
+def test_content_error_falls_back_after_one_retry():
+    async def scenario():
+        client = LLMClient(retry=RetryPolicy(retries=2, base_delay_s=0), timeout_s=None, hedge_percentile=0,
+                           sleep=lambda _: asyncio.sleep(0))
+        calls = []
+
+        async def acall(tier):
+            calls.append(tier)
+            if tier == "large":
+                raise LLMContentError("unparseable")
+            return "ok"
+
+        return await client.acall("large", acall), calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == ("ok", "small")
+    assert calls == ["large", "large", "small"]
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+from langgraph_app.llm_client import LLMClient, RetryPolicy
+from langgraph_app.llm_scheduler import (
+    MAX_REQUEUES,
+    PRIORITY_LIVE,
+    PRIORITY_SPECULATIVE,
+    LLMScheduler,
+    TokenBucket,
+    llm_context,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    class response:
+        headers = {"retry-after": "0"}
+
+
+def test_token_bucket_refills_and_settles():
+    clock = FakeClock()
+    bucket = TokenBucket(60, period_s=60.0, clock=clock)
+    assert bucket.delay(60) == 0.0
+    bucket.take(60)
+    assert bucket.delay(1) == pytest.approx(1.0)
+
+    clock.now = 30.0
+    assert bucket.delay(30) == 0.0
+    # Used more than estimated: the next request waits longer
+    bucket.settle(estimated=10, actual=40)
+    assert bucket.delay(30) == pytest.approx(30.0)
+    # Requests above capacity wait for a full bucket rather than forever
+    assert bucket.delay(1000) == pytest.approx(60.0)
+
+
+def test_rate_limited_request_is_requeued():
+    scheduler = LLMScheduler()
+    attempts = []
+
+    async def make():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimited()
+        return "ok"
+
+    assert asyncio.run(scheduler.submit("m", make, "prompt")) == "ok"
+    assert len(attempts) == 2
+    assert scheduler.stats.rate_limited == 1
+
+
+def test_persistent_rate_limit_fails_the_request():
+    scheduler = LLMScheduler()
+    attempts = []
+
+    async def make():
+        attempts.append(1)
+        raise RateLimited()
+
+    with pytest.raises(RateLimited):
+        asyncio.run(scheduler.submit("m", make, "prompt"))
+    assert len(attempts) == MAX_REQUEUES + 1
+
+
+def test_identical_requests_of_different_sessions_are_coalesced():
+    scheduler = LLMScheduler()
+    calls = []
+
+    async def make():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "shared"
+
+    async def session(name):
+        with llm_context(name):
+            return await scheduler.submit("m", make, "prompt", key="same")
+
+    async def scenario():
+        return await asyncio.gather(session("a"), session("b"))
+
+    assert asyncio.run(scenario()) == ["shared", "shared"]
+    assert len(calls) == 1
+    assert scheduler.stats.coalesced == 1
+
+
+def test_live_requests_go_before_speculative_ones():
+    # One request per 50 ms: the first starts at once, the rest queue
+    scheduler = LLMScheduler({"m": {"rpm": 1}}, period_s=0.05)
+    started = []
+
+    def request(name):
+        async def make():
+            started.append(name)
+            return name
+        return make
+
+    async def submit(name, priority):
+        with llm_context(name, priority):
+            return await scheduler.submit("m", request(name), "prompt")
+
+    async def scenario():
+        first = asyncio.ensure_future(submit("first", PRIORITY_LIVE))
+        await asyncio.sleep(0)
+        speculative = asyncio.ensure_future(submit("speculative", PRIORITY_SPECULATIVE))
+        live = asyncio.ensure_future(submit("live", PRIORITY_LIVE))
+        await asyncio.gather(first, speculative, live)
+
+    asyncio.run(scenario())
+    assert started == ["first", "live", "speculative"]
+    assert scheduler.stats.queued == 2
+
+
+def _client(timeout_s=None):
+    async def no_sleep(_):
+        pass
+
+    return LLMClient(retry=RetryPolicy(retries=0), timeout_s=timeout_s, hedge_percentile=0,
+                     breaker_threshold=1, breaker_reset_s=0.0, fallback_tiers={}, sleep=no_sleep)
+
+
+def test_timed_out_scheduled_probe_cancels_the_request_and_frees_the_breaker():
+    scheduler = LLMScheduler()
+    client = _client()
+    cancelled = []
+
+    async def hanging():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def answering():
+        return "ok"
+
+    async def scenario():
+        client.breaker("small").record_failure()
+        assert client.breaker("small").state == "half-open"
+        probe = client.acall("small", lambda tier: scheduler.submit("m", hanging, "prompt"))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(probe, 0.02)
+        await asyncio.sleep(0)
+        return await client.acall("small", lambda tier: scheduler.submit("m", answering, "prompt"))
+
+    assert asyncio.run(scenario()) == ("ok", "small")
+    assert cancelled == [1]
+    assert client.breaker("small").state == "closed"
+
+
+def test_probe_hitting_the_client_timeout_reopens_the_breaker():
+    scheduler = LLMScheduler()
+    client = _client(timeout_s=0.02)
+
+    async def hanging():
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        client.breaker("small").record_failure()
+        with pytest.raises(Exception):
+            await client.acall("small", lambda tier: scheduler.submit("m", hanging, "prompt"))
+
+    asyncio.run(scenario())
+    # A failed probe, not a wedged one: the next probe is let through after the reset
+    assert client.breaker("small").allow()
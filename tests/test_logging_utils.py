@@ -0,0 +1,74 @@
+import json
+import logging
+
+import pytest
+
+from langgraph_app import logging_utils
+from langgraph_app.logging_utils import sensitive, setup_logging, shutdown_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    """Sets up logging into a list; returns a function that flushes the queue and parses the lines"""
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "handlers", list(root.handlers))
+    monkeypatch.setattr(logging_utils, "_redaction_mode", logging_utils._redaction_mode)
+    level = root.level
+    handler = ListHandler()
+
+    def install(**kwargs):
+        setup_logging(handler=handler, **kwargs)
+
+        def lines():
+            shutdown_logging()
+            return [json.loads(line) for line in handler.lines]
+        return lines
+
+    yield install
+    shutdown_logging()
+    root.setLevel(level)
+
+
+def test_records_are_redacted_before_they_are_queued(captured):
+    lines = captured(level="INFO", redaction="mask")
+    logger = logging.getLogger("yojnapath.test")
+
+    logger.info("Caller %s said %s", "+91 98765 43210", sensitive("mera naam Ramesh hai"),
+                extra={"stage": "gather_info"})
+    try:
+        raise ValueError("LLM down")
+    except ValueError:
+        logger.exception("Turn failed")
+
+    info, error = lines()
+    assert info["msg"] == "Caller *************10 said mera naam Ramesh hai"
+    assert info["stage"] == "gather_info"
+    assert error["level"] == "ERROR" and "ValueError: LLM down" in error["exc"]
+
+
+def test_full_redaction_hides_user_text(captured):
+    lines = captured(level="INFO")
+
+    logging.getLogger("yojnapath.test").info("User: %s", sensitive("PM Kisan ke baare mein batao"))
+
+    assert lines()[0]["msg"] == "User: <redacted:28 chars>"
+
+
+def test_sampling_keeps_every_warning(captured):
+    lines = captured(level="DEBUG", sample_rate=0.0)
+    logger = logging.getLogger("yojnapath.test")
+
+    for _ in range(20):
+        logger.info("turn done")
+    logger.warning("LLM slow")
+
+    assert [line["msg"] for line in lines()] == ["LLM slow"]
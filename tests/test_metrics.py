@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from langgraph_app.metrics import Counter, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_shards_of_every_thread_are_summed(registry):
+    transitions = Counter(registry, "transitions_total", "Turns", ["from_stage", "to_stage"])
+
+    def record():
+        for _ in range(1000):
+            transitions.inc("start_greet", "gather_info")
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    transitions.inc("gather_info", "preference", amount=2)
+
+    assert len(registry._shards) == 5
+    assert registry.collect()["transitions_total"] == {
+        ("start_greet", "gather_info"): 4000,
+        ("gather_info", "preference"): 2,
+    }
+
+
+def test_histogram_exposition(registry):
+    latency = Histogram(registry, "turn_latency_seconds", "LLM latency of a turn", ["stage"], (0.5, 0.1, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.5):
+        latency.observe(value, "gather_info")
+    latency.observe(0.2, 'say "hi"\n')
+
+    assert registry.render() == "\n".join([
+        "# HELP turn_latency_seconds LLM latency of a turn",
+        "# TYPE turn_latency_seconds histogram",
+        'turn_latency_seconds_bucket{stage="gather_info",le="0.1"} 2',
+        'turn_latency_seconds_bucket{stage="gather_info",le="0.5"} 3',
+        'turn_latency_seconds_bucket{stage="gather_info",le="1"} 3',
+        'turn_latency_seconds_bucket{stage="gather_info",le="+Inf"} 4',
+        'turn_latency_seconds_sum{stage="gather_info"} 2.95',
+        'turn_latency_seconds_count{stage="gather_info"} 4',
+        'turn_latency_seconds_bucket{stage="say \\"hi\\"\\n",le="0.1"} 0',
+        'turn_latency_seconds_bucket{stage="say \\"hi\\"\\n",le="0.5"} 1',
+        'turn_latency_seconds_bucket{stage="say \\"hi\\"\\n",le="1"} 1',
+        'turn_latency_seconds_bucket{stage="say \\"hi\\"\\n",le="+Inf"} 1',
+        'turn_latency_seconds_sum{stage="say \\"hi\\"\\n"} 0.2',
+        'turn_latency_seconds_count{stage="say \\"hi\\"\\n"} 1',
+    ]) + "\n"
+
+
+def test_counter_exposition_keeps_large_counts_exact(registry):
+    tokens = Counter(registry, "tokens_total", "Tokens", ["model"])
+    tokens.inc("llama-3.3-70b-versatile", amount=123456789)
+
+    assert registry.render().splitlines()[-1] == 'tokens_total{model="llama-3.3-70b-versatile"} 123456789'
+
+
+def test_metrics_are_registered_before_recording(registry):
+    Counter(registry, "turns_total", "Turns", ["stage"]).inc("start_greet")
+
+    with pytest.raises(RuntimeError):
+        Counter(registry, "late_total", "Too late", ["stage"])
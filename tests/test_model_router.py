@@ -0,0 +1,77 @@
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from langgraph_app import graph_builder, model_router
+from langgraph_app.graph_builder import add_user_input, build_yojnapath_graph, init_conversation
+from langgraph_app.model_router import estimate_cost, record_turn, stage_stats_report
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(model_router, "_stats", {})
+    for tier in ("LARGE", "SMALL"):
+        monkeypatch.delenv(f"YOJNAPATH_MODEL_{tier}", raising=False)
+
+
+@pytest.fixture
+def tiers(fake_llm, monkeypatch):
+    """The tier of every structured LLM the graph asks for"""
+    fake_llm(
+        {"response": "Namaste! Aap kis yojana ke baare mein jaanna chahte hain?", "next_stage": "scheme_doubt_solving",
+         "confidence": 0.9},
+        {"response": "PM Kisan mein saal ke 6000 rupaye milte hain", "next_stage": "scheme_doubt_solving",
+         "confidence": 0.9},
+    )
+    requested = []
+    get_structured_llm = graph_builder.get_structured_llm
+
+    def recording(tier="large", allowed_stages=None):
+        requested.append(tier)
+        return get_structured_llm(tier, allowed_stages)
+
+    monkeypatch.setattr(graph_builder, "get_structured_llm", recording)
+    return requested
+
+
+def _turns(*texts, stage=None):
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "routing"}, "recursion_limit": 10}
+    state = init_conversation("routing")
+    if stage:
+        state["current_stage"] = stage
+    for text in texts:
+        state = graph.invoke(add_user_input(state, text), config)
+    return state
+
+
+def test_each_stage_is_answered_by_its_tier(tiers):
+    _turns("namaste", "PM Kisan mein kitna paisa milta hai")
+
+    # start_greet routes on the small model, scheme answers come from the large one
+    assert tiers == ["small", "large"]
+    models = {row["stage"]: row["models"] for row in stage_stats_report()}
+    assert models == {"start_greet": SMALL_MODEL, "scheme_doubt_solving": LARGE_MODEL}
+
+
+def test_static_stage_makes_no_llm_call(tiers):
+    state = _turns("koi bhi", stage="preference")
+
+    assert tiers == []
+    assert state["current_stage"] == "recommend_scheme"
+    [row] = stage_stats_report()
+    assert (row["stage"], row["llm_calls"], row["models"], row["cost_usd"]) == ("preference", 0, "none", 0.0)
+
+
+def test_cost_follows_the_model_price():
+    usage = {"input_tokens": 1_000_000, "output_tokens": 1_000_000}
+    record_turn("gather_info", SMALL_MODEL, 0.2, usage)
+    record_turn("gather_info", LARGE_MODEL, 0.8, usage)
+
+    [row] = stage_stats_report()
+    assert row["cost_usd"] == pytest.approx(estimate_cost(SMALL_MODEL, usage) + estimate_cost(LARGE_MODEL, usage))
+    assert row["cost_usd"] == pytest.approx(0.05 + 0.08 + 0.59 + 0.79)
+    assert (row["turns"], row["llm_calls"], row["avg_ms"]) == (2, 2, 500.0)
+    assert estimate_cost("unknown-model", usage) == 0.0
@@ -0,0 +1,104 @@
+import asyncio
+
+from langgraph_app import prerouter
+from langgraph_app.graph_builder import arun_stage_tools, stage_tool_calls
+from langgraph_app.prerouter import IncrementalRouter, PreRoute, PreRouter, consume_preroute
+from langgraph_app.stage_registry import current_registry
+from langgraph_app.text_normalizer import normalize_utterance
+
+# Interim transcripts reach the router normalized
+PARTIAL = normalize_utterance("PM Kisan yojana ki patrata kya hai")
+
+
+def _route(stage_id, thread_id):
+    stage = current_registry().stages[stage_id]
+    candidates = [stage.id] + [ns.nextStageId for ns in stage.nextStages or []]
+    prerouter._routes[thread_id] = PreRoute(router=IncrementalRouter(candidates), stage=stage)
+    return PreRouter(graph=None, config={"configurable": {"thread_id": thread_id}})
+
+
+def test_router_scores_reachable_stages():
+    router = IncrementalRouter(["start_greet", "scheme_doubt_solving", "gather_info"])
+    assert router.update(normalize_utterance("pm kisan")) == "scheme_doubt_solving"
+    assert router.update(PARTIAL) == "scheme_doubt_solving"
+
+
+def test_prefetch_makes_the_stages_declared_call():
+    async def scenario():
+        _route("scheme_doubt_solving", "declared").on_partial(PARTIAL)
+        route = prerouter._routes["declared"]
+        stage = current_registry().stages["scheme_doubt_solving"]
+        assert route.prefetch_call == stage_tool_calls(stage, PARTIAL)[0]
+        return await consume_preroute("declared", stage_tool_calls(stage, PARTIAL))
+
+    assert set(asyncio.run(scenario())) == {"scheme_tool"}
+
+
+def test_no_prefetch_for_a_stage_without_that_tool():
+    async def scenario():
+        # scheme_doubt_solving leads, but start_greet declares no scheme_tool call
+        _route("start_greet", "no-tools").on_partial(PARTIAL)
+        return prerouter._routes["no-tools"].prefetch
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_prefetch_for_another_transcript_is_dropped():
+    async def scenario():
+        _route("scheme_doubt_solving", "changed").on_partial(PARTIAL)
+        task = prerouter._routes["changed"].prefetch
+        stage = current_registry().stages["scheme_doubt_solving"]
+        result = await consume_preroute("changed", stage_tool_calls(stage, PARTIAL + " aur awas yojana"))
+        await asyncio.sleep(0)
+        return result, task
+
+    result, task = asyncio.run(scenario())
+    assert result == {}
+    assert task.cancelled()
+
+
+def test_tools_node_ignores_prefetch_the_stage_does_not_declare():
+    async def scenario():
+        _route("scheme_doubt_solving", "undeclared").on_partial(PARTIAL)
+        state = {"current_stage": "gather_info", "messages": [], "user_input": PARTIAL}
+        updates = await arun_stage_tools(state, {"configurable": {"thread_id": "undeclared"}})
+        return updates["tool_context"]
+
+    assert asyncio.run(scenario()) == ""
+    assert "undeclared" not in prerouter._routes
+
+
+def test_static_turn_drops_the_route():
+    async def scenario():
+        _route("scheme_doubt_solving", "static").on_partial(PARTIAL)
+        task = prerouter._routes["static"].prefetch
+        state = {"current_stage": "preference", "messages": [], "user_input": PARTIAL}
+        await arun_stage_tools(state, {"configurable": {"thread_id": "static"}})
+        await asyncio.sleep(0)
+        return task
+
+    assert asyncio.run(scenario()).cancelled()
+    assert "static" not in prerouter._routes
+
+
+class FakeSession:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+
+def test_session_close_drops_the_route():
+    async def scenario():
+        session = FakeSession()
+        router = _route("scheme_doubt_solving", "hangup")
+        router.attach(session)
+        router.on_partial(PARTIAL)
+        task = prerouter._routes["hangup"].prefetch
+        session.handlers["close"](None)
+        await asyncio.sleep(0)
+        return task
+
+    assert asyncio.run(scenario()).cancelled()
+    assert "hangup" not in prerouter._routes
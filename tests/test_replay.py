@@ -0,0 +1,25 @@
+import json
+
+from langgraph_app.replay import TURN_FIELDS, run_replay
+
+
+def test_replay_records_every_turn_and_flags_mismatches(fake_llm, tmp_path):
+    fake_llm({"response": "PM Kisan...", "next_stage": "scheme_doubt_solving", "confidence": 0.9})
+    transcripts = tmp_path / "calls.jsonl"
+    transcripts.write_text("\n".join(json.dumps(t) for t in [
+        {"conversation_id": "c1", "turns": ["PM Kisan ke baare mein batao", "patrata kya hai"],
+         "expected_stages": ["scheme_doubt_solving", "scheme_doubt_solving"]},
+        # Turns may also be recorded as {"user": ...}; this one expects the wrong stage
+        {"conversation_id": "c2", "turns": [{"user": "PM Kisan"}], "expected_stages": ["farewell"]},
+    ]) + "\n\n", encoding="utf-8")
+    output = tmp_path / "turns.json"
+
+    summary = run_replay(str(transcripts), str(output), concurrency=2, output_format="columnar")
+
+    assert (summary.conversations, summary.turns, summary.errors, summary.mismatches) == (2, 3, 0, 1)
+    columns = json.loads(output.read_text(encoding="utf-8"))
+    assert list(columns) == TURN_FIELDS
+    assert columns["conversation_id"] == ["c1", "c1", "c2"]
+    assert columns["from_stage"] == ["start_greet", "scheme_doubt_solving", "start_greet"]
+    assert columns["to_stage"] == ["scheme_doubt_solving"] * 3
+    assert all(tokens > 0 for tokens in columns["input_tokens"])
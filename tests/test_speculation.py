@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from langgraph_app import speculation
+from langgraph_app.speculation import SpeculationStats, SpeculativeResponder, SpeculativeTurn, consume_speculation
+
+TEXT = "pm kisan ki patrata kya hai"
+
+
+class FakeSession:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, ev=None):
+        self.handlers[event](ev)
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(speculation, "stats", SpeculationStats())
+    monkeypatch.setattr(speculation, "_turns", {})
+
+
+def _pending_turn(thread_id, result="reply"):
+    async def call():
+        await asyncio.sleep(0.05)
+        return result
+
+    turn = SpeculativeTurn(stage_id="scheme_doubt_solving", history=[], text=TEXT, task=asyncio.create_task(call()))
+    speculation._turns[thread_id] = turn
+    speculation.stats.started += 1
+    return turn
+
+
+def test_matching_final_transcript_commits():
+    async def scenario():
+        _pending_turn("hit")
+        return await consume_speculation("hit", "scheme_doubt_solving", TEXT)
+
+    assert asyncio.run(scenario()) == "reply"
+    assert (speculation.stats.committed, speculation.stats.discarded, speculation.stats.cancelled) == (1, 0, 0)
+    assert speculation.stats.hit_rate == 1.0
+
+
+def test_mismatched_speculation_is_counted_once():
+    async def scenario():
+        turn = _pending_turn("miss")
+        output = await consume_speculation("miss", "scheme_doubt_solving", "mujhe ghar ke liye yojana chahiye")
+        await asyncio.sleep(0)
+        return output, turn.task.cancelled()
+
+    assert asyncio.run(scenario()) == (None, True)
+    assert (speculation.stats.committed, speculation.stats.discarded, speculation.stats.cancelled) == (0, 1, 0)
+    assert speculation.stats.hit_rate == 0.0
+
+
+def test_skipped_speculation_is_discarded():
+    async def scenario():
+        # _speculate returns None without calling the LLM while the flow is busy
+        _pending_turn("busy", result=None)
+        return await consume_speculation("busy", "scheme_doubt_solving", TEXT)
+
+    assert asyncio.run(scenario()) is None
+    assert (speculation.stats.committed, speculation.stats.discarded, speculation.stats.cancelled) == (0, 1, 0)
+
+
+def test_session_close_drops_a_pending_speculation():
+    async def scenario():
+        session = FakeSession()
+        SpeculativeResponder(graph=None, config={"configurable": {"thread_id": "hangup"}}).attach(session)
+        turn = _pending_turn("hangup")
+        # The caller hangs up mid-utterance: no final transcript ever consumes the turn
+        session.emit("close")
+        await asyncio.sleep(0)
+        return turn.task.cancelled()
+
+    assert asyncio.run(scenario())
+    assert speculation._turns == {}
+    assert (speculation.stats.committed, speculation.stats.discarded, speculation.stats.cancelled) == (0, 0, 1)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from langgraph_app import stage_registry
+from langgraph_app.graph_builder import build_yojnapath_graph
+from langgraph_app.speculation import SpeculativeResponder
+from langgraph_app.stage_registry import (
+    DEFAULT_CONFIG_PATH,
+    DEFAULT_FLOW,
+    StageConfigWatcher,
+    current_registry,
+    get_registry,
+    load_flows,
+    load_registry,
+)
+
+
+@pytest.fixture
+def registries(monkeypatch):
+    """Empty registry state, so versions are numbered from 1 as in a fresh worker"""
+    monkeypatch.setattr(stage_registry, "_current", {})
+    monkeypatch.setattr(stage_registry, "_versions", {})
+    monkeypatch.setattr(stage_registry, "_last_version", 0)
+
+
+def _other_flow_config(tmp_path):
+    with open(DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+        stages = json.load(f)
+    stages[0]["prompt"] = "Welcome to the Madhya Pradesh scheme helpline."
+    path = tmp_path / "mp.json"
+    path.write_text(json.dumps(stages), encoding="utf-8")
+    return str(path)
+
+
+def test_pinned_version_resolves_within_its_flow(registries, tmp_path):
+    default = current_registry(DEFAULT_FLOW)
+    other = load_registry(_other_flow_config(tmp_path), flow="mp_schemes")
+    assert default.version != other.version
+
+    assert get_registry(default.version, DEFAULT_FLOW) is default
+    assert get_registry(other.version, "mp_schemes") is other
+
+
+def test_other_flows_version_falls_back_to_latest(registries, tmp_path):
+    # On the worker a conversation came from, this number was a version of the default flow
+    other = load_registry(_other_flow_config(tmp_path), flow="mp_schemes")
+    default = current_registry(DEFAULT_FLOW)
+
+    assert get_registry(other.version, DEFAULT_FLOW) is default
+    assert get_registry(default.version, "mp_schemes") is other
+
+
+def test_unknown_version_falls_back_to_latest(registries):
+    default = current_registry(DEFAULT_FLOW)
+    assert get_registry(default.version + 100, DEFAULT_FLOW) is default
+
+
+def test_watcher_swaps_in_an_edited_config(registries, tmp_path):
+    path = _other_flow_config(tmp_path)
+    load_registry(path)
+    watcher = StageConfigWatcher(path, flow=DEFAULT_FLOW)
+    watcher.start()
+    watcher.stop()
+    before = current_registry()
+    with open(path, encoding="utf-8") as f:
+        stages = json.load(f)
+
+    stages[0]["prompt"] = "Welcome back to the Madhya Pradesh scheme helpline."
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stages, f)
+    assert watcher.check()
+
+    after = current_registry()
+    assert after.version > before.version
+    assert "Welcome back" in after.prompt_parts[after.start_stage.id][0]
+    # Calls pinned to the old version keep its prompts until they end
+    assert get_registry(before.version) is before
+    assert "Welcome back" not in before.prompt_parts[before.start_stage.id][0]
+
+
+def test_watcher_keeps_the_live_config_when_the_edit_is_invalid(registries, tmp_path, caplog):
+    path = _other_flow_config(tmp_path)
+    load_registry(path)
+    watcher = StageConfigWatcher(path, flow=DEFAULT_FLOW)
+    watcher.start()
+    watcher.stop()
+    live = current_registry()
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('[{"id": "start_greet", ')
+    assert not watcher.check()
+
+    assert current_registry() is live
+    assert f"Stage config reload failed, keeping version {live.version}" in caplog.text
+
+
+
+@pytest.fixture
+def tenant_flow(registries, tmp_path, monkeypatch):
+    """A second hosted flow, mp_schemes, whose START stage id only it has"""
+    with open(DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+        stages = json.load(f)
+    stages[0]["id"] = "mp_greet"
+    stages[0]["prompt"] = "Welcome to the Madhya Pradesh scheme helpline."
+    (tmp_path / "mp.json").write_text(json.dumps(stages), encoding="utf-8")
+    (tmp_path / "flows.json").write_text(json.dumps({"mp_schemes": {"config": "mp.json"}}), encoding="utf-8")
+    monkeypatch.setenv("YOJNAPATH_FLOWS", str(tmp_path / "flows.json"))
+    return load_flows()
+
+
+def test_load_flows_compiles_every_hosted_flow(tenant_flow):
+    assert set(tenant_flow) == {DEFAULT_FLOW, "mp_schemes"}
+    assert tenant_flow["mp_schemes"].start_stage.id == "mp_greet"
+    assert tenant_flow["mp_schemes"].version != tenant_flow[DEFAULT_FLOW].version
+    assert current_registry("mp_schemes") is tenant_flow["mp_schemes"]
+
+
+def test_second_flow_turns_use_their_own_prompts(tenant_flow, fake_llm, caplog):
+    fake = fake_llm({"response": "Namaste", "next_stage": "gather_info", "confidence": 0.9})
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "mp-caller", "flow": "mp_schemes"}, "recursion_limit": 10}
+
+    for text in ("namaste", "mujhe yojana chahiye"):
+        state = graph.invoke({"messages": [HumanMessage(content=text)]}, config)
+
+    assert state["flow"] == "mp_schemes"
+    assert state["config_version"] == tenant_flow["mp_schemes"].version
+    assert len(fake.prompts) == 2 and "Madhya Pradesh" in fake.prompts[0]
+    assert "belongs to flow" not in caplog.text
+
+
+def test_speculation_uses_the_conversations_flow(tenant_flow, fake_llm):
+    fake = fake_llm({"response": "Namaste", "next_stage": "gather_info", "confidence": 0.9})
+    version = tenant_flow["mp_schemes"].version
+
+    asyncio.run(SpeculativeResponder._speculate("mp_greet", [], "mujhe yojana chahiye", version, "mp_schemes"))
+
+    assert len(fake.prompts) == 1 and "Madhya Pradesh" in fake.prompts[0]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from pydantic import ValidationError
+
+from langgraph_app import graph_builder
+from langgraph_app.graph_builder import TURN_LOG_FIELDS, build_yojnapath_graph, stage_response_model
+from langgraph_app.metrics import INVALID_TRANSITIONS, REGISTRY
+from langgraph_app.stage_registry import current_registry
+from models import LLMResponse
+
+ILLEGAL = {"response": "Aapke liye yojanaayein...", "next_stage": "recommend_scheme", "confidence": 0.9}
+
+
+def _invalid_count(stage, requested):
+    return REGISTRY.collect()[INVALID_TRANSITIONS.name].get((stage, requested), 0)
+
+
+def _config(thread_id):
+    return {"configurable": {"thread_id": thread_id, "locale": "hi"}, "recursion_limit": 10}
+
+
+def test_stage_schema_only_admits_allowed_stages():
+    allowed = current_registry().transitions["start_greet"]
+    schema = stage_response_model(allowed)
+    assert stage_response_model(allowed) is schema
+    assert schema.model_validate({"response": "ok", "next_stage": allowed[0]}).next_stage == allowed[0]
+    with pytest.raises(ValidationError):
+        schema.model_validate(ILLEGAL)
+
+
+def test_out_of_set_stage_is_rejected_and_counted(fake_llm):
+    fake = fake_llm(ILLEGAL)
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    before = _invalid_count("start_greet", "recommend_scheme")
+
+    state = graph.invoke({"messages": [HumanMessage(content="namaste")]}, _config("sync"))
+
+    assert fake.schema is not LLMResponse
+    assert state["current_stage"] == "start_greet"
+    assert state["turns"][-1][TURN_LOG_FIELDS.index("failed")] == 1
+    assert _invalid_count("start_greet", "recommend_scheme") == before + 1
+
+
+def test_out_of_set_stage_is_rejected_and_counted_async(fake_llm):
+    fake_llm(ILLEGAL)
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    before = _invalid_count("start_greet", "recommend_scheme")
+
+    state = asyncio.run(graph.ainvoke({"messages": [HumanMessage(content="namaste")]}, _config("async")))
+
+    assert state["current_stage"] == "start_greet"
+    assert _invalid_count("start_greet", "recommend_scheme") == before + 1
+
+
+def test_unknown_stage_id_is_counted_without_its_name(fake_llm):
+    fake_llm({**ILLEGAL, "next_stage": "apply_online"})
+    graph = build_yojnapath_graph(checkpointer=MemorySaver())
+    before = _invalid_count("start_greet", "unknown")
+
+    state = graph.invoke({"messages": [HumanMessage(content="namaste")]}, _config("unknown"))
+
+    assert state["current_stage"] == "start_greet"
+    assert _invalid_count("start_greet", "unknown") == before + 1
+    assert _invalid_count("start_greet", "apply_online") == 0
+
+
+def test_output_bypassing_the_schema_stays_on_stage_and_is_counted():
+    # e.g. a speculative answer computed under an older config
+    registry = current_registry()
+    stage = registry.stages["start_greet"]
+    before = _invalid_count("start_greet", "recommend_scheme")
+
+    state = graph_builder._complete_turn(
+        {"current_stage": "start_greet", "turns": []}, registry, stage, [], LLMResponse(**ILLEGAL), model="fake"
+    )
+
+    assert state["current_stage"] == "start_greet"
+    assert state["clarify_options"] == list(registry.transitions["start_greet"])
+    assert _invalid_count("start_greet", "recommend_scheme") == before + 1
@@ -0,0 +1,49 @@
+import ormsgpack
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from langgraph_app.state_codec import CODEC_ZLIB, StateCodec
+
+serde = JsonPlusSerializer()
+
+
+def _checkpoint(turns):
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"PM Kisan ke baare mein batao {turn}", id=f"h{turn}"))
+        messages.append(AIMessage(content=f"प्रधानमंत्री किसान सम्मान निधि {turn}", id=f"a{turn}"))
+    checkpoint = {"v": 1, "id": f"cp-{turns}", "ts": "2026-01-01T00:00:00", "channel_versions": {"messages": turns},
+                  "versions_seen": {"conversation": {"messages": turns}}, "updated_channels": ["messages"]}
+    return checkpoint, {"messages": messages, "current_stage": "gather_info"}, {"step": turns}
+
+
+def test_round_trip_keeps_the_history():
+    codec = StateCodec(CODEC_ZLIB)
+    checkpoint, values, metadata = _checkpoint(3)
+
+    record = ormsgpack.packb(codec.encode(checkpoint, values, metadata, serde))
+    decoded, decoded_metadata = codec.decode(ormsgpack.unpackb(record), serde)
+
+    assert decoded["channel_values"] == values
+    assert decoded["id"] == "cp-3" and decoded_metadata == {"step": 3}
+
+
+def test_history_is_one_chunk_per_record():
+    codec = StateCodec(CODEC_ZLIB)
+    encoded = codec.encode(*_checkpoint(10), serde)
+
+    [[_, kind, chunks]] = [value for value in encoded["values"] if value[1] == "m"]
+    assert len(chunks) == 1 and chunks[0][0] == 20
+
+
+def test_records_with_several_chunks_still_decode():
+    codec = StateCodec(CODEC_ZLIB)
+    checkpoint, values, metadata = _checkpoint(2)
+    encoded = codec.encode(checkpoint, values, metadata, serde)
+    # Records written by the earlier delta encoding: one chunk per turn, plus the parent's checksum
+    messages = values["messages"]
+    chunks = [codec._message_chunk(messages[:2]), codec._message_chunk(messages[2:])]
+    encoded["values"] = [[ref, "m", chunks, 12345] if kind == "m" else [ref, kind, *rest]
+                         for ref, kind, *rest in encoded["values"]]
+
+    assert codec.decode(encoded, serde)[0]["channel_values"]["messages"] == messages
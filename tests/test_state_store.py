@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from langgraph_app.graph_builder import build_yojnapath_graph
+from langgraph_app.state_store import (
+    InMemoryStateStore,
+    SharedCheckpointSaver,
+    SQLiteStateStore,
+    StateStore,
+    VersionConflict,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStateStore()
+    store = SQLiteStateStore(str(tmp_path / "state.db"))
+    request.addfinalizer(store.close)
+    return store
+
+
+def _config(thread_id="caller-1"):
+    return {"configurable": {"thread_id": thread_id, "locale": "hi"}, "recursion_limit": 10}
+
+
+def test_state_store_is_abstract():
+    with pytest.raises(TypeError):
+        StateStore()
+
+
+def test_cleared_thread_keeps_counting_versions(store):
+    assert store.put("t", "", b"call-1", 0) == 1
+    assert store.put("t", "", b"call-1 turn 2", 1) == 2
+    store.clear("t")
+
+    version, data, _ = store.get("t")
+    assert (version, data) == (3, b"")
+    # Neither a fresh insert nor a write expecting the old conversation's version lands
+    for stale in (0, 2):
+        with pytest.raises(VersionConflict):
+            store.put("t", "", b"stale", stale)
+    assert store.put("t", "", b"call-2", 3) == 4
+
+
+def test_worker_cache_never_serves_a_cleared_conversation(store, fake_llm):
+    fake_llm(
+        {"response": "PM Kisan...", "next_stage": "scheme_doubt_solving", "confidence": 0.9},
+        {"response": "Namaste", "next_stage": "gather_info", "confidence": 0.9},
+    )
+    graph_a = build_yojnapath_graph(checkpointer=SharedCheckpointSaver(store))
+    graph_b = build_yojnapath_graph(checkpointer=SharedCheckpointSaver(store))
+    config = _config()
+
+    graph_a.invoke({"messages": [HumanMessage(content="PM Kisan ke baare mein batao")]}, config)
+    # Worker B caches the first call's record at its version
+    assert graph_b.get_state(config).values["current_stage"] == "scheme_doubt_solving"
+
+    # The call ends on A and the caller calls again, also on A
+    graph_a.checkpointer.delete_thread("caller-1")
+    graph_a.invoke({"messages": [HumanMessage(content="namaste")]}, config)
+
+    assert graph_b.get_state(config).values["current_stage"] == "gather_info"
+    assert [row[0] for row in graph_b.get_state(config).values["turns"]] == ["start_greet"]
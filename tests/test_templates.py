@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from langgraph_app import graph_builder
+from langgraph_app.flow_compiler import analyze_flow
+from langgraph_app.stage_registry import DEFAULT_CONFIG_PATH, _build_registry, parse_stages
+from langgraph_app.templates import TemplateError, render_template, static_utterances, template_error
+
+# Literal braces, as in a template pasted from a JSON example
+BROKEN = 'Send us {"name": "...", "scheme": "..."} on WhatsApp'
+
+
+def _stages(preference_template):
+    with open(DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    for stage in data:
+        if stage["id"] == "preference":
+            stage["templates"] = {"hi": preference_template}
+    return parse_stages(data)
+
+
+def test_literal_braces():
+    assert render_template("Form: {{link}} {name}", {"name": "PM Kisan"}) == "Form: {link} PM Kisan"
+    assert template_error("Form: {{link}} {name}") is None
+    assert template_error(BROKEN) is not None
+    assert template_error("100% {") is not None
+    with pytest.raises(TemplateError):
+        render_template(BROKEN)
+
+
+def test_flow_with_unrenderable_template_is_rejected():
+    report = analyze_flow(_stages(BROKEN))
+    assert any("preference" in error and "template" in error for error in report.errors)
+    assert analyze_flow(_stages("{{ok}}")).ok
+
+
+def test_unrenderable_static_stage_falls_back_to_the_llm(fake_llm, monkeypatch):
+    registry = _build_registry(_stages(BROKEN), 1, "", "")
+    monkeypatch.setattr(graph_builder, "stage_registry_for", lambda state, config=None: registry)
+    fake = fake_llm({"response": "Aapki pasand ki shreni batayein", "next_stage": "recommend_scheme"})
+
+    state = graph_builder.process_stage(
+        {"current_stage": "preference", "user_input": "nahi pata", "messages": [], "locale": "hi"}
+    )
+
+    assert len(fake.prompts) == 1
+    assert state["messages"][-1].content == "Aapki pasand ki shreni batayein"
+    assert state["current_stage"] == "recommend_scheme"
+    # Nothing to pre-render for it either
+    assert ("preference", "hi") not in {(stage_id, locale) for stage_id, locale, _ in static_utterances(registry.stages)}
@@ -0,0 +1,40 @@
+import pytest
+
+from langgraph_app.text_normalizer import SCRIPT_DEVANAGARI, SCRIPT_LATIN, SCRIPT_MIXED, detect_script, normalize_utterance
+
+
+@pytest.mark.parametrize("text", [
+    "main kisan hoon",
+    "mujhe PM Kisan yojna ke bare mein batao",
+    "meri beti ke liye scholarship chahiye",
+    "mera ghar kachcha hai, awas yojana milegi kya",
+])
+def test_code_mixed_roman_stays_roman(text):
+    assert detect_script(normalize_utterance(text)) == SCRIPT_LATIN
+
+
+@pytest.mark.parametrize("text", [
+    "मैं किसान हूँ",
+    "मुझे पीएम किसान योजना के बारे में बताओ",
+    "दस्तावेज़ कौन से चाहिए",
+])
+def test_devanagari_stays_devanagari(text):
+    assert detect_script(normalize_utterance(text)) == SCRIPT_DEVANAGARI
+
+
+def test_mixed_script_input_is_not_rewritten_across_scripts():
+    assert normalize_utterance("main किसान hoon") == "main किसान hoon"
+    assert detect_script(normalize_utterance("PM Kisan योजना")) == SCRIPT_MIXED
+
+
+def test_roman_spellings_fold_to_one():
+    assert normalize_utterance("PM Kisan yojnaa ke baare mein batao") == normalize_utterance("pm kisan yojana ke bare mein batao")
+    assert normalize_utterance("dastavez kaun se chahie") == "dastavej kaun se chahiye"
+
+
+def test_numbers_become_digits_in_either_script():
+    assert normalize_utterance("paanch hazaar rupaye") == "5000 rupaye"
+    assert normalize_utterance("पाँच हज़ार रुपये") == "5000 रुपये"
+    assert normalize_utterance("मेरी उम्र ४५ साल है") == "मेरी उम्र 45 साल है"
+    # "ek" alone is more often "a" than one
+    assert normalize_utterance("ek yojana") == "ek yojana"
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from langgraph_app.tool_executor import ToolExecutor, ToolResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_skips_the_tool():
+    calls = []
+
+    def scheme_tool(state, occupation):
+        calls.append((state, occupation))
+        return [{"name": "PM Kisan"}]
+
+    executor = ToolExecutor([scheme_tool])
+    for tool_input in ({"state": "UP", "occupation": "farmer"}, {"occupation": "farmer", "state": "UP"}):
+        assert executor.invoke({"tool": "scheme_tool", "tool_input": tool_input}) == [{"name": "PM Kisan"}]
+
+    assert calls == [("UP", "farmer")]
+    assert executor.stats["scheme_tool"].cache_hits == 1
+
+
+def test_cache_expires_and_evicts_least_recent():
+    clock = FakeClock()
+    cache = ToolResultCache(maxsize=2, ttl=60.0, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == (True, 1)
+    # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert len(cache) == 2
+
+    clock.now = 61.0
+    assert cache.get("a") == (False, None)
+    assert cache.get("c") == (False, None)
+
+
+def test_timeout_is_per_tool():
+    async def kb_tool(query):
+        await asyncio.sleep(1)
+        return "docs"
+
+    async def scheme_tool(query):
+        return "schemes"
+
+    executor = ToolExecutor([kb_tool, scheme_tool], timeouts={"kb_tool": 0.01})
+
+    async def run():
+        return await executor.invoke_many([
+            {"tool": "kb_tool", "tool_input": {"query": "PM Kisan"}},
+            {"tool": "scheme_tool", "tool_input": {"query": "PM Kisan"}},
+        ])
+
+    slow, fast = asyncio.run(run())
+    assert isinstance(slow, asyncio.TimeoutError)
+    assert fast == "schemes"
+    assert executor.stats["kb_tool"].timeouts == 1
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    calls = []
+
+    def kb_tool(query):
+        calls.append(query)
+        time.sleep(0.05)
+        return f"docs for {query}"
+
+    executor = ToolExecutor([kb_tool])
+    call = {"tool": "kb_tool", "tool_input": {"query": "PM Kisan"}}
+
+    async def run():
+        return await asyncio.gather(executor.ainvoke(call), executor.ainvoke(dict(call)))
+
+    assert asyncio.run(run()) == ["docs for PM Kisan"] * 2
+    assert calls == ["PM Kisan"]
+    assert executor.stats["kb_tool"].cache_hits == 1
+
+
+@pytest.mark.parametrize("tool_input", ["PM Kisan", {"query": "PM Kisan"}])
+def test_async_callable_takes_any_input(tool_input):
+    async def kb_tool(query):
+        return f"docs for {query}"
+
+    executor = ToolExecutor([kb_tool])
+
+    assert asyncio.run(executor.ainvoke({"tool": "kb_tool", "tool_input": tool_input})) == "docs for PM Kisan"
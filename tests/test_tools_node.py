@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from langgraph_app import graph_builder
+from langgraph_app.graph_builder import add_user_input, build_yojnapath_graph, init_conversation
+from langgraph_app.tool_executor import ToolExecutor
+
+REPLY = {"response": "PM Kisan mein saal ke 6000 rupaye milte hain", "next_stage": "scheme_doubt_solving",
+         "confidence": 0.9}
+
+
+def _scheme_turn(text):
+    state = init_conversation("tools-1")
+    state["current_stage"] = "scheme_doubt_solving"
+    return add_user_input(state, text)
+
+
+@pytest.fixture
+def scheme_tool(monkeypatch):
+    """Installs a scheme_tool returning (or raising) `result` behind a fresh executor"""
+
+    def install(result):
+        def scheme_tool(**tool_input):
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        executor = ToolExecutor([scheme_tool])
+        monkeypatch.setattr(graph_builder, "default_tool_executor", lambda: executor)
+
+    return install
+
+
+@pytest.mark.parametrize("run", ["invoke", "ainvoke"])
+def test_tool_results_ground_the_reply(run, fake_llm, scheme_tool):
+    fake = fake_llm(REPLY)
+    scheme_tool([{"name": "PM Kisan", "benefit": "6000 per year"}])
+    graph = build_yojnapath_graph()
+    turn = _scheme_turn("PM Kisan mein kitna paisa milta hai")
+
+    if run == "invoke":
+        result = graph.invoke(turn, {"recursion_limit": 10})
+    else:
+        result = asyncio.run(graph.ainvoke(turn, {"recursion_limit": 10}))
+
+    # The tools ran before the stage's LLM call, in the same turn
+    assert len(fake.prompts) == 1
+    grounding = "Relevant information (use it to answer):\n[scheme_tool]\n- PM Kisan: benefit: 6000 per year"
+    assert grounding in fake.prompts[0]
+    assert result["messages"][-1].content == REPLY["response"]
+
+
+def test_failed_tool_is_left_out_of_the_prompt(fake_llm, scheme_tool, caplog):
+    fake = fake_llm(REPLY)
+    scheme_tool(ConnectionError("scheme API down"))
+
+    result = asyncio.run(build_yojnapath_graph().ainvoke(_scheme_turn("PM Kisan"), {"recursion_limit": 10}))
+
+    assert "Relevant information" not in fake.prompts[0]
+    assert result["messages"][-1].content == REPLY["response"]
+    assert "Tool scheme_tool failed" in caplog.text
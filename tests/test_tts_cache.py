@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from langgraph_app.tts_cache import AudioCache, CachedTTS  # noqa: E402
+
+SAMPLE_RATE = 16000
+# 100 ms of 16-bit mono PCM
+CLIP = b"\x01\x00" * (SAMPLE_RATE // 10)
+
+
+class FakeStream:
+    def __init__(self, audio):
+        self.audio = audio
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def __aiter__(self):
+        yield SimpleNamespace(frame=SimpleNamespace(data=memoryview(self.audio)))
+
+
+class FakeTTS:
+    """Stands in for google.TTS: records what it was asked to synthesize"""
+
+    sample_rate = SAMPLE_RATE
+    num_channels = 1
+    model = "fake"
+    provider = "fake"
+
+    def __init__(self):
+        self.synthesized = []
+
+    def synthesize(self, text, *, conn_options=None):
+        self.synthesized.append(text)
+        return FakeStream(CLIP)
+
+    async def aclose(self):
+        pass
+
+
+def _speak(cached_tts, text):
+    async def run():
+        async with cached_tts.synthesize(text) as stream:
+            return b"".join([ev.frame.data.tobytes() async for ev in stream])
+
+    return asyncio.run(run())
+
+
+def test_repeated_sentence_is_played_from_the_cache(tmp_path):
+    inner = FakeTTS()
+    cached_tts = CachedTTS(inner, voice="hi-IN-Standard-B", language="hi-IN",
+                           cache=AudioCache(str(tmp_path), max_bytes=1024 * 1024))
+    text = "कृपया अपनी उम्र, राज्य, व्यवसाय और सालाना आय बताइए।"
+
+    # Stored the second time it is synthesized, played from the cache after that
+    assert [_speak(cached_tts, text) for _ in range(3)] == [CLIP] * 3
+    assert inner.synthesized == [text, text]
+    assert (cached_tts.cache.misses, cached_tts.cache.hits) == (0, 1)
+
+    # Another voice is another entry
+    other_voice = CachedTTS(inner, voice="hi-IN-Standard-A", language="hi-IN", cache=cached_tts.cache)
+    _speak(other_voice, text)
+    assert len(inner.synthesized) == 3
+
+
+def test_pinned_tts_stores_on_first_synthesis(tmp_path):
+    inner = FakeTTS()
+    cached_tts = CachedTTS(inner, voice="hi-IN-Standard-B", language="hi-IN", cache=AudioCache(str(tmp_path)))
+
+    _speak(cached_tts.pinned(), "नमस्ते")
+    assert _speak(cached_tts, "नमस्ते") == CLIP
+    assert inner.synthesized == ["नमस्ते"]
+
+
+def test_least_recently_played_clip_is_evicted_and_the_index_survives_a_restart(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=2 * len(CLIP))
+    cache.put("greeting", CLIP)
+    cache.put("farewell", CLIP)
+    assert cache.get("greeting") == CLIP
+    cache.put("error", CLIP)
+
+    assert "farewell" not in cache
+    assert not (tmp_path / "farewell.pcm").exists()
+    reopened = AudioCache(str(tmp_path), max_bytes=2 * len(CLIP))
+    assert len(reopened) == 2 and reopened.get("error") == CLIP